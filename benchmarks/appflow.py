@@ -0,0 +1,57 @@
+"""
+Drive the portal like an officer would, through Streamlit's AppTest.
+Shared by the benchmark suite and the load harness.
+"""
+import os
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_instalment_portal.py")
+
+APPLICANT_FIELDS = {
+    "First Name": "Ali",
+    "Last Name": "Khan",
+    "Phone Number": "03001234567",
+    "Street Address": "12 Main Boulevard",
+    "Area Address": "DHA Phase 5",
+    "City": "Lahore",
+    "State/Province": "Punjab",
+    "Country": "Pakistan",
+}
+EVALUATION_FIELDS = {
+    "Net Salary": "120000",
+    "Applicant's Average 6M Bank Balance": "90000",
+}
+
+
+def text_input(at, label):
+    return next(t for t in at.text_input if t.label.startswith(label))
+
+
+def button(at, label):
+    return next(b for b in at.button if label in b.label)
+
+
+def new_session(timeout=60):
+    """ A session past the landing page, on the tabs """
+    at = AppTest.from_file(APP, default_timeout=timeout).run()
+    button(at, "Start New Application").click().run()
+    return at
+
+
+def fill_applicant(at, cnic):
+    for label, value in APPLICANT_FIELDS.items():
+        text_input(at, label).input(value)
+    text_input(at, "CNIC").input(cnic)
+    return at.run()
+
+
+def fill_evaluation(at):
+    for label, value in EVALUATION_FIELDS.items():
+        text_input(at, label).input(value)
+    return at.run()
+
+
+def save_applicant(at):
+    return button(at, "Save Applicant to Database").click().run()
@@ -0,0 +1,106 @@
+"""
+Portal cold start: time to first paint in a fresh process.
+
+Every measurement runs in a new interpreter with `-X importtime`, the way a
+freshly started server sees the first session. Streamlit itself is imported
+before the clock starts (the server has it loaded before any session), then:
+
+  landing   first script run: the landing page an officer sees first
+  tabs      "Start New Application" after --think seconds on the landing
+            page: the first run of the full portal
+
+The imports each step triggered are read back from the importtime log, so
+the slowest ones can be listed with --top. The suite (suite.py) records
+the same figures as app.cold_landing / app.cold_tabs.
+
+    python benchmarks/cold_start.py --runs 5 --top 10 --think 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_instalment_portal.py")
+MARKER = "cold_start:"
+
+
+def run_child(think):
+    """ One cold start in this process; timings as JSON on stdout, step markers in the importtime log """
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    set_log_level("error")
+    os.environ.setdefault("PORTAL_DB_HOST", "127.0.0.1")
+    os.environ.setdefault("PORTAL_DB_CONNECT_TIMEOUT", "1")
+    timings = {}
+    at = AppTest.from_file(APP, default_timeout=120)
+
+    print(f"{MARKER}landing", file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    at.run()
+    timings["landing"] = time.perf_counter() - start
+
+    time.sleep(think)
+    print(f"{MARKER}tabs", file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    next(b for b in at.button if "Start New Application" in b.label).click().run()
+    timings["tabs"] = time.perf_counter() - start
+
+    print(f"{MARKER}end", file=sys.stderr, flush=True)
+    print(json.dumps(timings))
+
+
+def parse_importtime(log):
+    """ {step: [(cumulative_us, module), ...]} for the top-level imports each step triggered """
+    steps, step = {}, None
+    for line in log.splitlines():
+        if line.startswith(MARKER):
+            step = line[len(MARKER):]
+            steps.setdefault(step, [])
+        elif step and step != "end" and line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                steps[step].append((int(cumulative), name.strip()))
+    return steps
+
+
+def measure_cold_start(runs=3, think=0.0):
+    """ Seconds per step for each of `runs` fresh processes, plus the last run's import breakdown """
+    samples, imports = [], {}
+    for _ in range(runs):
+        child = subprocess.run(
+            [sys.executable, "-X", "importtime", __file__, "--child", "--think", str(think)],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        )
+        samples.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        imports = parse_importtime(child.stderr)
+    return {step: [s[step] for s in samples] for step in samples[0]}, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="list the N slowest imports per step")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds on the landing page before starting")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.think)
+        return
+
+    samples, imports = measure_cold_start(args.runs, args.think)
+    for step, seconds in samples.items():
+        seconds = statistics.median(seconds)
+        total = sum(us for us, _ in imports.get(step, [])) / 1e6
+        print(f"{step:<8} {seconds * 1e3:>9.1f} ms  (imports {total * 1e3:.1f} ms)")
+        for us, name in sorted(imports.get(step, []), reverse=True)[:args.top]:
+            print(f"    {us / 1e3:>9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+DB round trips per form edit.
+
+Drives the portal through Streamlit's AppTest, types into "First Name" on the
+Applicant Information tab N times and counts how many database connections the
+script checks out per edit. The MySQL server is replaced by the SQLite
+stand-in in standin.py, so no database server is needed.
+
+    python benchmarks/db_roundtrips_per_edit.py --edits 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+from standin import StandinConnection, create_standin  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(ROOT, "streamlit_instalment_portal.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--edits", type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "standin.sqlite")
+    create_standin(path)
+
+    checkouts = []
+    db.get_db_connection = lambda: checkouts.append(1) or StandinConnection(path)
+
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.button[0].click().run()  # 🚀 Start New Application
+    first_name = next(t for t in at.text_input if t.label == "First Name")
+
+    before = len(checkouts)
+    for i in range(args.edits):
+        first_name.input("A" * (i + 1)).run()
+    per_edit = (len(checkouts) - before) / args.edits
+
+    print(f"initial page load: {before} round trip(s)")
+    print(f"form edits: {args.edits}, round trips: {len(checkouts) - before}, per edit: {per_edit:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Export time and peak memory by row count.
+
+Seeds the SQLite stand-in (standin.py) with N synthetic applicants, then
+exports it in each format through export.export_applicants(), which streams
+rows in chunks. Every export runs in a fresh process so its peak RSS is
+exact; "idle" is the same process after imports only. --baseline also runs
+the old approach: the whole table in a DataFrame, written with pandas into
+an in-memory workbook.
+
+    python benchmarks/export_memory.py --rows 100000 1000000 --baseline
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+import db  # noqa: E402
+from export import export_applicants, EXPORT_FORMATS  # noqa: E402
+from standin import StandinConnection, create_standin  # noqa: E402
+
+
+def baseline_excel():
+    df = pd.read_sql(f"SELECT {', '.join(db.APPLICANT_SELECT_COLUMNS)} FROM data ORDER BY id", db.get_db_connection())
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name="Applicants")
+    return output.getvalue()
+
+
+def run_child(path, name):
+    """ One export in this process; prints seconds, output size and peak RSS as JSON """
+    db.get_db_connection = lambda: StandinConnection(path)
+    start = time.perf_counter()
+    size = 0
+    if name != "idle":
+        size = len(baseline_excel() if name == "Excel (baseline)" else export_applicants(name))
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "file_mib": size / 2**20,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=list(EXPORT_FORMATS), choices=list(EXPORT_FORMATS))
+    parser.add_argument("--baseline", action="store_true", help="also run the old in-memory Excel export")
+    parser.add_argument("--child", nargs=2, metavar=("DB", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f"{'rows':>10} {'format':>16} {'seconds':>9} {'peak RSS MiB':>13} {'file MiB':>9}")
+    for rows in args.rows:
+        path = os.path.join(tempfile.mkdtemp(), "standin.sqlite")
+        create_standin(path, rows)
+
+        names = ["idle"] + args.formats + (["Excel (baseline)"] if args.baseline else [])
+        for name in names:
+            child = subprocess.run(
+                [sys.executable, __file__, "--child", path, name],
+                capture_output=True, text=True, check=True,
+            )
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            print(
+                f"{rows:>10,} {name:>16} {result['seconds']:>9.2f} "
+                f"{result['peak_rss_mib']:>13.1f} {result['file_mib']:>9.1f}"
+            )
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
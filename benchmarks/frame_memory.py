@@ -0,0 +1,80 @@
+"""
+Applicants frame: memory per row and st.dataframe serialization, before and after.
+
+  read_sql      the old read: pd.read_sql over every column (object strings,
+                and on MySQL every DECIMAL as a Python Decimal)
+  typed         fetch_all_applicants(): every column with APPLICANT_DTYPES
+  typed/<view>  the same with only the columns of an Applicants tab view
+
+"serialize" is what st.dataframe does with the frame before sending it to
+the browser (dataframe_util.convert_anything_to_arrow_bytes). The database
+is the SQLite stand-in unless --mysql is given (see suite.py).
+
+    python benchmarks/frame_memory.py --rows 10000 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+from streamlit import dataframe_util  # noqa: E402
+
+import db  # noqa: E402
+from standin import seed_mysql, use_standin  # noqa: E402
+
+
+def timed(fn, repeat):
+    seconds, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return result, statistics.median(seconds)
+
+
+def read_sql():
+    with db.db_connection() as conn:
+        return pd.read_sql(f"SELECT {', '.join(db.APPLICANT_SELECT_COLUMNS)} FROM data ORDER BY id ASC", conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mysql", action="store_true")
+    parser.add_argument("--mysql-database", default="portal_bench")
+    args = parser.parse_args()
+
+    # st.cache_data and pandas' DBAPI warning outside a running app
+    warnings.simplefilter("ignore")
+    variants = {"read_sql": read_sql, "typed": db.fetch_all_applicants.__wrapped__}
+    for view, columns in db.APPLICANT_VIEWS.items():
+        if columns != db.APPLICANT_SELECT_COLUMNS:
+            variants[f"typed/{view}"] = lambda columns=tuple(columns): db.fetch_all_applicants.__wrapped__(columns)
+
+    print(f"{'rows':>9} {'frame':<16} {'cols':>4} {'bytes/row':>10} {'vs read_sql':>11} {'load ms':>9} {'serialize ms':>13}")
+    for rows in args.rows:
+        if args.mysql:
+            seed_mysql(rows, args.mysql_database)
+        else:
+            use_standin(rows)
+        baseline = None
+        for name, load in variants.items():
+            df, load_seconds = timed(load, args.repeat)
+            _, serialize_seconds = timed(lambda: dataframe_util.convert_anything_to_arrow_bytes(df), args.repeat)
+            per_row = df.memory_usage(deep=True).sum() / len(df)
+            baseline = baseline or per_row
+            print(
+                f"{rows:>9,} {name:<16} {df.shape[1]:>4} {per_row:>10,.0f} {per_row / baseline:>10.0%} "
+                f"{load_seconds * 1e3:>9.1f} {serialize_seconds * 1e3:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
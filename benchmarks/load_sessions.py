@@ -0,0 +1,390 @@
+"""
+Concurrent-session load test of one portal process.
+
+Runs N simulated officers at once, each its own AppTest session of the real
+script in this process (sessions share the process, its caches, pool and
+journal worker exactly as browser sessions of one `streamlit run` do). Every
+officer repeats one workflow until the level's time is up:
+
+  fill     Applicant Information and Evaluation, one rerun per field
+  save     💾 Save Applicant to Database (queued in the journal, drained to the DB)
+  browse   Applicants tab: next page, previous page, a decision filter and back
+  delete   enter an ID under IDs / ranges, 🗑️ Delete Applicants, ✅ Yes, Delete
+
+with --think seconds (exponential) between interactions. For each --sessions
+level it reports workflows/min, reruns/s, p50/p95/p99 rerun latency overall
+and per step, errors (script exceptions, "❌ Failed ..." messages, missing
+success messages, reruns over --timeout, harness errors when AppTest itself
+fails; the session is then restarted), the peak number of DB connections
+checked out at once, pool retries/failures and how long the journal took to
+drain afterwards.
+
+Use a local MySQL/MariaDB server (--mysql; PORTAL_DB_HOST must be local).
+Without it the SQLite stand-in is used, which serializes every write and
+only suits a smoke run of the harness itself: its figures say nothing about
+pool sizing or contention on the server. No MySQL/MariaDB figures have been
+recorded yet; the --mysql path (standin.seed_mysql() with
+benchmarks/mysql_schema.sql) has not been run against a server.
+
+    PORTAL_DB_HOST=127.0.0.1 python benchmarks/load_sessions.py --mysql --sessions 1 4 8 16 32 --seconds 60
+"""
+import argparse
+import ast
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The harness's saves go to a scratch journal, never the portal's own
+os.environ.setdefault("PORTAL_JOURNAL_PATH", os.path.join(tempfile.mkdtemp(), "load_journal.sqlite"))
+os.environ.setdefault("PORTAL_METRICS_PORT", "")
+
+import appflow  # noqa: E402
+import db  # noqa: E402
+import journal  # noqa: E402
+from standin import seed_mysql, use_standin  # noqa: E402
+from streamlit import config  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+STEPS = ["open", "fill", "save", "browse", "delete"]
+
+# Every AppTest session compiles the script itself (a server compiles it once),
+# and concurrent ast.parse() calls can fail on CPython 3.11 ("AST constructor
+# recursion depth mismatch"), so the harness serializes them
+_parse = ast.parse
+_parse_lock = threading.Lock()
+
+
+def _serialized_parse(*args, **kwargs):
+    with _parse_lock:
+        return _parse(*args, **kwargs)
+
+
+ast.parse = _serialized_parse
+
+# Each AppTest run installs its own Runtime singleton and clears it when done,
+# which would pull it out from under the sessions still running; like a server,
+# the harness keeps one Runtime for every session
+_runtime = {"instance": None}
+
+
+def _shared_instance(cls):
+    if cls._instance is not None:
+        _runtime["instance"] = cls._instance
+    if _runtime["instance"] is None:
+        raise RuntimeError("Runtime hasn't been created!")
+    return _runtime["instance"]
+
+
+def _shared_exists(cls):
+    return cls._instance is not None or _runtime["instance"] is not None
+
+
+Runtime.instance = classmethod(_shared_instance)
+Runtime.exists = classmethod(_shared_exists)
+
+
+# -----------------------------
+# DB connections checked out at once
+# -----------------------------
+class _CountedConnection:
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def close(self):
+        self._counter.release()
+        return self._conn.close()
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+
+class ConnectionCounter:
+    """ Wraps db.get_db_connection() to track how many connections are out at once """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = self.peak = 0
+        self._checkout = db.get_db_connection
+        db.get_db_connection = self.checkout
+
+    def checkout(self):
+        conn = self._checkout()
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        return _CountedConnection(conn, self)
+
+    def release(self):
+        with self._lock:
+            self.current -= 1
+
+    def reset_peak(self):
+        with self._lock:
+            self.peak = self.current
+
+
+def server_threads_connected():
+    """ Threads_connected on the local MySQL server (None on the stand-in) """
+    import mysql.connector
+
+    conn = mysql.connector.connect(**db.DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_connected'")
+        return int(cursor.fetchone()[1])
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# One simulated officer
+# -----------------------------
+class SharedIds:
+    """ Seeded ids 1, 2, 3, ... handed out once across all officers """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __next__(self):
+        with self._lock:
+            return next(self._ids)
+
+
+class Officer:
+    def __init__(self, number, level, deadline, think, timeout, delete_ids):
+        self.number = number
+        self.deadline = deadline
+        self.think = think
+        self.timeout = timeout
+        self.delete_ids = delete_ids
+        self.rnd = random.Random(number)
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {}
+        self.workflows = 0
+        self.level = level
+        self.at = None
+
+    def _pause(self):
+        if self.think:
+            time.sleep(self.rnd.expovariate(1 / self.think))
+
+    def _error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def _run(self, step, interact=None):
+        """ One interaction and the rerun it triggers, timed under `step` """
+        self._pause()
+        start = time.perf_counter()
+        if interact is None:
+            self.at = appflow.new_session(self.timeout)
+        else:
+            interact(self.at)
+            self.at.run()
+        self.latencies[step].append(time.perf_counter() - start)
+        if self.at.exception:
+            self._error("exception")
+        if any(e.value.startswith("❌ Failed") for e in self.at.error):
+            self._error("failed message")
+
+    def _expect(self, kind, found):
+        if not found:
+            self._error(kind)
+
+    def workflow(self, iteration):
+        at = self.at
+        cnic = f"{36000 + self.level * 1000 + self.number:05d}-{iteration:07d}-{iteration % 10}"
+        fields = dict(appflow.APPLICANT_FIELDS, **{"CNIC": cnic, "First Name": f"Officer{self.number}"})
+        for label, value in fields.items():
+            self._run("fill", lambda at, label=label, value=value: appflow.text_input(at, label).input(value))
+        for label, value in appflow.EVALUATION_FIELDS.items():
+            self._run("fill", lambda at, label=label, value=value: appflow.text_input(at, label).input(value))
+
+        self._run("save", lambda at: appflow.button(at, "Save Applicant to Database").click())
+        self._expect("save not confirmed", any("saved successfully" in s.value for s in self.at.success))
+
+        at = self.at
+        next_button = appflow.button(at, "Next")
+        if not next_button.disabled:
+            self._run("browse", lambda at: appflow.button(at, "Next").click())
+            self._run("browse", lambda at: appflow.button(at, "Previous").click())
+        self._run("browse", lambda at: at.selectbox(key="filter_decision").set_value("Approved"))
+        self._run("browse", lambda at: at.selectbox(key="filter_decision").set_value("All"))
+
+        row_id = next(self.delete_ids)
+        if self.at.radio(key="delete_scope").value != "IDs / ranges":
+            self._run("delete", lambda at: at.radio(key="delete_scope").set_value("IDs / ranges"))
+        self._run("delete", lambda at: appflow.text_input(at, "Applicant IDs to delete").input(str(row_id)))
+        self._run("delete", lambda at: appflow.button(at, "Delete Applicants").click())
+        if any(b.label.endswith("Yes, Delete") for b in self.at.button):
+            self._run("delete", lambda at: appflow.button(at, "Yes, Delete").click())
+            self._expect("delete not confirmed", any("Deleted 1 applicant" in s.value for s in self.at.success))
+        else:
+            self._error("delete not offered")
+
+    def run(self):
+        iteration = 0
+        while time.perf_counter() < self.deadline:
+            try:
+                if self.at is None:
+                    self._run("open")
+                self.workflow(iteration)
+                self.workflows += 1
+            except RuntimeError:
+                # AppTest gave up on a rerun (over --timeout); start a fresh session
+                self._error("timeout")
+                self.at = None
+            except Exception as e:
+                # An expected widget was missing, e.g. the run before it failed
+                self._error(f"harness {type(e).__name__}")
+                self.at = None
+            iteration += 1
+
+
+# -----------------------------
+# Levels
+# -----------------------------
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def wait_for_journal(limit=120):
+    """ Seconds until the journal has no pending saves (None if it did not drain in `limit`) """
+    start = time.perf_counter()
+    while journal.journal_counts()["pending"]:
+        if time.perf_counter() - start > limit:
+            return None
+        time.sleep(0.2)
+    return time.perf_counter() - start
+
+
+def run_level(sessions, args, counter, delete_ids, mysql):
+    counter.reset_peak()
+    pool_before = db.get_pool_stats()
+    server_peak = [None]
+    stop = threading.Event()
+
+    def sample_server():
+        while not stop.wait(0.5):
+            try:
+                threads = server_threads_connected()
+                server_peak[0] = max(server_peak[0] or 0, threads)
+            except Exception:
+                pass
+
+    if mysql:
+        threading.Thread(target=sample_server, daemon=True).start()
+
+    deadline = time.perf_counter() + args.seconds
+    officers = [Officer(i, sessions, deadline, args.think, args.timeout, delete_ids) for i in range(sessions)]
+    threads = [threading.Thread(target=o.run, name=f"officer-{o.number}") for o in officers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    drain = wait_for_journal()
+    pool_after = db.get_pool_stats()
+
+    latencies = {step: [s for o in officers for s in o.latencies[step]] for step in STEPS}
+    reruns = [s for step in STEPS for s in latencies[step]]
+    errors = {}
+    for officer in officers:
+        for kind, n in officer.errors.items():
+            errors[kind] = errors.get(kind, 0) + n
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "workflows": sum(o.workflows for o in officers),
+        "reruns": len(reruns),
+        "reruns_per_s": len(reruns) / elapsed,
+        "workflows_per_min": sum(o.workflows for o in officers) / elapsed * 60,
+        "p50_ms": percentile(reruns, 0.50) * 1e3,
+        "p95_ms": percentile(reruns, 0.95) * 1e3,
+        "p99_ms": percentile(reruns, 0.99) * 1e3,
+        "step_p95_ms": {step: percentile(v, 0.95) * 1e3 for step, v in latencies.items() if v},
+        "step_median_ms": {step: statistics.median(v) * 1e3 for step, v in latencies.items() if v},
+        "errors": errors,
+        "error_rate": sum(errors.values()) / max(len(reruns), 1),
+        "peak_connections": counter.peak,
+        "server_threads_peak": server_peak[0],
+        "pool_retries": pool_after["retries"] - pool_before["retries"],
+        "pool_failures": pool_after["failures"] - pool_before["failures"],
+        "pool_max_wait_ms": pool_after["max_wait_ms"],
+        "journal_drain_s": drain,
+        "journal_failed": journal.journal_counts()["failed"],
+    }
+
+
+def print_level(r):
+    steps = "  ".join(f"{step} {ms:,.0f}" for step, ms in r["step_p95_ms"].items())
+    errors = ", ".join(f"{kind} {n}" for kind, n in sorted(r["errors"].items())) or "none"
+    drain = "did not drain" if r["journal_drain_s"] is None else f"{r['journal_drain_s']:.1f}s"
+    server = "" if r["server_threads_peak"] is None else f", server threads peak {r['server_threads_peak']}"
+    print(
+        f"{r['sessions']:>8} {r['workflows_per_min']:>10.1f} {r['reruns_per_s']:>9.1f} "
+        f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['p99_ms']:>8.0f} {r['error_rate']:>7.2%} {r['peak_connections']:>6}"
+    )
+    print(f"{'':>8} p95 by step (ms): {steps}")
+    print(
+        f"{'':>8} errors: {errors}; pool retries {r['pool_retries']}, failures {r['pool_failures']}, "
+        f"max wait {r['pool_max_wait_ms']:.0f} ms{server}; journal drained in {drain}, {r['journal_failed']} failed"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=60, help="per concurrency level")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds between interactions (0: none)")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a rerun counts as timed out")
+    parser.add_argument("--rows", type=int, default=20_000, help="applicants seeded before the first level")
+    parser.add_argument("--mysql", action="store_true")
+    parser.add_argument("--mysql-database", default="portal_bench")
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    # AppTest re-applies logger.level on every run
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    warnings.simplefilter("ignore")
+    if args.mysql:
+        if db.DB_CONFIG["host"] not in LOCAL_HOSTS:
+            parser.error(f"--mysql needs a local server; PORTAL_DB_HOST is {db.DB_CONFIG['host']}")
+        seed_mysql(args.rows, args.mysql_database)
+    else:
+        use_standin(args.rows)
+    counter = ConnectionCounter()
+    # Every officer deletes different seeded rows
+    delete_ids = SharedIds()
+
+    print(f"{'backend: MySQL ' + args.mysql_database if args.mysql else 'backend: SQLite stand-in'}, "
+          f"{args.rows:,} rows, {args.seconds:g}s per level, think {args.think:g}s, pool size {db.POOL_SIZE}")
+    print(f"{'sessions':>8} {'wf/min':>10} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'conns':>6}")
+    results = []
+    for sessions in args.sessions:
+        result = run_level(sessions, args, counter, delete_ids, args.mysql)
+        print_level(result)
+        results.append(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cost of the timing spans (metrics.py) on a full rerun.
+
+Fills in the form through AppTest (SQLite stand-in, see standin.py), then
+times --edits reruns of one field edit with metrics on and off, alternating
+so both see the same caches. It also reports how many spans a rerun records
+and what one span costs on its own, and ends with the /metrics text.
+
+    python benchmarks/metrics_overhead.py --edits 40
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import metrics  # noqa: E402
+import appflow  # noqa: E402
+from standin import use_standin  # noqa: E402
+
+
+def span_count():
+    with metrics._lock:
+        return sum(h[2] for h in metrics._histograms.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--edits", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")
+    use_standin(args.rows)
+    at = appflow.fill_evaluation(appflow.fill_applicant(appflow.new_session(), "35202-9999999-1"))
+
+    timings = {True: [], False: []}
+    spans_per_rerun = []
+    for i in range(args.edits * 2):
+        metrics.ENABLED = i % 2 == 0
+        before = span_count()
+        appflow.text_input(at, "First Name").input(f"Ali {i}")
+        start = time.perf_counter()
+        at.run()
+        timings[metrics.ENABLED].append(time.perf_counter() - start)
+        if metrics.ENABLED:
+            spans_per_rerun.append(span_count() - before)
+
+    metrics.ENABLED = True
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.span("overhead"):
+            pass
+    per_span = (time.perf_counter() - start) / n
+
+    on, off = statistics.median(timings[True]), statistics.median(timings[False])
+    spans = statistics.median(spans_per_rerun)
+    print(f"rerun, metrics off   {off * 1e3:8.2f} ms (median of {len(timings[False])})")
+    print(f"rerun, metrics on    {on * 1e3:8.2f} ms ({(on - off) / off:+.2%}, within run-to-run noise)")
+    print(f"spans per rerun      {spans:8.0f}")
+    print(f"one span             {per_span * 1e6:8.2f} us -> {spans * per_span / off:.3%} of a rerun")
+    print()
+    print(metrics.render_prometheus())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+-- `data` table for a local MySQL/MariaDB benchmark database, as the portal
+-- expects it after migrations 001-004 and 006. Used by standin.seed_mysql(); never
+-- run this against the production database.
+
+-- migrations/005 (portfolio summary) and 007 (change tracking) are applied
+-- after the rows are loaded.
+
+DROP TABLE IF EXISTS data;
+DROP TABLE IF EXISTS portfolio_summary;
+DROP TABLE IF EXISTS data_deleted;
+DROP PROCEDURE IF EXISTS portfolio_summary_apply;
+
+CREATE TABLE data (
+    id                     INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    applicant_type         VARCHAR(20),
+    name                   VARCHAR(255),
+    cnic                   VARCHAR(15) NOT NULL,
+    license_no             VARCHAR(32),
+    phone_number           VARCHAR(11),
+    gender                 CHAR(1),
+    guarantors             VARCHAR(3),
+    female_guarantor       VARCHAR(3),
+    electricity_bill       VARCHAR(3),
+    pdc_option             VARCHAR(3),
+    education              VARCHAR(64),
+    occupation             VARCHAR(128),
+    designation            VARCHAR(128),
+    employer_name          VARCHAR(255),
+    employer_contact       VARCHAR(11),
+    address                VARCHAR(512),
+    city                   VARCHAR(128),
+    state_province         VARCHAR(128),
+    postal_code            VARCHAR(16),
+    country                VARCHAR(64),
+    net_salary             DECIMAL(12, 2),
+    applicant_bank_balance DECIMAL(14, 2),
+    guarantor_bank_balance DECIMAL(14, 2),
+    employer_type          VARCHAR(32),
+    age                    INT,
+    residence              VARCHAR(16),
+    bike_type              VARCHAR(16),
+    bike_price             DECIMAL(12, 2),
+    down_payment           DECIMAL(12, 2),
+    tenure                 INT,
+    emi                    DECIMAL(12, 2),
+    outstanding            DECIMAL(14, 2),
+    salary_consistency     TINYINT UNSIGNED,
+    job_years              SMALLINT UNSIGNED,
+    dependents             SMALLINT UNSIGNED,
+    tax_return             VARCHAR(3),
+    decision               VARCHAR(16),
+    rules_version          VARCHAR(32),
+    UNIQUE KEY uq_data_cnic (cnic),
+    KEY idx_data_decision_id (decision, id),
+    KEY idx_data_city_id (city, id),
+    KEY idx_data_applicant_type_id (applicant_type, id),
+    KEY idx_data_bike_type_id (bike_type, id),
+    KEY idx_data_phone_number (phone_number)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
@@ -0,0 +1,129 @@
+"""
+Scoring service throughput and latency.
+
+Starts `uvicorn scoring_service:app` with --workers N on a free local port,
+then keeps --concurrency requests in flight for --seconds against
+POST /score and POST /score:batch (with --batch applicants per request),
+and reports requests/s, applicants/s and p50/p99 latency.
+
+    python benchmarks/service_load.py --workers 4 --concurrency 64 --batch 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scoring import EMPLOYER_TYPE_SCORES, FINANCING_PLANS, RESIDENCE_SCORES  # noqa: E402
+
+
+def applicant(rnd, i):
+    return {
+        "reference": str(i),
+        "applicant_type": rnd.choice(["Employee", "Businessman"]),
+        "gender": rnd.choice(["M", "F"]),
+        "net_salary": rnd.randrange(30000, 250000, 500),
+        "applicant_bank_balance": rnd.randrange(0, 300000, 100),
+        "guarantor_bank_balance": rnd.choice([None, rnd.randrange(0, 400000, 100)]),
+        "financing_plan": rnd.choice(list(FINANCING_PLANS)),
+        "salary_consistency": rnd.randrange(0, 7),
+        "employer_type": rnd.choice(list(EMPLOYER_TYPE_SCORES)),
+        "job_years": rnd.randrange(0, 15),
+        "age": rnd.randrange(18, 70),
+        "dependents": rnd.randrange(0, 6),
+        "residence": rnd.choice(list(RESIDENCE_SCORES)),
+        "outstanding": rnd.randrange(0, 500000, 1000),
+        "tax_return": rnd.choice(["Yes", "No"]),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scoring_service:app", "--workers", str(workers),
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("scoring service did not start")
+
+
+async def load(url, bodies, concurrency, seconds):
+    """ Keep `concurrency` requests in flight for `seconds`; returns the latencies """
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post(url, json=bodies[i % len(bodies)])
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=1000, help="applicants per /score:batch request")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    singles = [applicant(rnd, i) for i in range(1000)]
+    batches = [[applicant(rnd, i) for i in range(args.batch)] for _ in range(8)]
+
+    port = free_port()
+    server = start_server(args.workers, port)
+    try:
+        print(f"{args.workers} workers, {args.concurrency} concurrent requests, {args.seconds:g}s each")
+        print(f"{'endpoint':>18} {'requests':>9} {'req/s':>9} {'applicants/s':>13} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, path, bodies, per in [
+            ("/score", "/score", singles, 1),
+            (f"/score:batch x{args.batch}", "/score:batch", batches, args.batch),
+        ]:
+            latencies = asyncio.run(load(f"http://127.0.0.1:{port}{path}", bodies, args.concurrency, args.seconds))
+            rate = len(latencies) / args.seconds
+            print(
+                f"{name:>18} {len(latencies):>9,} {rate:>9.1f} {rate * per:>13,.0f} "
+                f"{percentile(latencies, 0.50) * 1e3:>9.1f} {percentile(latencies, 0.99) * 1e3:>9.1f}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
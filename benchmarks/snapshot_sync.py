@@ -0,0 +1,110 @@
+"""
+Local snapshot (snapshot.py): what a delta sync costs against a full read.
+
+For each --rows table it times the first (full) sync, then --changes rounds
+of that many updates, inserts and deletes, each followed by one delta sync,
+and finally fetch_all_applicants() from the database and from the snapshot.
+"rows over the wire" counts the result rows each read pulls from the
+server: a direct read pulls the whole table, a sync pulls the (id,
+updated_at) pairs of its overlap window plus the changed rows. The database
+is the SQLite stand-in unless --mysql is given (see suite.py), so the
+timings leave out the WAN latency the snapshot exists to avoid.
+
+    python benchmarks/snapshot_sync.py --rows 10000 100000 --changes 0 10 100 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import snapshot  # noqa: E402
+from db import APPLICANT_COLUMNS  # noqa: E402
+from scoring import RULES_VERSION  # noqa: E402
+from standin import seed_mysql, synthetic_applicants, use_standin  # noqa: E402
+
+
+def timed(fn, repeat=1):
+    seconds, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return result, statistics.median(seconds)
+
+
+def apply_changes(n, fresh, rnd):
+    """ `n` writes: half updates, a third inserts, the rest deletes """
+    store = db.get_storage()
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(id), MAX(id) FROM data")
+        low, high = cursor.fetchone()
+        for i in range(n):
+            row_id = rnd.randint(low, high)
+            if i % 6 < 3:
+                store.set_decision(cursor, rnd.choice(["Approved", "Review", "Reject"]), RULES_VERSION, [row_id])
+            elif i % 6 < 5:
+                store.insert(cursor, APPLICANT_COLUMNS, [next(fresh)])
+            else:
+                store.delete(cursor, ids=[row_id])
+        conn.commit()
+        cursor.close()
+    db.bump_data_version()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--changes", type=int, nargs="+", default=[0, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mysql", action="store_true")
+    parser.add_argument("--mysql-database", default="portal_bench")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    # Rounds run back to back; a short overlap keeps earlier rounds out of each window
+    snapshot.SYNC_OVERLAP = timedelta(seconds=1)
+    rnd = random.Random(0)
+
+    print(f"{'rows':>9} {'step':<28} {'ms':>9} {'rows over the wire':>19}")
+    for rows in args.rows:
+        if args.mysql:
+            seed_mysql(rows, args.mysql_database)
+        else:
+            use_standin(rows)
+        fresh = iter(list(synthetic_applicants(rows + sum(args.changes), seed=1))[rows:])
+        snapshot.SNAPSHOT_DIR = tempfile.mkdtemp()
+        time.sleep(1.1)
+
+        manifest, seconds = timed(snapshot.sync)
+        print(f"{rows:>9,} {'full sync':<28} {seconds * 1e3:>9.1f} {manifest['last_sync']['checked']:>19,}")
+        for n in args.changes:
+            apply_changes(n, fresh, rnd)
+            manifest, seconds = timed(snapshot.sync)
+            last = manifest["last_sync"]
+            wire = last["checked"] + last["changed"]
+            print(f"{rows:>9,} {f'delta sync, {n:,} writes':<28} {seconds * 1e3:>9.1f} {wire:>19,}")
+            time.sleep(1.1)
+
+        directory, snapshot.SNAPSHOT_DIR = snapshot.SNAPSHOT_DIR, ""
+        frame, seconds = timed(db.fetch_all_applicants.__wrapped__, args.repeat)
+        print(f"{rows:>9,} {'fetch_all, DB':<28} {seconds * 1e3:>9.1f} {len(frame):>19,}")
+        snapshot.SNAPSHOT_DIR = directory
+        snapshot.ensure_fresh()
+        frame, seconds = timed(db.fetch_all_applicants.__wrapped__, args.repeat)
+        print(f"{rows:>9,} {'fetch_all, snapshot':<28} {seconds * 1e3:>9.1f} {0:>19,}")
+        snapshot.print_status(snapshot.snapshot_status())
+        print()
+
+
+if __name__ == "__main__":
+    main()
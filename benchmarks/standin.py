@@ -0,0 +1,140 @@
+"""
+Local databases for the benchmarks.
+
+By default the portal is switched to its SQLite backend (storage.py) on a
+scratch file, so its own queries run unchanged without a server.
+seed_mysql() instead fills a scratch database on a local MySQL/MariaDB
+server (never the production one).
+"""
+import os
+import random
+import sqlite3
+
+import db
+import storage
+from db import APPLICANT_COLUMNS
+from portfolio import AGGREGATE_SQL, SUMMARY_COLUMNS
+from scoring import FINANCING_PLANS, RULES_VERSION
+from storage import SQLiteConnection, create_sqlite_schema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# For the benchmarks that open stand-in connections themselves
+StandinConnection = SQLiteConnection
+
+
+def synthetic_applicants(n, seed=0):
+    """ `n` plausible applicant rows in APPLICANT_COLUMNS order """
+    rnd = random.Random(seed)
+    cities = ["Lahore", "Karachi", "Islamabad", "Faisalabad", "Multan", "Peshawar"]
+    for i in range(n):
+        plan = FINANCING_PLANS[rnd.choice(list(FINANCING_PLANS))]
+        cnic = f"{35202 + i % 7}{i:07d}{i % 10}"
+        yield (
+            rnd.choice(["Employee", "Businessman"]), f"Applicant {i}", cnic, f"{cnic}#{i % 1000}",
+            f"03{rnd.randrange(10**9):09d}", rnd.choice(["M", "F"]),
+            "Yes", "Yes", "Yes", rnd.choice(["Yes", "No"]),
+            "Bachelor's", "Engineer", "Officer", "Acme Ltd", f"04{rnd.randrange(10**9):09d}",
+            f"{i} Main Street, Block {i % 26}", rnd.choice(cities), "Punjab", "54000", "Pakistan",
+            rnd.randrange(30000, 250000, 500), rnd.randrange(0, 300000, 100), rnd.choice([None, rnd.randrange(0, 400000, 100)]),
+            rnd.choice(["Govt", "MNC", "Private Limited", "SME", "Startup", "Self-employed"]),
+            rnd.randrange(18, 70), rnd.choice(["Owned", "Family", "Rented", "Temporary"]),
+            rnd.choice(["EV-1", "EV-125"]), plan["upfront"] + plan["installment"] * plan["tenure"],
+            plan["upfront"], plan["tenure"], plan["installment"], rnd.randrange(0, 500000, 1000),
+            rnd.randrange(0, 7), rnd.randrange(0, 15), rnd.randrange(0, 6), rnd.choice(["Yes", "No"]),
+            rnd.choice(["Approved", "Review", "Reject"]), RULES_VERSION,
+        )
+
+
+def create_standin(path, rows=5):
+    """
+    Create the SQLite backend's schema at `path` with `rows` synthetic applicants:
+    loaded before the triggers exist and aggregated once, as `python portfolio.py
+    rebuild` does after migration 005
+    """
+    create_sqlite_schema(path, triggers=False)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        f"INSERT INTO data ({', '.join(APPLICANT_COLUMNS)}) VALUES ({', '.join(['?'] * len(APPLICANT_COLUMNS))})",
+        synthetic_applicants(rows),
+    )
+    conn.execute(f"INSERT INTO portfolio_summary ({', '.join(SUMMARY_COLUMNS)}) {AGGREGATE_SQL}")
+    conn.commit()
+    conn.close()
+    create_sqlite_schema(path)
+
+
+def _mysql_statements(text):
+    """ Statements of a .sql file, honouring the mysql client's DELIMITER lines """
+    statements, current, delimiter = [], [], ";"
+    for line in text.splitlines():
+        if line.strip().upper().startswith("DELIMITER "):
+            delimiter = line.split()[1]
+            continue
+        if line.strip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(delimiter):
+            current[-1] = line.rstrip()[:-len(delimiter)]
+            statements.append("\n".join(current))
+            current = []
+    statements.append("\n".join(current))
+    return [s for s in statements if s.strip()]
+
+
+def use_standin(rows, directory=None):
+    """ Seed a fresh SQLite stand-in with `rows` applicants and point db.py at it """
+    import tempfile
+
+    path = os.path.join(directory or tempfile.mkdtemp(), "standin.sqlite")
+    create_standin(path, rows)
+    storage.BACKEND, storage.SQLITE_PATH = "sqlite", path
+    db.get_storage.clear()
+    return path
+
+
+def seed_mysql(rows, database="portal_bench", batch=5000):
+    """
+    Recreate `data` in a scratch database on the server configured by PORTAL_DB_*
+    and fill it with `rows` applicants. db.py is pointed at that database.
+    """
+    import mysql.connector
+
+    if database == "ev_installment_project":
+        raise ValueError("Refusing to seed the production database")
+    config = dict(db.DB_CONFIG, database=None)
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    cursor.execute(f"USE `{database}`")
+    with open(os.path.join(ROOT, "benchmarks", "mysql_schema.sql"), encoding="utf-8") as f:
+        for statement in _mysql_statements(f.read()):
+            cursor.execute(statement)
+
+    # MySQL's dialect, without opening the portal's pool
+    dialect = storage.SQLStorage()
+    pending = []
+    for row in synthetic_applicants(rows):
+        pending.append(row)
+        if len(pending) == batch:
+            dialect.insert(cursor, APPLICANT_COLUMNS, pending)
+            conn.commit()
+            pending = []
+    if pending:
+        dialect.insert(cursor, APPLICANT_COLUMNS, pending)
+        conn.commit()
+
+    # Summary triggers and change tracking after the bulk load, then one aggregate
+    for migration in ("005_portfolio_summary.sql", "007_change_tracking.sql"):
+        with open(os.path.join(ROOT, "migrations", migration), encoding="utf-8") as f:
+            for statement in _mysql_statements(f.read()):
+                cursor.execute(statement)
+    cursor.execute(f"INSERT INTO portfolio_summary ({', '.join(SUMMARY_COLUMNS)}) {AGGREGATE_SQL}")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    db.DB_CONFIG["database"] = database
+    storage.BACKEND = "mysql"
+    db.get_storage.clear()
@@ -0,0 +1,289 @@
+"""
+Benchmark suite: scoring, persistence and full-page reruns.
+
+Times the hot paths of the portal and writes the results as JSON, one file
+per commit, so regressions between commits can be compared:
+
+  scoring.scalar[n]       the Results tab's nine factor functions + final_decision, per applicant
+  scoring.frame[n]        score_frame() over n applicants at once
+  scoring.whatif[n]       the Results tab's what-if panel: qualifying_values() + an n-point
+                          salary × balance × outstanding grid per plan (whatif.py)
+  db.save_to_db[rows]     one applicant INSERT into a table of `rows` applicants
+  db.fetch_all[rows]      fetch_all_applicants() with the shared cache bypassed
+  db.first_page[rows]     fetch_applicants_page() + count_applicants(), no filters
+  portfolio.summary[rows] the Portfolio tab's read of the trigger-maintained summary
+  portfolio.rebuild[rows] rebuild_portfolio_summary(): the full-scan reconciliation
+  cashflow.project[rows]  project_cashflows(): 36-month schedules of every stored contract
+  export.<fmt>[rows]      export_applicants() for each --export-formats
+  app.cold_landing        fresh process: first paint of the landing page (cold_start.py)
+  app.cold_tabs           fresh process: first run of the tabs, 2 s after the landing page
+  app.first_run           AppTest: open the portal and start an application
+  app.rerun               AppTest: one edit on the filled-in form (full script rerun)
+
+The database is the SQLite stand-in unless --mysql is given, in which case a
+scratch database on the server configured by PORTAL_DB_* is seeded instead.
+Only the stand-in has been run so far: there are no recorded MySQL figures
+for insert throughput (db.save_to_db, bulk import) or for browsing at 1M
+rows (db.first_page), so stand-in timings must not be quoted for MySQL.
+
+    python benchmarks/suite.py run
+    python benchmarks/suite.py run --mysql --rows 10000 100000 1000000
+    python benchmarks/suite.py compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import cashflow  # noqa: E402
+import db  # noqa: E402
+import portfolio  # noqa: E402
+import scoring  # noqa: E402
+import whatif  # noqa: E402
+from export import export_applicants, EXPORT_FORMATS  # noqa: E402
+from standin import seed_mysql, synthetic_applicants, use_standin  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Stop repeating a case once it has used this much time (after at least one run)
+CASE_BUDGET_SECONDS = 10.0
+
+
+def measure(fn, repeat, per=1):
+    """ Run `fn` up to `repeat` times; seconds per run (divided by `per` items) """
+    times = []
+    spent = 0.0
+    while len(times) < repeat and (not times or spent < CASE_BUDGET_SECONDS):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        times.append(elapsed / per)
+    return {
+        "runs": len(times),
+        "per": per,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+    }
+
+
+def report(results, name, result):
+    results[name] = result
+    print(f"{name:<32} {result['median_s'] * 1e3:>12.3f} ms  (min {result['min_s'] * 1e3:.3f}, runs {result['runs']})")
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def scoring_frame(n, seed=1):
+    """ n applicants with every input the Results tab scores on """
+    return pd.DataFrame(list(synthetic_applicants(n, seed)), columns=db.APPLICANT_COLUMNS)
+
+
+def score_scalar(records):
+    for r in records:
+        inc = scoring.income_score(r["net_salary"], r["gender"])
+        bal, _ = scoring.bank_balance_score_custom(r["applicant_bank_balance"], r["guarantor_bank_balance"], r["emi"])
+        dti, _ = scoring.dti_score(r["outstanding"], r["emi"], r["net_salary"], r["tenure"])
+        scoring.final_decision(
+            {
+                "income": inc, "bank_balance": bal,
+                "salary_consistency": scoring.salary_consistency_score(r["salary_consistency"]),
+                "employer_type": scoring.employer_type_score(r["employer_type"]),
+                "job_tenure": scoring.job_tenure_score(r["job_years"]),
+                "age": scoring.age_score(r["age"]),
+                "dependents": scoring.dependents_score(r["dependents"]),
+                "residence": scoring.residence_score(r["residence"]),
+                "dti": dti,
+            },
+            r["applicant_type"], r["tax_return"],
+        )
+
+
+def bench_scoring(results, sizes, repeat):
+    for n in sizes:
+        frame = scoring_frame(n)
+        records = frame.to_dict("records")
+        report(results, f"scoring.scalar[{n}]", measure(lambda: score_scalar(records), repeat, per=n))
+        report(results, f"scoring.frame[{n}]", measure(lambda: scoring.score_frame(frame), repeat))
+    applicant = scoring_frame(1).to_dict("records")[0]
+    for n in (1000, 8000, 27000):
+        axis = np.linspace(0, 300_000, round(n ** (1 / 3)))
+        report(results, f"scoring.whatif[{n}]", measure(
+            lambda: (whatif.qualifying_values(applicant), whatif.what_if_grid(applicant, axis, axis, axis)), repeat,
+        ))
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def new_applicants():
+    """ Form-shaped applicants with CNICs outside the seeded range """
+    i = 0
+    while True:
+        i += 1
+        yield {
+            "applicant_type": "Employee", "first_name": "Bench", "last_name": str(i),
+            "cnic": f"99999{i:07d}1", "license_no": f"99999-{i:07d}-1#0",
+            "phone_number": "03001234567", "gender": "M",
+            "guarantors": "Yes", "female_guarantor": "Yes", "electricity_bill": "Yes", "pdc_option": "Yes",
+            "street_address": "1 Main Street", "area_address": "Block A",
+            "city": "Lahore", "state_province": "Punjab", "postal_code": "54000", "country": "Pakistan",
+            "net_salary": 120000, "applicant_bank_balance": 90000, "guarantor_bank_balance": None,
+            "employer_type": "MNC", "age": 30, "residence": "Owned",
+            "bike_type": "EV-1", "bike_price": 300000, "down_payment": 100000, "tenure": 24,
+            "emi": 10000, "outstanding": 0, "decision": "Approved", "rules_version": scoring.RULES_VERSION,
+        }
+
+
+def bench_persistence(results, sizes, formats, repeat, mysql_database=None):
+    applicants = new_applicants()
+    with warnings.catch_warnings():
+        # st.cache_data outside a running app
+        warnings.simplefilter("ignore")
+        for rows in sizes:
+            if mysql_database:
+                seed_mysql(rows, mysql_database)
+            else:
+                use_standin(rows)
+
+            report(results, f"db.save_to_db[{rows}]", measure(lambda: db.save_to_db(next(applicants)), repeat))
+            report(results, f"db.fetch_all[{rows}]", measure(db.fetch_all_applicants.__wrapped__, repeat))
+            report(results, f"db.first_page[{rows}]", measure(
+                lambda: (db.fetch_applicants_page.__wrapped__({}), db.count_applicants.__wrapped__({})), repeat,
+            ))
+            report(results, f"portfolio.summary[{rows}]", measure(portfolio.fetch_portfolio_summary.__wrapped__, repeat))
+            report(results, f"portfolio.rebuild[{rows}]", measure(portfolio.rebuild_portfolio_summary, repeat))
+            report(results, f"cashflow.project[{rows}]", measure(cashflow.project_cashflows, repeat))
+            for fmt in formats:
+                report(results, f"export.{fmt.lower()}[{rows}]", measure(lambda: export_applicants(fmt).close(), repeat))
+
+
+# -----------------------------
+# Full-page reruns
+# -----------------------------
+def bench_app(results, repeat, mysql_database=None):
+    import appflow
+    from cold_start import measure_cold_start
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")
+    if mysql_database:
+        seed_mysql(1000, mysql_database)
+    else:
+        use_standin(1000)
+
+    samples, _ = measure_cold_start(runs=max(1, repeat // 2), think=2.0)
+    for step, seconds in samples.items():
+        report(results, f"app.cold_{step}", {
+            "runs": len(seconds), "per": 1, "median_s": statistics.median(seconds),
+            "min_s": min(seconds), "max_s": max(seconds),
+        })
+    report(results, "app.first_run", measure(appflow.new_session, max(1, repeat // 2)))
+
+    at = appflow.fill_evaluation(appflow.fill_applicant(appflow.new_session(), "35202-9999999-1"))
+    edits = iter(range(10**6))
+
+    def edit():
+        appflow.text_input(at, "First Name").input(f"Ali {next(edits)}")
+        at.run()
+
+    report(results, "app.rerun", measure(edit, repeat * 4))
+
+
+# -----------------------------
+# Results
+# -----------------------------
+def git_commit():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return commit + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def run(args):
+    results = {}
+    if "scoring" in args.only:
+        bench_scoring(results, args.applicants, args.repeat)
+    if "db" in args.only:
+        bench_persistence(results, args.rows, args.export_formats, args.repeat, args.mysql and args.mysql_database)
+    if "app" in args.only:
+        bench_app(results, args.repeat, args.mysql and args.mysql_database)
+
+    commit = git_commit()
+    out = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "backend": "mysql" if args.mysql else "sqlite-standin",
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+def compare(args):
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{'case':<32} {old['commit']:>12} {new['commit']:>12} {'change':>8}")
+    regressions = 0
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["median_s"], result["median_s"]
+        change = after / before - 1 if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  << slower"
+            regressions += 1
+        print(f"{name:<32} {before * 1e3:>10.3f}ms {after * 1e3:>10.3f}ms {change:>+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the suite and save the results as JSON")
+    run_parser.add_argument("--only", nargs="+", default=["scoring", "db", "app"], choices=["scoring", "db", "app"])
+    run_parser.add_argument("--applicants", type=int, nargs="+", default=[1, 1000, 100_000])
+    run_parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    run_parser.add_argument("--export-formats", nargs="*", default=["Excel"], choices=list(EXPORT_FORMATS))
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--mysql", action="store_true", help="seed a scratch MySQL/MariaDB database instead of SQLite")
+    run_parser.add_argument("--mysql-database", default="portal_bench")
+    run_parser.add_argument("--output", help=f"results file (default {os.path.relpath(RESULTS_DIR, ROOT)}/<commit>.json)")
+
+    compare_parser = sub.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="flag cases slower by more than this")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import time
+
+import pandas as pd
+
+from db import db_connection, insert_applicants
+from scoring import (
+    validate_cnic, validate_phone, normalize_cnic, score_frame,
+    EMPLOYER_TYPE_SCORES, RESIDENCE_SCORES, FINANCING_PLANS,
+)
+
+
+# -----------------------------
+# Import File Layout
+# -----------------------------
+IMPORT_CHUNK_SIZE = 1000
+
+REQUIRED_TEXT = [
+    "applicant_type", "first_name", "last_name", "cnic", "phone_number", "gender",
+    "guarantors", "female_guarantor", "electricity_bill", "pdc_option",
+    "street_address", "area_address", "city", "state_province", "country",
+    "employer_type", "residence", "bike_type", "financing_plan",
+]
+OPTIONAL_TEXT = [
+    "license_suffix", "education", "occupation", "designation",
+    "employer_name", "employer_contact", "postal_code", "tax_return",
+]
+REQUIRED_NUMBERS = [
+    "net_salary", "applicant_bank_balance", "salary_consistency",
+    "age", "job_years", "dependents", "outstanding",
+]
+OPTIONAL_NUMBERS = ["guarantor_bank_balance"]
+
+IMPORT_COLUMNS = REQUIRED_TEXT + OPTIONAL_TEXT + REQUIRED_NUMBERS + OPTIONAL_NUMBERS
+
+# Same choices the form offers
+CHOICES = {
+    "applicant_type": ["Employee", "Businessman"],
+    "gender": ["M", "F"],
+    "pdc_option": ["Yes", "No"],
+    "employer_type": list(EMPLOYER_TYPE_SCORES),
+    "residence": list(RESIDENCE_SCORES),
+    "bike_type": ["EV-1", "EV-125"],
+    "financing_plan": list(FINANCING_PLANS),
+}
+# Same bounds as the form's number inputs
+RANGES = {
+    "salary_consistency": (0, 6),
+    "age": (18, 70),
+    "job_years": (0, None),
+    "dependents": (0, None),
+    "outstanding": (0, None),
+}
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def read_chunks(file, filename: str, chunksize: int = IMPORT_CHUNK_SIZE):
+    """ Yield the upload as DataFrames of `chunksize` rows, every cell as text """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        yield from _read_excel_chunks(file, chunksize)
+    else:
+        yield from pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunksize)
+
+
+def _read_excel_chunks(file, chunksize):
+    from openpyxl import load_workbook  # only needed for Excel uploads
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = ["" if h is None else str(h).strip() for h in next(rows, ())]
+        batch = []
+        for values in rows:
+            batch.append(["" if v is None else str(v) for v in values[:len(header)]])
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+def _number(value):
+    try:
+        num = float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+    return int(num) if num.is_integer() else num
+
+
+def _check_row(row: dict):
+    """ Parse one row in place; returns the reason it cannot be imported, or None """
+    for col in REQUIRED_TEXT:
+        if not row[col]:
+            return f"Missing {col}"
+    for col, options in CHOICES.items():
+        if row[col] not in options:
+            return f"Invalid {col} '{row[col]}'"
+
+    if not validate_cnic(row["cnic"]):
+        return "Invalid CNIC format. Use XXXXX-XXXXXXX-X"
+    if not validate_phone(row["phone_number"]):
+        return "Invalid Phone Number - exactly 11 digits required"
+    if row["employer_contact"] and not validate_phone(row["employer_contact"]):
+        return "Invalid Employer Contact - exactly 11 digits required"
+    if row["guarantors"] != "Yes":
+        return "Application Rejected: No guarantor available"
+    if row["female_guarantor"] != "Yes":
+        return "Application Rejected: At least one female guarantor is required"
+    if row["electricity_bill"] != "Yes":
+        return "Application Rejected: Electricity bill not available"
+
+    for col in REQUIRED_NUMBERS + OPTIONAL_NUMBERS:
+        if not row[col] and col in OPTIONAL_NUMBERS:
+            row[col] = None
+            continue
+        row[col] = _number(row[col])
+        if row[col] is None:
+            return f"Invalid number in {col}"
+    for col, (low, high) in RANGES.items():
+        if row[col] < low or (high is not None and row[col] > high):
+            return f"{col} out of range"
+    if row["net_salary"] <= 0:
+        return "net_salary must be greater than 0"
+
+    suffix = _number(row["license_suffix"] or 0)
+    if suffix is None or not 0 <= suffix <= 999:
+        return "Invalid license_suffix (0-999)"
+
+    plan = FINANCING_PLANS[row["financing_plan"]]
+    row["license_no"] = f"{row['cnic']}#{suffix}"
+    row["cnic"] = normalize_cnic(row["cnic"])
+    row["tax_return"] = row["tax_return"] or "Yes"
+    row["down_payment"] = plan["upfront"]
+    row["emi"] = plan["installment"]
+    row["tenure"] = plan["tenure"]
+    row["bike_price"] = plan["upfront"] + plan["installment"] * plan["tenure"]
+    return None
+
+
+def prepare_chunk(chunk: pd.DataFrame, first_row: int, seen_cnics: set):
+    """
+    Validate and score one chunk.
+    Returns (records ready for insert, rejected rows); row numbers match the spreadsheet (header = row 1).
+    """
+    records, rejected = [], []
+    rows = chunk.reindex(columns=IMPORT_COLUMNS, fill_value="").to_dict("records")
+    for offset, row in enumerate(rows):
+        row = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+        row["row"] = first_row + offset + 2
+        reason = _check_row(row)
+        if reason is None and row["cnic"] in seen_cnics:
+            reason = "Duplicate CNIC within the file"
+        if reason:
+            rejected.append({"row": row["row"], "cnic": row["cnic"], "reason": reason})
+            continue
+        seen_cnics.add(row["cnic"])
+        records.append(row)
+
+    if records:
+        scored = score_frame(pd.DataFrame(records))
+        accepted = []
+        for record, decision, version in zip(records, scored["decision"], scored["rules_version"]):
+            if decision == "Rejected":
+                rejected.append({"row": record["row"], "cnic": record["cnic"],
+                                 "reason": "Rejected: No evidence of tax return provided"})
+                continue
+            record["decision"] = str(decision)
+            record["rules_version"] = version
+            accepted.append(record)
+        records = accepted
+    return records, rejected
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def import_applicants(file, filename: str, chunksize: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Stream an uploaded CSV/Excel file into the `data` table.
+    Every chunk is validated, scored, checked for stored CNICs in one query and
+    inserted with executemany in its own transaction.
+    """
+    report = {"rows": 0, "inserted": 0, "rejected": [], "seconds": 0.0}
+    seen_cnics = set()
+    start = time.perf_counter()
+
+    with db_connection() as conn:
+        for chunk in read_chunks(file, filename, chunksize):
+            missing = [c for c in REQUIRED_TEXT + REQUIRED_NUMBERS if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"❌ Missing columns in file: {', '.join(missing)}")
+
+            records, rejected = prepare_chunk(chunk, report["rows"], seen_cnics)
+            report["rows"] += len(chunk)
+            if records:
+                duplicates = insert_applicants(conn, records)
+                report["inserted"] += len(records) - len(duplicates)
+                rejected += [
+                    {"row": r["row"], "cnic": r["cnic"], "reason": "CNIC already exists in the database"}
+                    for r in duplicates
+                ]
+            report["rejected"].extend(sorted(rejected, key=lambda r: r["row"]))
+
+    report["seconds"] = time.perf_counter() - start
+    return report
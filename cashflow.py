@@ -0,0 +1,244 @@
+import argparse
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import snapshot
+from db import shared_read, stream_applicants
+from metrics import span
+from scoring import FINANCING_PLANS
+
+
+# -----------------------------
+# Projection Settings
+# -----------------------------
+# Month-by-month instalment schedules of the stored book, summed into expected inflows:
+#   python cashflow.py --months 36 --by bike_type plan decision --out projection.xlsx
+# No disbursement dates or payments are stored, so every contract is projected
+# from its first instalment: month 1 is `start` (default: next month) for all of them.
+PROJECTION_MONTHS = 36
+PROJECTION_CHUNK_SIZE = 50_000
+PROJECTION_DIMENSIONS = ["bike_type", "plan", "decision"]
+# Per group and month, after the dimension columns
+PROJECTION_COLUMNS = ["month", "due_month", "contracts", "instalments", "inflow", "balance"]
+
+# What a schedule needs from `data` (the plan is recognised from its terms)
+CONTRACT_COLUMNS = ["bike_type", "decision", "bike_price", "down_payment", "tenure", "emi"]
+OTHER_PLAN = "Other"
+BLANK = "(blank)"
+
+PROJECTION_FORMATS = ["Excel", "CSV", "Parquet"]
+
+
+# -----------------------------
+# Schedules (vectorized over contracts)
+# -----------------------------
+def schedule_terms(financed, emi, tenure):
+    """
+    Every contract pays `emi` for `full` months and then `rest` in month full + 1.
+    The last instalment (month `tenure` at the latest) settles whatever is left,
+    so a contract always pays exactly `financed`: a plan whose EMIs overshoot
+    ends early with a smaller instalment, one that falls short ends with a larger one.
+    """
+    financed = np.maximum(np.asarray(financed, dtype=float), 0.0)
+    emi = np.asarray(emi, dtype=float)
+    last = np.asarray(tenure, dtype=float) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        full = np.where(emi > 0, np.minimum(last, np.floor(financed / emi)), last)
+    full = full.astype(np.int64)
+    return full, financed - emi * full
+
+
+def schedule(financed, emi, tenure, months: int) -> np.ndarray:
+    """ (contracts × months) instalment due in each month 1..months """
+    full, rest = schedule_terms(financed, emi, tenure)
+    month = np.arange(1, months + 1)
+    return (
+        np.where(month <= full[:, None], np.asarray(emi, dtype=float)[:, None], 0.0)
+        + np.where(month == full[:, None] + 1, rest[:, None], 0.0)
+    )
+
+
+def amortization(bike_price, down_payment, emi, tenure) -> pd.DataFrame:
+    """ One contract's schedule for the Results tab: instalment, total paid and balance per month """
+    financed = max(float(bike_price) - float(down_payment), 0.0)
+    due = schedule([financed], [emi], [tenure], int(tenure))[0]
+    paid = np.cumsum(due)
+    return pd.DataFrame({
+        "month": np.arange(1, int(tenure) + 1), "instalment": due, "paid": paid, "balance": financed - paid,
+    })
+
+
+def _grouped(codes, groups: int, months: int, financed, emi, full, rest) -> dict:
+    """
+    Per group and month 1..months: instalments due, inflow and contracts, without
+    a contracts × months matrix. Each contract adds `emi` to months 1..full
+    (a +emi / -emi step in a running sum) and `rest` to month full + 1;
+    anything past the horizon lands in a bucket that is dropped.
+    """
+    width = months + 2
+    size = groups * width
+    start = codes * width + 1
+    stop = codes * width + np.minimum(full + 1, months + 1)
+    settles = rest > 0
+
+    def monthly(step, single):
+        running = np.cumsum(
+            (np.bincount(start, step, size) - np.bincount(stop, step, size)).reshape(groups, width), axis=1
+        )
+        return (running + np.bincount(stop, single, size).reshape(groups, width))[:, 1:months + 1]
+
+    return {
+        "contracts": np.bincount(codes, minlength=groups),
+        "financed": np.bincount(codes, financed, groups),
+        "instalments": monthly((emi > 0).astype(float), settles.astype(float)),
+        "inflow": monthly(emi, np.where(settles, rest, 0.0)),
+    }
+
+
+# -----------------------------
+# Book projection (streamed in chunks)
+# -----------------------------
+def _plans(down_payment, tenure, emi) -> np.ndarray:
+    """ Plan name of each contract from its terms (OTHER_PLAN if no plan matches) """
+    plan = np.full(len(tenure), OTHER_PLAN, dtype=object)
+    for name, terms in FINANCING_PLANS.items():
+        plan[(down_payment == terms["upfront"]) & (tenure == terms["tenure"]) & (emi == terms["installment"])] = name
+    return plan
+
+
+def _contract_chunks(filters: dict, chunksize: int):
+    """
+    CONTRACT_COLUMNS as arrays, `chunksize` rows at a time. From the snapshot
+    the Arrow columns are used as they are, skipping stream_applicants()' row tuples.
+    """
+    if snapshot.SNAPSHOT_DIR:
+        for table in snapshot.iter_tables(CONTRACT_COLUMNS, filters, chunksize):
+            yield {
+                c: table[c].cast(pa.string()).to_numpy(zero_copy_only=False) if pa.types.is_dictionary(table[c].type)
+                else table[c].to_numpy()
+                for c in CONTRACT_COLUMNS
+            }
+        return
+    for rows in stream_applicants(filters, chunksize, CONTRACT_COLUMNS):
+        yield dict(zip(CONTRACT_COLUMNS, (np.array(values, dtype=object) for values in zip(*rows))))
+
+
+def _next_month(today: date) -> date:
+    return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+
+def project_cashflows(months: int = PROJECTION_MONTHS, by: list = None, filters: dict = None,
+                      start: date = None, chunksize: int = PROJECTION_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Expected instalment inflows of every stored contract for `months` months,
+    one row per group of `by` (bike_type / plan / decision) and month.
+    Rows are read `chunksize` at a time (from the snapshot when configured) and
+    each chunk is reduced to its group totals, so memory does not grow with the book.
+    Contracts without a usable tenure or EMI are left out and counted in attrs["skipped"].
+    """
+    by = list(PROJECTION_DIMENSIONS if by is None else by)
+    start = start or _next_month(date.today())
+    keys, totals, skipped = {}, [], 0
+
+    with span("cashflow.project"):
+        for values in _contract_chunks(filters, chunksize):
+            price, down, tenure, emi = (
+                values[c].astype(float) for c in ("bike_price", "down_payment", "tenure", "emi")
+            )
+            valid = (tenure >= 1) & (emi >= 0) & np.isfinite(price)
+            skipped += int((~valid).sum())
+            dims = {"bike_type": values["bike_type"], "decision": values["decision"], "plan": _plans(down, tenure, emi)}
+            # One code per combination of the `by` labels, numbered within this chunk
+            codes, levels = np.zeros(int(valid.sum()), dtype=np.int64), []
+            for d in by:
+                labels = dims[d][valid]
+                labels[pd.isna(labels)] = BLANK
+                level_codes, level = pd.factorize(labels)
+                codes = codes * len(level) + level_codes
+                levels.append(level)
+            combinations, codes = np.unique(codes, return_inverse=True)
+            positions = np.unravel_index(combinations, [len(level) for level in levels]) if levels else []
+
+            financed = np.maximum(price[valid] - np.nan_to_num(down[valid]), 0.0)
+            full, rest = schedule_terms(financed, emi[valid], tenure[valid])
+            chunk = _grouped(codes, len(combinations), months, financed, emi[valid], full, rest)
+
+            for i in range(len(combinations)):
+                key = tuple(level[position[i]] for level, position in zip(levels, positions))
+                if key not in keys:
+                    keys[key] = len(totals)
+                    totals.append({name: np.zeros_like(value[i], dtype=float) for name, value in chunk.items()})
+                group = totals[keys[key]]
+                for name, value in chunk.items():
+                    group[name] = group[name] + value[i]
+
+    ordered = sorted(keys, key=lambda k: tuple(map(str, k)))
+    month = np.arange(1, months + 1)
+    frames = []
+    for key in ordered:
+        group = totals[keys[key]]
+        frame = pd.DataFrame({d: [k] * months for d, k in zip(by, key)})
+        frame["month"] = month
+        frame["due_month"] = pd.period_range(start, periods=months, freq="M").astype(str)
+        frame["contracts"] = int(group["contracts"])
+        frame["instalments"] = group["instalments"].round().astype(int)
+        frame["inflow"] = group["inflow"]
+        frame["balance"] = group["financed"] - np.cumsum(group["inflow"])
+        frames.append(frame)
+    projection = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=by + PROJECTION_COLUMNS)
+    projection.attrs["skipped"] = skipped
+    return projection
+
+
+@shared_read
+def fetch_projection(months: int, by: tuple) -> pd.DataFrame:
+    """ project_cashflows() for the Portfolio tab, shared by every session until the next write """
+    return project_cashflows(months, list(by))
+
+
+def monthly_inflows(projection: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """ due_month × (one dimension, or the whole book) inflow table for charts """
+    if not by:
+        return projection.groupby("due_month", sort=True)[["inflow"]].sum()
+    return projection.pivot_table(index="due_month", columns=by, values="inflow", aggfunc="sum", observed=True)
+
+
+def write_projection(projection: pd.DataFrame, out, fmt: str):
+    """ Write a projection (one row per group and month) as Excel, CSV or Parquet """
+    if fmt == "Excel":
+        projection.to_excel(out, sheet_name="Projection", index=False, engine="xlsxwriter")
+    elif fmt == "CSV":
+        projection.to_csv(out, index=False)
+    else:
+        projection.to_parquet(out, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project the monthly instalment inflows of the stored book")
+    parser.add_argument("--months", type=int, default=PROJECTION_MONTHS)
+    parser.add_argument("--by", nargs="*", default=PROJECTION_DIMENSIONS, choices=PROJECTION_DIMENSIONS)
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="month 1 (YYYY-MM-01; default: next month)")
+    parser.add_argument("--out", default=None, help=".xlsx, .csv or .parquet (default: print the book totals)")
+    args = parser.parse_args()
+
+    projection = project_cashflows(args.months, args.by, start=args.start)
+    if projection.attrs["skipped"]:
+        print(f"{projection.attrs['skipped']:,} contract(s) without a usable tenure/EMI left out")
+    if args.out:
+        extension = os.path.splitext(args.out)[1].lower()
+        fmt = {".xlsx": "Excel", ".csv": "CSV", ".parquet": "Parquet"}.get(extension)
+        if fmt is None:
+            parser.error("--out must end in .xlsx, .csv or .parquet")
+        write_projection(projection, args.out, fmt)
+        print(f"{len(projection):,} rows written to {args.out}")
+    else:
+        book = projection.groupby(["month", "due_month"], as_index=False)[["instalments", "inflow", "balance"]].sum()
+        print(book.to_string(index=False, float_format=lambda v: f"{v:,.0f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as LookupTimeout
+from contextlib import contextmanager
+
+from mysql.connector import pooling
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+import storage
+from metrics import span, instrument
+from scoring import normalize_cnic
+from storage import BROWSE_FILTERS, DATABASE_ERRORS, INTEGRITY_ERRORS, RETRYABLE_ERRORS, is_duplicate_key
+
+
+# -----------------------------
+# Database Configuration
+# -----------------------------
+DB_CONFIG = {
+    "host": os.environ.get("PORTAL_DB_HOST", "3.17.21.91"),
+    "port": int(os.environ.get("PORTAL_DB_PORT", "3306")),
+    "user": os.environ.get("PORTAL_DB_USER", "ahsan"),
+    "password": os.environ.get("PORTAL_DB_PASSWORD", "ahsan@321"),
+    "database": os.environ.get("PORTAL_DB_NAME", "ev_installment_project"),
+    # An unreachable host fails the page after this many seconds instead of hanging it
+    "connection_timeout": int(os.environ.get("PORTAL_DB_CONNECT_TIMEOUT", "10")),
+}
+
+# mysql.connector caps a single pool at 32 connections
+POOL_SIZE = min(int(os.environ.get("PORTAL_DB_POOL_SIZE", "5")), pooling.CNX_POOL_MAXSIZE)
+CHECKOUT_RETRIES = int(os.environ.get("PORTAL_DB_CHECKOUT_RETRIES", "4"))
+CHECKOUT_BACKOFF = float(os.environ.get("PORTAL_DB_CHECKOUT_BACKOFF", "0.05"))
+
+# Shared read results expire after this many seconds even without a local write,
+# so writes made by other app replicas still show up
+READ_CACHE_TTL = int(os.environ.get("PORTAL_READ_CACHE_TTL", "60"))
+
+# Lookups the form can do without (the live CNIC warning, Save's duplicate precheck) wait
+# this long for an answer, and skip the database for LOOKUP_COOLDOWN seconds once one failed
+LOOKUP_TIMEOUT = float(os.environ.get("PORTAL_DB_LOOKUP_TIMEOUT", "1"))
+LOOKUP_COOLDOWN = float(os.environ.get("PORTAL_DB_LOOKUP_COOLDOWN", "30"))
+
+_stats_lock = threading.Lock()
+pool_stats = {
+    "checkouts": 0,
+    "retries": 0,
+    "failures": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
+# -----------------------------
+# Connection Pool
+# -----------------------------
+@st.cache_resource
+def get_storage():
+    """ Process-wide storage backend (PORTAL_DB_BACKEND) shared by every session (created once, on first use) """
+    return storage.open_storage(storage.BACKEND, DB_CONFIG, POOL_SIZE)
+
+
+def get_db_connection():
+    """
+    Check a connection out of the storage backend (MySQL: the shared pool).
+    - The pool pings the connection and reconnects it if it went stale
+    - Exhausted pool / failed reconnects / a locked SQLite file are retried with exponential backoff
+    - conn.close() hands the connection back to the pool instead of closing it
+    """
+    start = time.perf_counter()
+    delay = CHECKOUT_BACKOFF
+    for attempt in range(CHECKOUT_RETRIES + 1):
+        try:
+            conn = get_storage().connect()
+            break
+        except RETRYABLE_ERRORS:
+            if attempt == CHECKOUT_RETRIES:
+                with _stats_lock:
+                    pool_stats["failures"] += 1
+                raise
+            with _stats_lock:
+                pool_stats["retries"] += 1
+            time.sleep(delay)
+            delay *= 2
+
+    waited = time.perf_counter() - start
+    with _stats_lock:
+        pool_stats["checkouts"] += 1
+        pool_stats["wait_seconds_total"] += waited
+        pool_stats["wait_seconds_max"] = max(pool_stats["wait_seconds_max"], waited)
+    return conn
+
+
+@contextmanager
+def db_connection():
+    """ Pooled connection that is always returned to the pool, even on errors """
+    with span("db.checkout"):
+        conn = instrument(get_db_connection())
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def get_pool_stats() -> dict:
+    """ Snapshot of the checkout counters (wait times in milliseconds) """
+    with _stats_lock:
+        stats = dict(pool_stats)
+    checkouts = stats["checkouts"]
+    return {
+        "storage": storage.describe(DB_CONFIG),
+        "pool_size": POOL_SIZE,
+        "checkouts": checkouts,
+        "retries": stats["retries"],
+        "failures": stats["failures"],
+        "avg_wait_ms": (stats["wait_seconds_total"] / checkouts * 1000) if checkouts else 0.0,
+        "max_wait_ms": stats["wait_seconds_max"] * 1000,
+    }
+
+
+# -----------------------------
+# Optional Lookups
+# -----------------------------
+_lookups = ThreadPoolExecutor(max_workers=2, thread_name_prefix="db-lookup")
+_lookups_down_until = 0.0
+
+
+def quick_lookup(func, *args):
+    """
+    `func(*args)`, or None when the database cannot answer within LOOKUP_TIMEOUT.
+    A timeout or database error opens a circuit breaker: for LOOKUP_COOLDOWN
+    seconds every lookup returns None at once instead of waiting out
+    connection_timeout again. A lookup left running finishes in the background.
+    """
+    global _lookups_down_until
+    if time.monotonic() < _lookups_down_until:
+        return None
+    try:
+        return _lookups.submit(func, *args).result(timeout=LOOKUP_TIMEOUT)
+    except (LookupTimeout, *DATABASE_ERRORS):
+        _lookups_down_until = time.monotonic() + LOOKUP_COOLDOWN
+        return None
+
+
+# -----------------------------
+# Shared Read Cache
+# -----------------------------
+_data_version = 0
+_readers = {}
+cache_stats = {"reads": 0, "misses": 0}
+
+
+def data_version() -> int:
+    return _data_version
+
+
+def bump_data_version():
+    """ Called by every write path, after commit, so all sessions stop using older reads """
+    global _data_version
+    with _stats_lock:
+        _data_version += 1
+
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=256, show_spinner=False)
+def _cached_read(name, version, args, kwargs):
+    # Only runs on a miss; `version` is part of the key so a write invalidates every entry
+    with _stats_lock:
+        cache_stats["misses"] += 1
+    return _readers[name](*args, **kwargs)
+
+
+def shared_read(func):
+    """ Serve `func` from a cache shared by every session until the next write (or TTL) """
+    _readers[func.__name__] = func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _stats_lock:
+            cache_stats["reads"] += 1
+        return _cached_read(func.__name__, _data_version, args, kwargs)
+
+    return wrapper
+
+
+def refresh_reads():
+    """ Make every session's next read go to the database (e.g. to pick up other replicas' writes) """
+    bump_data_version()
+
+
+def get_cache_stats() -> dict:
+    with _stats_lock:
+        reads, misses = cache_stats["reads"], cache_stats["misses"]
+    return {
+        "version": _data_version,
+        "reads": reads,
+        "hits": reads - misses,
+        "misses": misses,
+        "hit_ratio": (reads - misses) / reads if reads else 0.0,
+    }
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+# Columns in the exact order we will pass values
+APPLICANT_COLUMNS = [
+    "applicant_type", "name", "cnic", "license_no",
+    "phone_number", "gender",
+    "guarantors", "female_guarantor", "electricity_bill", "pdc_option",
+    "education", "occupation", "designation",
+    "employer_name", "employer_contact",
+    "address", "city", "state_province", "postal_code", "country",
+    "net_salary", "applicant_bank_balance", "guarantor_bank_balance",
+    "employer_type", "age", "residence",
+    "bike_type", "bike_price", "down_payment", "tenure", "emi",
+    "outstanding", "salary_consistency", "job_years", "dependents", "tax_return",
+    "decision", "rules_version"
+]
+
+def applicant_values(data: dict) -> tuple:
+    """ Values for one applicant, in the same order as `APPLICANT_COLUMNS` """
+    full_name = f"{data['first_name']} {data['last_name']}".strip()
+    full_address = f"{data['street_address']}, {data['area_address']}"
+
+    return (
+        data["applicant_type"],
+        full_name, normalize_cnic(data["cnic"]), data["license_no"],
+        data["phone_number"], data["gender"],
+        data["guarantors"], data["female_guarantor"], data["electricity_bill"], data["pdc_option"],
+        data.get("education"), data.get("occupation"), data.get("designation"),
+        data.get("employer_name"), data.get("employer_contact"),
+        full_address, data["city"], data["state_province"], data["postal_code"], data["country"],
+        data["net_salary"], data["applicant_bank_balance"], data.get("guarantor_bank_balance"),
+        data["employer_type"], data["age"], data["residence"],
+        data["bike_type"], data["bike_price"], data["down_payment"], data["tenure"], data["emi"],data["outstanding"],
+        # Saves queued before migration 006 lack these; they stay NULL
+        data.get("salary_consistency"), data.get("job_years"), data.get("dependents"), data.get("tax_return"),
+        data["decision"], data["rules_version"]
+    )
+
+
+DUPLICATE_CNIC_MESSAGE = "❌ CNIC already exists in the database. Please enter a unique CNIC."
+
+
+def save_to_db(data: dict):
+    """
+    Single INSERT; the unique index on `cnic` rejects duplicates atomically,
+    so two officers saving the same CNIC at once cannot both succeed.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            get_storage().insert(cursor, APPLICANT_COLUMNS, [applicant_values(data)])
+            conn.commit()
+        except INTEGRITY_ERRORS as e:
+            conn.rollback()
+            if is_duplicate_key(e):
+                raise ValueError(DUPLICATE_CNIC_MESSAGE) from e
+            raise
+        finally:
+            cursor.close()
+    bump_data_version()
+
+
+def existing_cnics(cursor, cnics) -> set:
+    """ Which of `cnics` (normalized) are already stored, in one query """
+    cnics = list(cnics)
+    if not cnics:
+        return set()
+    return {cnic for (cnic,) in get_storage().select_by_cnic(cursor, ["cnic"], cnics)}
+
+
+def insert_applicants(conn, records: list) -> list:
+    """
+    Insert a batch of applicants in one transaction.
+    Records whose CNIC is already stored are skipped and returned; the rest are
+    written with a single executemany (one multi-row INSERT).
+    """
+    cursor = conn.cursor()
+    try:
+        # A CNIC saved by another officer between the check and the insert trips
+        # the unique index; the chunk is then rolled back and checked once more
+        for attempt in range(2):
+            taken = existing_cnics(cursor, {normalize_cnic(r["cnic"]) for r in records})
+            fresh = [r for r in records if normalize_cnic(r["cnic"]) not in taken]
+            try:
+                if fresh:
+                    get_storage().insert(cursor, APPLICANT_COLUMNS, [applicant_values(r) for r in fresh])
+                conn.commit()
+                break
+            except INTEGRITY_ERRORS as e:
+                conn.rollback()
+                if attempt or not is_duplicate_key(e):
+                    raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    if fresh:
+        bump_data_version()
+    return [r for r in records if normalize_cnic(r["cnic"]) in taken]
+
+
+
+
+@shared_read
+def fetch_all_applicants(columns: tuple = None):
+    """
+    Every applicant (optionally only `columns`), typed with APPLICANT_DTYPES.
+    Read from the local snapshot when PORTAL_SNAPSHOT_DIR is set (synced first if stale).
+    """
+    import snapshot  # snapshot.py imports this module
+
+    columns = list(columns or APPLICANT_SELECT_COLUMNS)
+    if snapshot.SNAPSHOT_DIR:
+        return snapshot.read_frame(columns)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        get_storage().select(cursor, columns)
+        with span("db.read_frame"):
+            df = applicants_frame(cursor.fetchall(), columns)
+        cursor.close()
+    return df
+
+
+# -----------------------------
+# Applicants Frames (explicit schema)
+# -----------------------------
+APPLICANT_SELECT_COLUMNS = ["id"] + APPLICANT_COLUMNS
+
+# Low-cardinality text as categoricals, free text as Arrow-backed strings,
+# counts in the smallest (nullable) integer type. Money stays float64:
+# DECIMAL(14, 2) balances past ~16M would lose whole rupees in float32.
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+_TEXT = pa.string()
+APPLICANT_DTYPES = {
+    "id": pa.uint32(),
+    "applicant_type": _CATEGORY, "name": _TEXT, "cnic": _TEXT, "license_no": _TEXT,
+    "phone_number": _TEXT, "gender": _CATEGORY,
+    "guarantors": _CATEGORY, "female_guarantor": _CATEGORY, "electricity_bill": _CATEGORY, "pdc_option": _CATEGORY,
+    "education": _CATEGORY, "occupation": _TEXT, "designation": _TEXT,
+    "employer_name": _TEXT, "employer_contact": _TEXT,
+    "address": _TEXT, "city": _CATEGORY, "state_province": _CATEGORY, "postal_code": _TEXT, "country": _CATEGORY,
+    "net_salary": pa.float64(), "applicant_bank_balance": pa.float64(), "guarantor_bank_balance": pa.float64(),
+    "employer_type": _CATEGORY, "age": pa.uint8(), "residence": _CATEGORY,
+    "bike_type": _CATEGORY, "bike_price": pa.uint32(), "down_payment": pa.uint32(), "tenure": pa.uint8(), "emi": pa.uint32(),
+    "outstanding": pa.float64(),
+    "salary_consistency": pa.uint8(), "job_years": pa.uint8(), "dependents": pa.uint8(), "tax_return": _CATEGORY,
+    "decision": _CATEGORY, "rules_version": _CATEGORY,
+}
+# Arrow -> pandas: nullable integers and Arrow-backed strings (dictionaries become categoricals)
+_PANDAS_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"), pa.uint8(): pd.UInt8Dtype(), pa.uint32(): pd.UInt32Dtype(),
+}
+
+# Columns each Applicants tab view reads
+APPLICANT_VIEWS = {
+    "Summary": [
+        "id", "name", "cnic", "phone_number", "applicant_type", "city", "bike_type",
+        "net_salary", "emi", "tenure", "decision", "rules_version",
+    ],
+    "All Columns": APPLICANT_SELECT_COLUMNS,
+}
+
+
+def _narrowed(numbers, dtype):
+    """ `numbers` as `dtype`, or float64 when a value does not fit it """
+    try:
+        return numbers.cast(dtype)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return numbers.cast(pa.float64(), safe=False)
+
+
+def _arrow_column(values: list, dtype):
+    if dtype == _CATEGORY or dtype == _TEXT:
+        try:
+            strings = pa.array(values, pa.string())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            strings = pa.array([None if v is None else str(v) for v in values], pa.string())
+        return strings.dictionary_encode() if dtype == _CATEGORY else strings
+    # DECIMAL arrives as Decimal objects
+    try:
+        numbers = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        numbers = pa.array(pd.to_numeric(pd.Series(values, dtype=object), errors="coerce"))
+    return _narrowed(numbers, dtype)
+
+
+def applicants_table(rows: list, columns: list) -> pa.Table:
+    """ Arrow table from cursor rows with APPLICANT_DTYPES """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return pa.Table.from_arrays(
+        [_arrow_column(list(v), APPLICANT_DTYPES.get(c, _TEXT)) for c, v in zip(columns, values)],
+        names=columns,
+    )
+
+
+def typed_table(table: pa.Table) -> pa.Table:
+    """ Narrow the numeric columns of an applicants table stored with wider types to APPLICANT_DTYPES """
+    for i, name in enumerate(table.column_names):
+        dtype = APPLICANT_DTYPES.get(name, _TEXT)
+        column = table.column(i)
+        if column.type != dtype and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            table = table.set_column(i, name, _narrowed(column, dtype))
+    return table
+
+
+def arrow_frame(table: pa.Table) -> pd.DataFrame:
+    """ DataFrame of an applicants Arrow table, converted to pandas in one step """
+    return typed_table(table).to_pandas(types_mapper=_PANDAS_TYPES.get)
+
+
+def applicants_frame(rows: list, columns: list) -> pd.DataFrame:
+    """ DataFrame from cursor rows with APPLICANT_DTYPES """
+    return arrow_frame(applicants_table(rows, columns))
+
+
+# -----------------------------
+# Applicants Browser (keyset pagination)
+# -----------------------------
+
+# BROWSE_FILTERS (storage.py): equality filters pushed down into SQL; `search` is a CNIC/phone prefix
+
+
+@shared_read
+def fetch_applicants_page(filters: dict, after_id=None, page_size: int = 50, columns: tuple = None):
+    """
+    One page of applicants ordered by id, starting after `after_id`, with only
+    `columns` (default: all; `id` is always included for the cursor).
+    IDs are never rewritten, so a cursor stays valid while other officers save or delete.
+    Seeks on the primary key instead of OFFSET, so later pages do not scan the ones before
+    (timed on the SQLite stand-in only; benchmarks/suite.py --mysql has not been run).
+    Returns (page DataFrame, has_next).
+    """
+    columns = ["id"] + [c for c in (columns or APPLICANT_SELECT_COLUMNS) if c != "id"]
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        get_storage().select(cursor, columns, filters, after_id=after_id, limit=page_size + 1)
+        with span("db.read_frame"):
+            df = applicants_frame(cursor.fetchall(), columns)
+        cursor.close()
+    return df.head(page_size), len(df) > page_size
+
+
+@shared_read
+def count_applicants(filters: dict) -> int:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        count = get_storage().count(cursor, filters)
+        cursor.close()
+    return count
+
+
+@shared_read
+def cnic_exists(cnic: str) -> bool:
+    """ Unique-index lookup for the live duplicate warning on the Applicant Information tab """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        found = bool(get_storage().select_by_cnic(cursor, ["id"], [normalize_cnic(cnic)]))
+        cursor.close()
+    return found
+
+
+@shared_read
+def count_applicants_by_id(ids: tuple, ranges: tuple = ()) -> int:
+    """ How many of `ids` / `ranges` exist: primary-key lookups, no table read """
+    if not ids and not ranges:
+        return 0
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        count = get_storage().count(cursor, ids=ids, ranges=ranges)
+        cursor.close()
+    return count
+
+
+def _delete_where(**condition) -> int:
+    """ One DELETE in one transaction; returns the number of rows deleted """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            deleted = get_storage().delete(cursor, **condition)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    if deleted:
+        bump_data_version()
+    return deleted
+
+
+def delete_applicants(ids=(), ranges=()) -> int:
+    """
+    Delete every applicant in `ids` and the inclusive id `ranges` with a single
+    DELETE ... WHERE id IN (...) OR id BETWEEN ... statement; IDs that do not
+    exist are ignored. Returns the number of rows deleted.
+    """
+    if not ids and not ranges:
+        return 0
+    return _delete_where(ids=ids, ranges=ranges)
+
+
+def delete_matching_applicants(filters: dict) -> int:
+    """ Delete every applicant matching the browser `filters` (at least one is required) """
+    if not any(filters.get(f) for f in BROWSE_FILTERS + ["search"]):
+        raise ValueError("Set at least one filter before deleting everything that matches")
+    return _delete_where(filters=filters)
+
+
+def stream_applicants(filters: dict = None, chunksize: int = 5000, columns: list = None):
+    """
+    Yield applicant rows (all columns, or only `columns`) in id order, `chunksize` tuples at a time.
+    Uses an unbuffered (server-side) cursor so only one chunk is held in memory.
+    Not cached: this is for exports that read the whole (filtered) table once.
+    With PORTAL_SNAPSHOT_DIR set, the rows come from the local snapshot instead.
+    """
+    import snapshot  # snapshot.py imports this module
+
+    if snapshot.SNAPSHOT_DIR:
+        yield from snapshot.stream_rows(filters, chunksize, columns)
+        return
+    with db_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            get_storage().select(cursor, columns or APPLICANT_SELECT_COLUMNS, filters)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            # An abandoned stream must be drained before the connection goes back to the pool
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
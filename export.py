@@ -0,0 +1,109 @@
+import csv
+import io
+import tempfile
+
+from db import APPLICANT_SELECT_COLUMNS, stream_applicants
+from metrics import span
+
+
+# -----------------------------
+# Export Settings
+# -----------------------------
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_COLUMNS = ["no"] + APPLICANT_SELECT_COLUMNS
+
+# Excel sheets hold 1,048,576 rows; keep one for the header
+EXCEL_MAX_ROWS = 1_048_575
+
+# Columns typed as numbers in Parquet (everything else is text)
+INTEGER_COLUMNS = {"no", "id"}
+NUMBER_COLUMNS = {
+    "net_salary", "applicant_bank_balance", "guarantor_bank_balance", "age",
+    "bike_price", "down_payment", "tenure", "emi", "outstanding",
+    "salary_consistency", "job_years", "dependents",
+}
+
+EXPORT_FORMATS = {
+    "Excel": {"extension": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "CSV": {"extension": "csv", "mime": "text/csv"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+
+def _numbered(chunks):
+    """ Prefix every row with its gap-free position ("no") """
+    position = 0
+    for rows in chunks:
+        yield [(position + i + 1,) + tuple(row) for i, row in enumerate(rows)]
+        position += len(rows)
+
+
+# -----------------------------
+# Writers (one chunk in memory at a time)
+# -----------------------------
+def write_excel(chunks, out):
+    import xlsxwriter
+
+    # constant_memory flushes each row to disk as soon as the next one starts
+    workbook = xlsxwriter.Workbook(out, {"constant_memory": True, "strings_to_formulas": False})
+    header = workbook.add_format({"bold": True})
+    worksheet, row_idx, sheets = None, EXCEL_MAX_ROWS, 0
+    for rows in chunks:
+        for row in rows:
+            if row_idx == EXCEL_MAX_ROWS:
+                sheets += 1
+                worksheet = workbook.add_worksheet("Applicants" if sheets == 1 else f"Applicants {sheets}")
+                worksheet.write_row(0, 0, EXPORT_COLUMNS, header)
+                row_idx = 0
+            row_idx += 1
+            worksheet.write_row(row_idx, 0, row)
+    if worksheet is None:
+        workbook.add_worksheet("Applicants").write_row(0, 0, EXPORT_COLUMNS, header)
+    workbook.close()
+
+
+def write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (c, pa.int64() if c in INTEGER_COLUMNS else pa.float64() if c in NUMBER_COLUMNS else pa.string())
+        for c in EXPORT_COLUMNS
+    ])
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            arrays = []
+            for field, values in zip(schema, columns):
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                elif pa.types.is_floating(field.type):
+                    values = [None if v is None else float(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+
+WRITERS = {"Excel": write_excel, "CSV": write_csv, "Parquet": write_parquet}
+
+
+def export_applicants(fmt: str, filters: dict = None, chunksize: int = EXPORT_CHUNK_SIZE) -> bytes:
+    """
+    Stream the (optionally filtered) applicants table into an export file and
+    return its contents. Rows go to a temporary file on disk one chunk at a
+    time; only the finished file is read back, as st.download_button needs bytes.
+    """
+    with tempfile.TemporaryFile() as out:
+        with span(f"export.{fmt.lower()}"):
+            WRITERS[fmt](_numbered(stream_applicants(filters, chunksize)), out)
+        out.seek(0)
+        return out.read()
@@ -0,0 +1,267 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from db import db_connection, cnic_exists, quick_lookup, get_storage, insert_applicants, applicant_values, DUPLICATE_CNIC_MESSAGE
+from storage import DATABASE_ERRORS, is_retryable
+from scoring import normalize_cnic
+
+
+# -----------------------------
+# Write-behind Journal Settings
+# -----------------------------
+# Saves land in this local SQLite file first (WAL, fsync on commit) and are
+# drained to MySQL by a background worker, so a slow or unreachable database
+# never blocks the Save button or loses an application
+JOURNAL_PATH = os.environ.get(
+    "PORTAL_JOURNAL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "portal_journal.sqlite"),
+)
+DRAIN_BATCH = int(os.environ.get("PORTAL_JOURNAL_BATCH", "200"))
+RETRY_BACKOFF = float(os.environ.get("PORTAL_JOURNAL_BACKOFF", "2"))
+RETRY_BACKOFF_MAX = float(os.environ.get("PORTAL_JOURNAL_BACKOFF_MAX", "300"))
+POLL_SECONDS = float(os.environ.get("PORTAL_JOURNAL_POLL", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_saves (
+    id           INTEGER PRIMARY KEY,
+    cnic         TEXT NOT NULL UNIQUE,      -- normalized; one queued save per applicant
+    payload      TEXT NOT NULL,             -- the form's applicant_data as JSON
+    status       TEXT NOT NULL DEFAULT 'pending',  -- pending | failed
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error   TEXT,
+    queued_at    REAL NOT NULL
+)
+"""
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _connect():
+    global _schema_ready
+    conn = sqlite3.connect(JOURNAL_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    if not _schema_ready:
+        with _schema_lock:
+            conn.execute(SCHEMA)
+            _schema_ready = True
+    return conn
+
+
+# -----------------------------
+# Queueing (Save button)
+# -----------------------------
+def enqueue_save(data: dict):
+    """
+    Durably queue one applicant and return at once.
+    A CNIC already stored in MySQL or queued with a different application is
+    rejected as a duplicate; saving the same application twice is a no-op, and
+    a corrected application replaces one the worker gave up on.
+    """
+    cnic = normalize_cnic(data["cnic"])
+    payload = json.dumps(data, sort_keys=True)
+    # Indexed and cached; a slow or unreachable database skips the check, the drain checks again
+    if quick_lookup(cnic_exists, cnic):
+        raise ValueError(DUPLICATE_CNIC_MESSAGE)
+
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO pending_saves (cnic, payload, queued_at) VALUES (?, ?, ?)",
+            (cnic, payload, time.time()),
+        )
+    except sqlite3.IntegrityError:
+        queued = conn.execute("SELECT payload, status FROM pending_saves WHERE cnic = ?", (cnic,)).fetchone()
+        if queued is not None and queued[1] == "failed":
+            conn.execute(
+                "UPDATE pending_saves SET payload = ?, status = 'pending', attempts = 0, next_attempt = 0, "
+                "last_error = NULL, queued_at = ? WHERE cnic = ? AND status = 'failed'",
+                (payload, time.time(), cnic),
+            )
+        elif queued is None or queued[0] != payload:
+            raise ValueError(DUPLICATE_CNIC_MESSAGE)
+    finally:
+        conn.close()
+    _wake.set()
+
+
+def journal_counts() -> dict:
+    conn = _connect()
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM pending_saves GROUP BY status").fetchall())
+    finally:
+        conn.close()
+    return {"pending": counts.get("pending", 0), "failed": counts.get("failed", 0)}
+
+
+def failed_saves() -> list:
+    """ Saves the worker gave up on, oldest first """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT cnic, payload, attempts, last_error, queued_at FROM pending_saves "
+            "WHERE status = 'failed' ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            "cnic": cnic,
+            "name": f"{json.loads(payload)['first_name']} {json.loads(payload)['last_name']}".strip(),
+            "attempts": attempts,
+            "error": last_error,
+            "queued_at": time.strftime("%Y-%m-%d %H:%M", time.localtime(queued_at)),
+        }
+        for cnic, payload, attempts, last_error, queued_at in rows
+    ]
+
+
+def retry_failed():
+    conn = _connect()
+    try:
+        conn.execute("UPDATE pending_saves SET status = 'pending', next_attempt = 0 WHERE status = 'failed'")
+    finally:
+        conn.close()
+    _wake.set()
+
+
+def discard_failed(cnic: str):
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM pending_saves WHERE status = 'failed' AND cnic = ?", (normalize_cnic(cnic),))
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Draining (background worker)
+# -----------------------------
+def _stored_as(cursor, records) -> set:
+    """ CNICs among `records` whose MySQL row is this very application (an earlier drain that committed) """
+    rows = get_storage().select_by_cnic(
+        cursor, ["cnic", "name", "license_no", "phone_number"], [normalize_cnic(r["cnic"]) for r in records]
+    )
+    stored = {row[0]: tuple(row[1:]) for row in rows}
+    mine = set()
+    for r in records:
+        values = applicant_values(r)
+        if stored.get(values[2]) == (values[1], values[3], values[4]):
+            mine.add(values[2])
+    return mine
+
+
+def _store(conn, journal, batch):
+    """ Write one batch to MySQL; the journal keeps whatever could not be stored """
+    records = [json.loads(payload) for _, payload, _ in batch]
+    duplicates = insert_applicants(conn, records)
+    mine = set()
+    if duplicates:
+        cursor = conn.cursor()
+        try:
+            mine = _stored_as(cursor, duplicates)
+        finally:
+            cursor.close()
+    failed = {normalize_cnic(r["cnic"]) for r in duplicates} - mine
+
+    journal.execute("BEGIN IMMEDIATE")
+    for row_id, _, cnic in batch:
+        if cnic in failed:
+            journal.execute(
+                "UPDATE pending_saves SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (DUPLICATE_CNIC_MESSAGE, row_id),
+            )
+        else:
+            journal.execute("DELETE FROM pending_saves WHERE id = ?", (row_id,))
+    journal.execute("COMMIT")
+    return len(batch) - len(failed)
+
+
+def _defer(journal, batch, error, give_up):
+    """ Back off exponentially per save; `give_up` marks them failed instead """
+    now = time.time()
+    journal.execute("BEGIN IMMEDIATE")
+    for row_id, _, _ in batch:
+        attempts = journal.execute("SELECT attempts FROM pending_saves WHERE id = ?", (row_id,)).fetchone()[0] + 1
+        journal.execute(
+            "UPDATE pending_saves SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+            (
+                "failed" if give_up else "pending", attempts,
+                now + min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_BACKOFF_MAX), str(error), row_id,
+            ),
+        )
+    journal.execute("COMMIT")
+
+
+def drain_once() -> int:
+    """ Store up to DRAIN_BATCH due saves in one MySQL transaction; returns how many were stored """
+    journal = _connect()
+    try:
+        batch = journal.execute(
+            "SELECT id, payload, cnic FROM pending_saves "
+            "WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+            (time.time(), DRAIN_BATCH),
+        ).fetchall()
+        if not batch:
+            return 0
+        try:
+            with db_connection() as conn:
+                return _store(conn, journal, batch)
+        except DATABASE_ERRORS as e:
+            if is_retryable(e):
+                # Database slow or unreachable: everything stays queued
+                _defer(journal, batch, e, give_up=False)
+                return 0
+            if len(batch) == 1:
+                _defer(journal, batch, e, give_up=True)
+                return 0
+            # One bad row fails the whole transaction; retry them one by one to find it
+            stored = 0
+            for row in batch:
+                try:
+                    with db_connection() as conn:
+                        stored += _store(conn, journal, [row])
+                except DATABASE_ERRORS as e:
+                    _defer(journal, [row], e, give_up=not is_retryable(e))
+            return stored
+    finally:
+        journal.close()
+
+
+def _next_due() -> float:
+    conn = _connect()
+    try:
+        due = conn.execute("SELECT MIN(next_attempt) FROM pending_saves WHERE status = 'pending'").fetchone()[0]
+    finally:
+        conn.close()
+    return POLL_SECONDS if due is None else max(0.0, min(POLL_SECONDS, due - time.time()))
+
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run_worker():
+    while True:
+        try:
+            if drain_once():
+                continue
+            wait = _next_due()
+        except Exception:
+            wait = POLL_SECONDS  # e.g. the journal file is locked; try again later
+        _wake.wait(wait)
+        _wake.clear()
+
+
+def start_worker():
+    """ One drain thread per process; safe to call on every rerun """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="journal-drain", daemon=True)
+            _worker.start()
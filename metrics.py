@@ -0,0 +1,213 @@
+import bisect
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# -----------------------------
+# Metrics Settings
+# -----------------------------
+# PORTAL_METRICS=0 turns every span into a plain pass-through
+ENABLED = os.environ.get("PORTAL_METRICS", "1") != "0"
+# Prometheus endpoint on 127.0.0.1; empty disables it (the Diagnostics expander still offers the text)
+METRICS_PORT = os.environ.get("PORTAL_METRICS_PORT", "9464")
+SLOW_QUERY_SECONDS = float(os.environ.get("PORTAL_SLOW_QUERY_MS", "500")) / 1000
+SLOW_QUERY_LOG = os.environ.get("PORTAL_SLOW_QUERY_LOG", "")
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger("portal.slow_query")
+if SLOW_QUERY_LOG:
+    slow_query_log.addHandler(logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8"))
+    slow_query_log.setLevel(logging.WARNING)
+
+_tab = contextvars.ContextVar("portal_tab", default="-")
+_lock = threading.Lock()
+# (span, tab) -> [per-bucket counts (+Inf last), sum, count]
+_histograms = {}
+_slow_queries = 0
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+def observe(name: str, seconds: float):
+    key = (name, _tab.get())
+    i = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][i] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+@contextmanager
+def span(name: str):
+    """ Time the block into the `name` histogram of the current tab """
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+@contextmanager
+def tab(name: str):
+    """ Label spans inside with `name` and time the whole block as span "tab" (also usable as a decorator) """
+    if not ENABLED:
+        yield
+        return
+    token = _tab.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("tab", time.perf_counter() - start)
+        _tab.reset(token)
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else "-"
+
+
+def _log_slow_query(statement, params, seconds):
+    global _slow_queries
+    with _lock:
+        _slow_queries += 1
+    slow_query_log.warning(
+        "%.3fs tab=%s session=%s params=%s sql=%s",
+        seconds, _tab.get(), _session_id(),
+        len(params) if isinstance(params, (list, tuple)) else "-",
+        re.sub(r"\s+", " ", statement).strip()[:500],
+    )
+
+
+# -----------------------------
+# SQL statements
+# -----------------------------
+class _TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, statement, params):
+        start = time.perf_counter()
+        try:
+            return method(statement, params)
+        finally:
+            seconds = time.perf_counter() - start
+            observe("db.sql", seconds)
+            if seconds >= SLOW_QUERY_SECONDS:
+                _log_slow_query(statement, params, seconds)
+
+    def execute(self, statement, params=None):
+        return self._timed(self._cursor.execute, statement, params)
+
+    def executemany(self, statement, rows):
+        return self._timed(self._cursor.executemany, statement, rows)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, attr):
+        return getattr(self._cursor, attr)
+
+
+class _TimedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+
+def instrument(conn):
+    """ Wrap a DB-API connection so every statement is timed (the connection itself when disabled) """
+    return _TimedConnection(conn) if ENABLED else conn
+
+
+# -----------------------------
+# Exposition
+# -----------------------------
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """ All histograms in the Prometheus text exposition format """
+    with _lock:
+        snapshot = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+        slow = _slow_queries
+
+    lines = [
+        "# HELP portal_span_seconds Time spent in instrumented portal code paths.",
+        "# TYPE portal_span_seconds histogram",
+    ]
+    for (name, tab_name), (counts, total, count) in sorted(snapshot.items()):
+        labels = f'span="{_label(name)}",tab="{_label(tab_name)}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'portal_span_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"portal_span_seconds_sum{{{labels}}} {total!r}")
+        lines.append(f"portal_span_seconds_count{{{labels}}} {count}")
+    lines += [
+        f"# HELP portal_slow_queries_total SQL statements slower than {SLOW_QUERY_SECONDS:g}s.",
+        "# TYPE portal_slow_queries_total counter",
+        f"portal_slow_queries_total {slow}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server():
+    """ Serve /metrics on 127.0.0.1:PORTAL_METRICS_PORT, once per process; safe to call on every rerun """
+    global _server
+    if not (ENABLED and METRICS_PORT):
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", int(METRICS_PORT)), _MetricsHandler)
+        except OSError:
+            # Port taken (e.g. another replica on this host); metrics stay available in Diagnostics
+            _server = False
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
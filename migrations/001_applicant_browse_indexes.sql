@@ -0,0 +1,12 @@
+-- Indexes behind the Applicants browser (db.fetch_applicants_page / count_applicants).
+-- Each equality filter is paired with id so a filtered page is an index range scan
+-- that already comes out in keyset order; CNIC/phone prefixes use plain indexes.
+-- Run once against ev_installment_project:
+--   mysql ev_installment_project < migrations/001_applicant_browse_indexes.sql
+
+CREATE INDEX idx_data_decision_id       ON data (decision, id);
+CREATE INDEX idx_data_city_id           ON data (city, id);
+CREATE INDEX idx_data_applicant_type_id ON data (applicant_type, id);
+CREATE INDEX idx_data_bike_type_id      ON data (bike_type, id);
+CREATE INDEX idx_data_cnic              ON data (cnic);
+CREATE INDEX idx_data_phone_number      ON data (phone_number);
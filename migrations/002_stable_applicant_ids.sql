@@ -0,0 +1,17 @@
+-- One-off switch to stable applicant IDs.
+-- The portal used to renumber `data.id` on every "Refresh Data" click. It now
+-- leaves IDs alone and shows a gap-free "no" column computed at read time.
+-- This script renumbers the existing rows one final time, so the IDs officers
+-- see right after the switch match the numbering they are used to. After this,
+-- IDs are never rewritten and new rows continue from MAX(id) + 1.
+-- Run once, while no one is saving applicants:
+--   mysql ev_installment_project < migrations/002_stable_applicant_ids.sql
+
+START TRANSACTION;
+SET @count = 0;
+-- ORDER BY keeps the renumbering collision-free: each row only moves to a lower, already vacated id
+UPDATE data SET id = (@count := @count + 1) ORDER BY id ASC;
+COMMIT;
+
+-- Continue numbering after the highest remaining id
+ALTER TABLE data AUTO_INCREMENT = 1;
@@ -0,0 +1,16 @@
+-- Canonical CNICs with a unique index.
+-- save_to_db now stores CNICs as 13 digits without dashes and relies on this
+-- index to reject duplicates in the same statement as the INSERT.
+-- Run once:
+--   mysql ev_installment_project < migrations/003_unique_normalized_cnic.sql
+--
+-- Existing rows that are the same person typed two ways must be resolved first,
+-- otherwise the unique index cannot be created. List them with:
+--   SELECT REPLACE(TRIM(cnic), '-', '') AS canonical, GROUP_CONCAT(id) AS ids
+--   FROM data GROUP BY canonical HAVING COUNT(*) > 1;
+
+UPDATE data SET cnic = REPLACE(TRIM(cnic), '-', '');
+
+-- Replaces the plain index from 001_applicant_browse_indexes.sql
+DROP INDEX idx_data_cnic ON data;
+CREATE UNIQUE INDEX uq_data_cnic ON data (cnic);
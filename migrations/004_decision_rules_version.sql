@@ -0,0 +1,6 @@
+-- Record which scoring rules produced each stored decision.
+-- Rows saved before this migration keep NULL (decided by the hard-coded rules
+-- that preceded scoring_rules.json version 2025.1, which has the same thresholds).
+--   mysql ev_installment_project < migrations/004_decision_rules_version.sql
+
+ALTER TABLE data ADD COLUMN rules_version VARCHAR(32) NULL AFTER decision;
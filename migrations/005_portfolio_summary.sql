@@ -0,0 +1,80 @@
+-- Portfolio KPIs kept up to date by triggers, so the dashboard reads a few
+-- hundred aggregate rows instead of the whole `data` table.
+-- One row per (dimension, value): dimension is 'all' (value '') or one of
+-- decision / bike_type / city / applicant_type. Every INSERT, UPDATE and
+-- DELETE on `data` adjusts the matching rows in the same transaction.
+-- Run once (the mysql client understands DELIMITER):
+--   mysql ev_installment_project < migrations/005_portfolio_summary.sql
+-- then fill it from the existing rows:
+--   python portfolio.py rebuild
+
+CREATE TABLE portfolio_summary (
+    dimension  VARCHAR(32)   NOT NULL,
+    value      VARCHAR(128)  NOT NULL,
+    applicants BIGINT        NOT NULL DEFAULT 0,
+    financed   DECIMAL(18,2) NOT NULL DEFAULT 0,   -- SUM(bike_price - down_payment)
+    emi_total  DECIMAL(18,2) NOT NULL DEFAULT 0,   -- monthly EMI inflow
+    dti_sum    DOUBLE        NOT NULL DEFAULT 0,   -- SUM of the DTI ratio used by scoring
+    dti_count  BIGINT        NOT NULL DEFAULT 0,   -- rows with a DTI ratio (net_salary > 0, tenure > 0)
+    PRIMARY KEY (dimension, value)
+) ENGINE = InnoDB;
+
+DELIMITER //
+
+CREATE PROCEDURE portfolio_summary_apply(
+    IN p_sign INT, IN p_decision VARCHAR(128), IN p_bike_type VARCHAR(128), IN p_city VARCHAR(128),
+    IN p_applicant_type VARCHAR(128), IN p_financed DECIMAL(18,2), IN p_emi DECIMAL(18,2), IN p_dti DOUBLE
+)
+BEGIN
+    INSERT INTO portfolio_summary (dimension, value, applicants, financed, emi_total, dti_sum, dti_count)
+    VALUES
+        ('all', '', p_sign, p_sign * p_financed, p_sign * p_emi, p_sign * COALESCE(p_dti, 0), p_sign * (p_dti IS NOT NULL)),
+        ('decision', COALESCE(p_decision, ''), p_sign, p_sign * p_financed, p_sign * p_emi, p_sign * COALESCE(p_dti, 0), p_sign * (p_dti IS NOT NULL)),
+        ('bike_type', COALESCE(p_bike_type, ''), p_sign, p_sign * p_financed, p_sign * p_emi, p_sign * COALESCE(p_dti, 0), p_sign * (p_dti IS NOT NULL)),
+        ('city', COALESCE(p_city, ''), p_sign, p_sign * p_financed, p_sign * p_emi, p_sign * COALESCE(p_dti, 0), p_sign * (p_dti IS NOT NULL)),
+        ('applicant_type', COALESCE(p_applicant_type, ''), p_sign, p_sign * p_financed, p_sign * p_emi, p_sign * COALESCE(p_dti, 0), p_sign * (p_dti IS NOT NULL))
+    ON DUPLICATE KEY UPDATE
+        applicants = applicants + VALUES(applicants),
+        financed = financed + VALUES(financed),
+        emi_total = emi_total + VALUES(emi_total),
+        dti_sum = dti_sum + VALUES(dti_sum),
+        dti_count = dti_count + VALUES(dti_count);
+END//
+
+CREATE TRIGGER data_summary_insert AFTER INSERT ON data FOR EACH ROW
+BEGIN
+    CALL portfolio_summary_apply(
+        1, NEW.decision, NEW.bike_type, NEW.city, NEW.applicant_type,
+        COALESCE(NEW.bike_price, 0) - COALESCE(NEW.down_payment, 0), COALESCE(NEW.emi, 0),
+        CASE WHEN NEW.net_salary > 0 AND NEW.tenure > 0
+             THEN (COALESCE(NEW.outstanding, 0) / NEW.tenure + COALESCE(NEW.emi, 0)) / NEW.net_salary END
+    );
+END//
+
+CREATE TRIGGER data_summary_delete AFTER DELETE ON data FOR EACH ROW
+BEGIN
+    CALL portfolio_summary_apply(
+        -1, OLD.decision, OLD.bike_type, OLD.city, OLD.applicant_type,
+        COALESCE(OLD.bike_price, 0) - COALESCE(OLD.down_payment, 0), COALESCE(OLD.emi, 0),
+        CASE WHEN OLD.net_salary > 0 AND OLD.tenure > 0
+             THEN (COALESCE(OLD.outstanding, 0) / OLD.tenure + COALESCE(OLD.emi, 0)) / OLD.net_salary END
+    );
+END//
+
+CREATE TRIGGER data_summary_update AFTER UPDATE ON data FOR EACH ROW
+BEGIN
+    CALL portfolio_summary_apply(
+        -1, OLD.decision, OLD.bike_type, OLD.city, OLD.applicant_type,
+        COALESCE(OLD.bike_price, 0) - COALESCE(OLD.down_payment, 0), COALESCE(OLD.emi, 0),
+        CASE WHEN OLD.net_salary > 0 AND OLD.tenure > 0
+             THEN (COALESCE(OLD.outstanding, 0) / OLD.tenure + COALESCE(OLD.emi, 0)) / OLD.net_salary END
+    );
+    CALL portfolio_summary_apply(
+        1, NEW.decision, NEW.bike_type, NEW.city, NEW.applicant_type,
+        COALESCE(NEW.bike_price, 0) - COALESCE(NEW.down_payment, 0), COALESCE(NEW.emi, 0),
+        CASE WHEN NEW.net_salary > 0 AND NEW.tenure > 0
+             THEN (COALESCE(NEW.outstanding, 0) / NEW.tenure + COALESCE(NEW.emi, 0)) / NEW.net_salary END
+    );
+END//
+
+DELIMITER ;
@@ -0,0 +1,10 @@
+-- Store the remaining scoring inputs so saved applicants can be re-scored
+-- when the rules change (python rescore.py). Rows saved before this migration
+-- keep NULL here; the re-scoring job skips and counts them.
+--   mysql ev_installment_project < migrations/006_scoring_inputs.sql
+
+ALTER TABLE data
+    ADD COLUMN salary_consistency TINYINT UNSIGNED NULL AFTER outstanding,
+    ADD COLUMN job_years SMALLINT UNSIGNED NULL AFTER salary_consistency,
+    ADD COLUMN dependents SMALLINT UNSIGNED NULL AFTER job_years,
+    ADD COLUMN tax_return VARCHAR(3) NULL AFTER dependents;
@@ -0,0 +1,22 @@
+-- Change tracking for the local snapshot (snapshot.py): every row records when
+-- it was last written, and deleted ids are kept as tombstones, so a sync
+-- fetches only what changed since its watermark instead of the whole table.
+-- Existing rows get the migration time; the first sync is a full load anyway.
+--   mysql ev_installment_project < migrations/007_change_tracking.sql
+-- then point the app servers at a local directory:
+--   PORTAL_SNAPSHOT_DIR=/var/lib/portal/snapshot
+
+ALTER TABLE data
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD KEY idx_data_updated_at (updated_at);
+
+CREATE TABLE data_deleted (
+    id         INT UNSIGNED NOT NULL PRIMARY KEY,
+    deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    KEY idx_data_deleted_deleted_at (deleted_at)
+) ENGINE = InnoDB;
+
+-- Runs alongside migration 005's data_summary_delete
+CREATE TRIGGER data_tombstone AFTER DELETE ON data FOR EACH ROW
+    INSERT INTO data_deleted (id) VALUES (OLD.id)
+    ON DUPLICATE KEY UPDATE deleted_at = CURRENT_TIMESTAMP(6);
@@ -0,0 +1,143 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from db import db_connection, shared_read, bump_data_version
+
+
+# -----------------------------
+# Summary Layout
+# -----------------------------
+# `portfolio_summary` (migrations/005_portfolio_summary.sql) is kept current by
+# triggers on `data`; the reconciliation below rebuilds or checks it from
+# scratch and is meant for cron:
+#   python portfolio.py check      # exit status 1 if the summary drifted
+#   python portfolio.py rebuild
+SUMMARY_DIMENSIONS = ["decision", "bike_type", "city", "applicant_type"]
+SUMMARY_COLUMNS = ["dimension", "value", "applicants", "financed", "emi_total", "dti_sum", "dti_count"]
+
+# Same figures the triggers add per row
+FINANCED_SQL = "COALESCE(bike_price, 0) - COALESCE(down_payment, 0)"
+# dti_score()'s ratio; `* 1.0` keeps the division fractional on every backend
+DTI_SQL = (
+    "CASE WHEN net_salary > 0 AND tenure > 0 "
+    "THEN (COALESCE(outstanding, 0) * 1.0 / tenure + COALESCE(emi, 0)) / net_salary END"
+)
+
+
+def _aggregate_sql(dimension: str) -> str:
+    key = "''" if dimension == "all" else f"COALESCE({dimension}, '')"
+    group = "" if dimension == "all" else f" GROUP BY {key}"
+    return (
+        f"SELECT '{dimension}', {key}, COUNT(*), COALESCE(SUM({FINANCED_SQL}), 0), "
+        f"COALESCE(SUM(COALESCE(emi, 0)), 0), COALESCE(SUM({DTI_SQL}), 0), COUNT({DTI_SQL}) "
+        f"FROM data{group}"
+    )
+
+
+# The whole summary computed from `data` (one full scan; reconciliation only)
+AGGREGATE_SQL = " UNION ALL ".join(_aggregate_sql(d) for d in ["all"] + SUMMARY_DIMENSIONS)
+
+
+# -----------------------------
+# Reads (dashboard)
+# -----------------------------
+@shared_read
+def fetch_portfolio_summary() -> pd.DataFrame:
+    """ The aggregate rows only: cost depends on the number of cities, not applicants """
+    query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM portfolio_summary WHERE applicants > 0"
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        cursor.close()
+    df = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    for col in SUMMARY_COLUMNS[2:]:
+        df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def portfolio_kpis(summary: pd.DataFrame, dimension: str = "all", value: str = "") -> dict:
+    """ Applicants, total financed, average DTI and monthly EMI inflow for one summary row """
+    row = summary[(summary["dimension"] == dimension) & (summary["value"] == value)]
+    if row.empty:
+        return {"applicants": 0, "financed": 0.0, "avg_dti": None, "emi_inflow": 0.0}
+    row = row.iloc[0]
+    return {
+        "applicants": int(row["applicants"]),
+        "financed": float(row["financed"]),
+        "avg_dti": float(row["dti_sum"] / row["dti_count"]) if row["dti_count"] else None,
+        "emi_inflow": float(row["emi_total"]),
+    }
+
+
+def breakdown(summary: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """ One dimension's rows, largest first """
+    df = summary[summary["dimension"] == dimension].copy()
+    df["value"] = df["value"].replace("", "(blank)")
+    df["avg_dti"] = (df["dti_sum"] / df["dti_count"]).where(df["dti_count"] > 0)
+    return df.sort_values("applicants", ascending=False)[["value", "applicants", "financed", "emi_total", "avg_dti"]]
+
+
+# -----------------------------
+# Reconciliation
+# -----------------------------
+def rebuild_portfolio_summary() -> int:
+    """ Recompute the summary from `data` in one transaction; returns the number of summary rows """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM portfolio_summary")
+            cursor.execute(f"INSERT INTO portfolio_summary ({', '.join(SUMMARY_COLUMNS)}) {AGGREGATE_SQL}")
+            rows = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    bump_data_version()
+    return rows
+
+
+def check_portfolio_summary() -> pd.DataFrame:
+    """ Summary rows that differ from a fresh aggregate of `data` (empty when in sync) """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(AGGREGATE_SQL)
+        live = pd.DataFrame(cursor.fetchall(), columns=SUMMARY_COLUMNS)
+        cursor.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM portfolio_summary WHERE applicants <> 0")
+        stored = pd.DataFrame(cursor.fetchall(), columns=SUMMARY_COLUMNS)
+        cursor.close()
+    live = live[live["applicants"] > 0]
+
+    merged = live.merge(stored, on=["dimension", "value"], how="outer", suffixes=("_live", "_stored"))
+    drift = pd.Series(False, index=merged.index)
+    for col in SUMMARY_COLUMNS[2:]:
+        a = pd.to_numeric(merged[f"{col}_live"]).fillna(0).astype(float)
+        b = pd.to_numeric(merged[f"{col}_stored"]).fillna(0).astype(float)
+        # DTI sums are floating point; money and counts are exact
+        tolerance = 1e-6 * a.abs().clip(lower=1) if col == "dti_sum" else 0.005
+        drift |= (a - b).abs() > tolerance
+    return merged[drift].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the portfolio summary with the applicants table")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"Rebuilt portfolio_summary: {rebuild_portfolio_summary()} rows")
+        return
+    drift = check_portfolio_summary()
+    if drift.empty:
+        print("portfolio_summary is in sync")
+        return
+    print(drift.to_string(index=False))
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import ast
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+
+import streamlit as st
+
+
+# -----------------------------
+# Profiler Settings
+# -----------------------------
+# Admin-only: profiling exists only when a token is configured, and a session
+# starts it with ?profile=<reruns>&token=<token> in the URL
+PROFILE_TOKEN = os.environ.get("PORTAL_PROFILE_TOKEN", "")
+SAMPLE_INTERVAL = float(os.environ.get("PORTAL_PROFILE_INTERVAL_MS", "1")) / 1000
+MAX_RERUNS = 20
+# A rerun that raised never reaches end_rerun(); its sampler gives up on its own after this long
+MAX_RERUN_SECONDS = 120
+
+
+# -----------------------------
+# Sections (from the app's own source)
+# -----------------------------
+@lru_cache(maxsize=None)
+def _sections(path: str):
+    """
+    Line ranges of every `with ... tab("X")` / `with ... span("X")` block in the
+    script, and functions decorated with tab("X"), so samples can be attributed
+    to the tabs and blocks the metrics already name
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    def label(call):
+        if (isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id in ("tab", "span")
+                and call.args and isinstance(call.args[0], ast.Constant)):
+            return str(call.args[0].value)
+        return None
+
+    blocks, functions = [], {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.With):
+            for item in node.items:
+                name = label(item.context_expr)
+                if name:
+                    blocks.append((node.lineno, node.end_lineno, name))
+        elif isinstance(node, ast.FunctionDef):
+            for decorator in node.decorator_list:
+                name = label(decorator)
+                if name:
+                    functions[node.name] = name
+    # Outer blocks first, so nested ones come out as "Results › scoring"
+    blocks.sort(key=lambda b: (b[0], -b[1]))
+    return blocks, functions
+
+
+def _section(path, frames):
+    """ Section label of one sample (frames outermost first) """
+    blocks, functions = _sections(path)
+    names = []
+    for code, line in frames:
+        if code.co_filename != path:
+            continue
+        if code.co_name in functions:
+            names = [functions[code.co_name]]
+        names += [name for start, end, name in blocks if start <= line <= end and name not in names]
+    return " › ".join(names) or "(portal setup)"
+
+
+# -----------------------------
+# Sampler
+# -----------------------------
+class _Sampler(threading.Thread):
+    """
+    Samples one thread's stack every SAMPLE_INTERVAL seconds.
+    The GIL switch interval is left alone (it is process-wide, so changing it
+    would slow every other session): while the rerun holds the GIL the sampler
+    gets in every sys.getswitchinterval() (5 ms by default), and each sample is
+    weighted by the time since the previous one, so the totals stay right.
+    """
+
+    def __init__(self, target: int, script_path: str, name: str = "rerun"):
+        super().__init__(name="rerun-profiler", daemon=True)
+        self.target = target
+        self.script_path = script_path
+        self.name = name
+        self.samples = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self._done = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._done.wait(SAMPLE_INTERVAL):
+            if time.perf_counter() - self.started > MAX_RERUN_SECONDS:
+                break
+            frame = sys._current_frames().get(self.target)
+            now = time.perf_counter()
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_code, frame.f_lineno))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.append((stack, now - last))
+            last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.finished = time.perf_counter()
+
+
+# -----------------------------
+# Rerun hooks (top and bottom of the script)
+# -----------------------------
+def begin_rerun(script_path: str):
+    """ Start sampling this rerun if the session asked for a profile """
+    if not PROFILE_TOKEN:
+        return
+    _finish(st.session_state.pop("profiler", None))  # a rerun cut short by st.rerun()/st.stop()
+
+    params = st.query_params
+    if "profile" in params and params.get("token") == PROFILE_TOKEN:
+        try:
+            reruns = max(1, min(int(params["profile"]), MAX_RERUNS))
+        except ValueError:
+            reruns = 1
+        st.session_state.profile_remaining = reruns
+        st.session_state.profiles = []
+        del params["profile"], params["token"]
+
+    if st.session_state.get("profile_remaining", 0) > 0:
+        _start(os.path.abspath(script_path), "rerun")
+
+
+def _start(script_path: str, name: str):
+    sampler = _Sampler(threading.get_ident(), script_path, name)
+    sampler.start()
+    st.session_state.profiler = sampler
+
+
+def end_rerun():
+    if not PROFILE_TOKEN:
+        return
+    _finish(st.session_state.pop("profiler", None))
+
+
+def profiled_fragment(func):
+    """
+    Put under @st.fragment: a fragment's own reruns run only that function,
+    never the script's begin_rerun()/end_rerun(), so they are sampled here.
+    Inside a full rerun the script's sampler already covers it.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILE_TOKEN or "profiler" in st.session_state or st.session_state.get("profile_remaining", 0) <= 0:
+            return func(*args, **kwargs)
+        _start(os.path.abspath(inspect.unwrap(func).__code__.co_filename), f"{func.__name__} fragment")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _finish(st.session_state.pop("profiler", None))
+
+    return wrapper
+
+
+def _finish(sampler):
+    if sampler is None:
+        return
+    sampler.stop()
+    st.session_state.profile_remaining -= 1
+    st.session_state.profiles.append(_summarize(sampler))
+
+
+def _summarize(sampler):
+    """ Keep only what the exports need: section, frame keys and weights """
+    samples = []
+    for stack, weight in sampler.samples:
+        section = _section(sampler.script_path, stack)
+        frames = [(code.co_name, code.co_filename, code.co_firstlineno) for code, _ in stack]
+        samples.append((section, frames, weight))
+    return {
+        "name": sampler.name,
+        "seconds": sampler.finished - sampler.started,
+        "samples": samples,
+    }
+
+
+# -----------------------------
+# Exports
+# -----------------------------
+def section_totals(profiles) -> dict:
+    """ Sampled seconds per section over all captured reruns """
+    totals = {}
+    for profile in profiles:
+        for section, _, weight in profile["samples"]:
+            totals[section] = totals.get(section, 0.0) + weight
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def to_speedscope(profiles) -> str:
+    """ One sampled profile per rerun, sections as the root frames (https://www.speedscope.app) """
+    frames, index = [], {}
+
+    def frame_id(key):
+        if key not in index:
+            index[key] = len(frames)
+            name, file, line = key
+            frames.append({"name": name, "file": file, "line": line} if file else {"name": name})
+        return index[key]
+
+    out = []
+    for n, profile in enumerate(profiles, 1):
+        samples, weights = [], []
+        for section, stack, weight in profile["samples"]:
+            samples.append([frame_id((f"[{section}]", None, None))] + [frame_id(f) for f in stack])
+            weights.append(weight)
+        out.append({
+            "type": "sampled", "name": f"{n}: {profile['name']}", "unit": "seconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+        })
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": "EV Bike Finance Portal reruns",
+        "exporter": "instalment-portal profiling.py",
+        "shared": {"frames": frames},
+        "profiles": out,
+    })
+
+
+def to_folded(profiles) -> str:
+    """ Collapsed stacks for flamegraph.pl / inferno, weights in microseconds """
+    counts = {}
+    for profile in profiles:
+        for section, stack, weight in profile["samples"]:
+            key = ";".join([section] + [f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack])
+            counts[key] = counts.get(key, 0) + weight
+    return "".join(f"{key} {max(1, round(w * 1e6))}\n" for key, w in counts.items())
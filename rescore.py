@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from db import db_connection, get_storage
+from scoring import score_frame, SCORE_FRAME_COLUMNS, RULES_VERSION
+
+
+# -----------------------------
+# Re-scoring Settings
+# -----------------------------
+# Re-evaluates every stored decision with the current scoring_rules.json:
+#   python rescore.py run --workers 8       # resumes from the checkpoint if there is one
+#   python rescore.py status                # progress and the old -> new decision report
+# Rows already decided by RULES_VERSION are skipped, and so are rows saved
+# without the inputs to score them, so a finished run is a no-op.
+CHECKPOINT_PATH = os.environ.get(
+    "PORTAL_RESCORE_CHECKPOINT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rescore_checkpoint.json"),
+)
+RESCORE_CHUNK_SIZE = 5000
+
+# Scoring inputs as stored in `data` (migration 006 added the last four)
+RESCORE_COLUMNS = ["id", "decision", "rules_version"] + SCORE_FRAME_COLUMNS + ["tax_return"]
+STORED_INPUTS = [c for c in SCORE_FRAME_COLUMNS if c != "guarantor_bank_balance"] + ["tax_return"]
+
+
+# -----------------------------
+# Reading and scoring
+# -----------------------------
+def fetch_chunk(cursor, after_id: int, size: int):
+    """ The next `size` scorable rows not yet decided by the current rules, by id """
+    return get_storage().select_unscored(cursor, RESCORE_COLUMNS, RULES_VERSION, after_id, size, STORED_INPUTS)
+
+
+def rescore_rows(rows: list) -> dict:
+    """
+    Score one chunk (runs in a worker process).
+    Returns the new decision of every row by id and the old -> new transitions.
+    """
+    df = pd.DataFrame(rows, columns=RESCORE_COLUMNS)
+    scored = score_frame(df)
+    return {
+        "decisions": dict(zip(scored["id"].astype(int).tolist(), scored["decision"].tolist())),
+        "transitions": Counter(zip(df["decision"].fillna("(none)"), scored["decision"])),
+        "last_id": int(df["id"].iloc[-1]),
+    }
+
+
+def write_decisions(conn, decisions: dict) -> int:
+    """ One UPDATE per distinct decision (id IN ...), committed together; triggers keep the summary in step """
+    by_decision = {}
+    for row_id, decision in decisions.items():
+        by_decision.setdefault(decision, []).append(row_id)
+    cursor = conn.cursor()
+    try:
+        for decision, ids in by_decision.items():
+            get_storage().set_decision(cursor, decision, RULES_VERSION, ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(decisions)
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+def load_checkpoint(path: str = CHECKPOINT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(state: dict, path: str):
+    # Write-then-rename, so an interrupted run never leaves a torn checkpoint
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _new_state() -> dict:
+    return {
+        "rules_version": RULES_VERSION, "last_id": 0, "finished": False,
+        "rows": 0, "updated": 0, "missing_inputs": 0, "transitions": {}, "seconds": 0.0,
+    }
+
+
+# -----------------------------
+# Job
+# -----------------------------
+def run(workers: int = None, chunk_size: int = RESCORE_CHUNK_SIZE, checkpoint: str = CHECKPOINT_PATH,
+        restart: bool = False, progress=None) -> dict:
+    """
+    Re-score every row not yet decided by RULES_VERSION.
+    Chunks are read by id, scored on a process pool (at most two chunks per
+    worker in flight, so memory stays flat) and written back in id order, each
+    chunk in one transaction followed by a checkpoint of the last id written.
+    An interrupted run resumes after that id; a checkpoint for other rules is ignored.
+    """
+    state = None if restart else load_checkpoint(checkpoint)
+    if state is None or state["rules_version"] != RULES_VERSION:
+        state = _new_state()
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter() - state["seconds"]
+
+    with db_connection() as conn, ProcessPoolExecutor(max_workers=workers) as pool:
+        cursor = conn.cursor()
+        # Saved before migration 006: never selected, only reported
+        state["missing_inputs"] = get_storage().count_missing(cursor, STORED_INPUTS)
+        in_flight = deque()
+        after_id, exhausted = state["last_id"], False
+        while True:
+            while not exhausted and len(in_flight) < 2 * workers:
+                rows = fetch_chunk(cursor, after_id, chunk_size)
+                conn.commit()  # end the read snapshot so later chunks see fresh rows
+                if not rows:
+                    exhausted = True
+                    break
+                after_id = rows[-1][0]
+                in_flight.append(pool.submit(rescore_rows, rows))
+            if not in_flight:
+                break
+
+            result = in_flight.popleft().result()
+            state["updated"] += write_decisions(conn, result["decisions"])
+            state["rows"] += len(result["decisions"])
+            for (old, new), n in result["transitions"].items():
+                key = f"{old} -> {new}"
+                state["transitions"][key] = state["transitions"].get(key, 0) + n
+            state["last_id"] = result["last_id"]
+            state["seconds"] = time.perf_counter() - started
+            _save_checkpoint(state, checkpoint)
+            if progress:
+                progress(state)
+        cursor.close()
+
+    state["finished"] = True
+    _save_checkpoint(state, checkpoint)
+    return state
+
+
+def decision_report(state: dict) -> pd.DataFrame:
+    """ Old vs new decision counts over the re-scored rows """
+    old, new = Counter(), Counter()
+    for key, n in state["transitions"].items():
+        before, after = key.split(" -> ")
+        old[before] += n
+        new[after] += n
+    decisions = sorted(set(old) | set(new))
+    report = pd.DataFrame({
+        "decision": decisions,
+        "before": [old[d] for d in decisions],
+        "after": [new[d] for d in decisions],
+    })
+    report["change"] = report["after"] - report["before"]
+    return report
+
+
+def print_report(state: dict):
+    rate = state["rows"] / state["seconds"] if state["seconds"] else 0
+    print(
+        f"Rules {state['rules_version']}: {state['rows']:,} rows checked, {state['updated']:,} re-scored, "
+        f"{state['missing_inputs']:,} skipped (inputs not stored), last id {state['last_id']}, "
+        f"{state['seconds']:.1f}s ({rate:,.0f} rows/s){'' if state['finished'] else ' - not finished'}"
+    )
+    if state["transitions"]:
+        print()
+        print(decision_report(state).to_string(index=False))
+        print()
+        changed = {k: n for k, n in state["transitions"].items() if k.split(" -> ")[0] != k.split(" -> ")[1]}
+        for key, n in sorted(changed.items(), key=lambda kv: -kv[1]):
+            print(f"  {key:<24} {n:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored applicants with the current scoring rules")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="re-score (resumes from the checkpoint)")
+    run_parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    run_parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE)
+    run_parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    run_parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    status_parser = sub.add_parser("status", help="progress and decision report of the last run")
+    status_parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        state = load_checkpoint(args.checkpoint)
+        if state is None:
+            print("No re-scoring run recorded")
+            sys.exit(1)
+        print_report(state)
+        return
+
+    def progress(state):
+        print(f"\r{state['rows']:,} rows, last id {state['last_id']}, {state['seconds']:.0f}s", end="", file=sys.stderr)
+
+    state = run(args.workers, args.chunk_size, args.checkpoint, args.restart, progress)
+    print(file=sys.stderr)
+    print_report(state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import json
+import math
+import os
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+
+# -----------------------------
+# Validation Functions
+# -----------------------------
+def validate_cnic(cnic: str) -> bool:
+    return bool(re.fullmatch(r"\d{5}-?\d{7}-?\d", cnic))
+
+
+def normalize_cnic(cnic: str) -> str:
+    """ Canonical 13-digit form, so "12345-1234567-1" and "1234512345671" are the same person """
+    return cnic.strip().replace("-", "")
+
+
+def validate_phone(phone: str) -> bool:
+    return phone.isdigit() and len(phone) == 11
+
+# -----------------------------
+# Scoring Rules (compiled once at startup)
+# -----------------------------
+RULES_PATH = os.environ.get(
+    "PORTAL_SCORING_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_rules.json"),
+)
+
+
+def _compile_ladder(name, factor):
+    """
+    Turn a list of {"below": x} / {"up_to": x} upper bounds into sorted tuples
+    (for bisect) and arrays (for searchsorted). "below" bounds are strict.
+    A missing (NaN) input scores `missing`, by default the last bucket.
+    """
+    bounds = [b["below"] if "below" in b else b["up_to"] for b in factor["bounds"]]
+    inclusive = ["up_to" in b for b in factor["bounds"]]
+    scores = factor["scores"]
+    if bounds != sorted(bounds):
+        raise ValueError(f"Scoring rules: '{name}' bounds must be in ascending order")
+    if len(scores) != len(bounds) + 1:
+        raise ValueError(f"Scoring rules: '{name}' needs exactly one more score than bounds")
+    return dict(
+        factor,
+        missing=factor.get("missing", scores[-1]),
+        bounds=tuple(bounds),
+        inclusive=tuple(inclusive),
+        scores=tuple(scores),
+        bounds_array=np.array(bounds, dtype=float),
+        inclusive_array=np.array(inclusive, dtype=bool),
+        scores_array=np.array(scores, dtype=float),
+    )
+
+
+def load_rules(path: str = RULES_PATH) -> dict:
+    """ Read a versioned rules file and precompile every factor """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    factors = {}
+    for name, factor in raw["factors"].items():
+        factors[name] = _compile_ladder(name, factor) if factor["type"] == "ladder" else factor
+    missing = [name for name in raw["weights"] if name not in factors]
+    if missing:
+        raise ValueError(f"Scoring rules: weights given for unknown factors {missing}")
+
+    return {
+        "version": str(raw["version"]),
+        "factors": factors,
+        "weights": dict(raw["weights"]),
+        "cutoffs": dict(raw["cutoffs"]),
+    }
+
+
+RULES = load_rules()
+RULES_VERSION = RULES["version"]
+_F = RULES["factors"]
+
+
+def ladder_score(ladder: dict, x):
+    """ O(log k) lookup: first bound >= x, stepping past it when x sits exactly on a strict bound """
+    if x != x:
+        return ladder["missing"]
+    i = bisect_left(ladder["bounds"], x)
+    if i < len(ladder["bounds"]) and ladder["bounds"][i] == x and not ladder["inclusive"][i]:
+        i += 1
+    return ladder["scores"][i]
+
+
+def ladder_scores(ladder: dict, x: np.ndarray) -> np.ndarray:
+    """ Vectorized ladder_score() via searchsorted """
+    bounds = ladder["bounds_array"]
+    i = np.searchsorted(bounds, x, side="left")
+    on_bound = np.minimum(i, len(bounds) - 1)
+    i = i + ((i < len(bounds)) & (bounds[on_bound] == x) & ~ladder["inclusive_array"][on_bound])
+    return np.where(np.isnan(x), float(ladder["missing"]), ladder["scores_array"][i])
+
+
+# -----------------------------
+# Scoring Functions
+# -----------------------------
+def income_score(net_salary, gender):
+    rule = _F["income"]
+    base = ladder_score(rule, net_salary)
+    if gender in rule["gender_multiplier"]:
+        base *= rule["gender_multiplier"][gender]
+    return min(base, rule["max"])
+    
+def bank_balance_score_custom(applicant_balance, guarantor_balance, emi):
+    """
+    Binary scoring logic:
+    - Applicant >= 3x EMI → 100
+    - Guarantor >= 6x EMI → 100
+    - If both provided:
+        → Applicant takes priority if both qualify
+    (multiples and score come from the rules file)
+    """
+    rule = _F["bank_balance"]
+    score = 0
+    source = "None"
+
+    applicant_ok = applicant_balance is not None and applicant_balance >= rule["applicant_emi_multiple"] * emi
+    guarantor_ok = guarantor_balance is not None and guarantor_balance >= rule["guarantor_emi_multiple"] * emi
+
+    if applicant_ok and guarantor_ok:
+        score, source = rule["score"], "Applicant (Priority)"
+    elif applicant_ok:
+        score, source = rule["score"], "Applicant"
+    elif guarantor_ok:
+        score, source = rule["score"], "Guarantor"
+    else:
+        score, source = 0, "None"
+
+    return score, source
+
+
+def salary_consistency_score(months):
+    rule = _F["salary_consistency"]
+    return min((months / rule["full_at"]) * 100, rule["max"])
+
+EMPLOYER_TYPE_SCORES = _F["employer_type"]["scores"]
+RESIDENCE_SCORES = _F["residence"]["scores"]
+
+def employer_type_score(emp_type):
+    return EMPLOYER_TYPE_SCORES.get(emp_type, _F["employer_type"]["default"])
+
+def job_tenure_score(years):
+    return ladder_score(_F["job_tenure"], years)
+
+def age_score(age):
+    return ladder_score(_F["age"], age)  # -1 = reject
+
+def dependents_score(dep):
+    return ladder_score(_F["dependents"], dep)
+
+def residence_score(res):
+    return RESIDENCE_SCORES.get(res, _F["residence"]["default"])
+
+def dti_score(outstanding, emi, net_salary, tenure):
+    """
+    Debt-to-Income (DTI) Score:
+    ratio = (Outstanding / tenure + EMI) / Net Salary
+    """
+    if net_salary <= 0 or tenure <= 0:
+        return 0, 0
+
+    monthly_obligation = (outstanding / tenure) + emi
+    ratio = monthly_obligation / net_salary
+
+    return ladder_score(_F["dti"], ratio), ratio
+
+# -----------------------------
+# Financing Plans
+# -----------------------------
+FINANCING_PLANS = {
+    "1 Year Plan": {"upfront": 60000, "installment": 25500, "tenure": 12},
+    "2 Year Plan": {"upfront": 40000, "installment": 14900, "tenure": 24},
+    "3 Year Plan": {"upfront": 40000, "installment": 9900, "tenure": 36},
+}
+
+def calculate_min_emi(bike_price, down_payment, tenure):
+    """Minimum EMI needed to cover bike price"""
+    if tenure <= 0:
+        return 0
+    return math.ceil((bike_price - down_payment) / tenure)
+
+
+# -----------------------------
+# Final Decision
+# -----------------------------
+# Weights of each sub-score in the final score (summed in this order)
+WEIGHTS = RULES["weights"]
+APPROVE_CUTOFF = RULES["cutoffs"]["approve"]
+REVIEW_CUTOFF = RULES["cutoffs"]["review"]
+
+
+def final_decision(scores: dict, applicant_type, tax_return="Yes"):
+    """
+    Apply the reject rules, then the weighted score cutoffs.
+    Returns (final_score, decision, decision_display); final_score is 0 when rejected early.
+    """
+    if applicant_type == "Businessman" and tax_return == "No":
+        return 0, "Rejected", "❌ Rejected (No Tax Return)"
+    if scores["age"] == -1:
+        return 0, "Reject", "❌ Reject (Underage)"
+    if scores["bank_balance"] == 0:
+        return 0, "Reject", "❌ Reject (Insufficient Bank Balance)"
+
+    final_score = 0
+    for name, weight in WEIGHTS.items():
+        final_score = final_score + scores[name] * weight
+    if final_score >= APPROVE_CUTOFF:
+        return final_score, "Approved", "✅ Approve"
+    if final_score >= REVIEW_CUTOFF:
+        return final_score, "Review", "🟡 Review"
+    return final_score, "Reject", "❌ Reject"
+
+
+def score_applicant(applicant: dict) -> dict:
+    """
+    Score one applicant exactly like the Results tab.
+    `applicant` holds the SCORE_FRAME_COLUMNS inputs (tax_return optional);
+    returns the same score columns score_frame() adds.
+    """
+    inc = income_score(applicant["net_salary"], applicant["gender"])
+    bal, bal_source = bank_balance_score_custom(
+        applicant["applicant_bank_balance"], applicant.get("guarantor_bank_balance"), applicant["emi"],
+    )
+    dti, ratio = dti_score(applicant["outstanding"], applicant["emi"], applicant["net_salary"], applicant["tenure"])
+    scores = {
+        "income": inc, "bank_balance": bal,
+        "salary_consistency": salary_consistency_score(applicant["salary_consistency"]),
+        "employer_type": employer_type_score(applicant["employer_type"]),
+        "job_tenure": job_tenure_score(applicant["job_years"]),
+        "age": age_score(applicant["age"]),
+        "dependents": dependents_score(applicant["dependents"]),
+        "residence": residence_score(applicant["residence"]),
+        "dti": dti,
+    }
+    final_score, decision, decision_display = final_decision(
+        scores, applicant["applicant_type"], applicant.get("tax_return", "Yes"),
+    )
+    return {
+        "income_score": inc,
+        "bank_balance_score": bal,
+        "bank_balance_source": bal_source,
+        "salary_consistency_score": scores["salary_consistency"],
+        "employer_type_score": scores["employer_type"],
+        "job_tenure_score": scores["job_tenure"],
+        "age_score": scores["age"],
+        "dependents_score": scores["dependents"],
+        "residence_score": scores["residence"],
+        "dti_ratio": ratio,
+        "dti_score": dti,
+        "final_score": final_score,
+        "decision": decision,
+        "decision_display": decision_display,
+        "rules_version": RULES_VERSION,
+    }
+
+
+# -----------------------------
+# Batch Scoring (whole DataFrames)
+# -----------------------------
+# Input columns score_frame() needs; tax_return is optional and defaults to "Yes" like the Results tab
+SCORE_FRAME_COLUMNS = [
+    "applicant_type", "gender", "net_salary",
+    "applicant_bank_balance", "guarantor_bank_balance", "emi",
+    "salary_consistency", "employer_type", "job_years", "age",
+    "dependents", "residence", "outstanding", "tenure",
+]
+# Columns score_frame() adds (and score_applicant() returns)
+SCORE_COLUMNS = [
+    "income_score", "bank_balance_score", "bank_balance_source", "salary_consistency_score",
+    "employer_type_score", "job_tenure_score", "age_score", "dependents_score", "residence_score",
+    "dti_ratio", "dti_score", "final_score", "decision", "decision_display", "rules_version",
+]
+
+
+def _numeric(df, column):
+    # MySQL DECIMAL columns arrive as Decimal objects; NULL becomes NaN
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def score_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized equivalent of the scalar scoring path for many applicants at once.
+    Uses the same compiled rule tables (searchsorted instead of bisect), so every
+    sub-score, the final score and the decision match the per-applicant functions exactly.
+    Returns a copy of `df` with the score columns added (`decision` is overwritten).
+    """
+    missing = [c for c in SCORE_FRAME_COLUMNS if c not in df.columns]
+    if missing:
+        raise KeyError(f"score_frame() is missing input columns: {', '.join(missing)}")
+
+    net_salary = _numeric(df, "net_salary")
+    applicant_balance = _numeric(df, "applicant_bank_balance")
+    guarantor_balance = _numeric(df, "guarantor_bank_balance")
+    emi = _numeric(df, "emi")
+    months = _numeric(df, "salary_consistency")
+    years = _numeric(df, "job_years")
+    age = _numeric(df, "age")
+    dep = _numeric(df, "dependents")
+    outstanding = _numeric(df, "outstanding")
+    tenure = _numeric(df, "tenure")
+
+    # --- income_score ---
+    rule = _F["income"]
+    multiplier = df["gender"].map(rule["gender_multiplier"]).to_numpy(dtype=float)
+    inc = ladder_scores(rule, net_salary)
+    inc = np.where(np.isnan(multiplier), inc, inc * multiplier)
+    inc = np.minimum(inc, rule["max"])
+
+    # --- bank_balance_score_custom ---
+    rule = _F["bank_balance"]
+    applicant_ok = ~np.isnan(applicant_balance) & (applicant_balance >= rule["applicant_emi_multiple"] * emi)
+    guarantor_ok = ~np.isnan(guarantor_balance) & (guarantor_balance >= rule["guarantor_emi_multiple"] * emi)
+    bal = np.where(applicant_ok | guarantor_ok, float(rule["score"]), 0.0)
+    bal_source = np.select(
+        [applicant_ok & guarantor_ok, applicant_ok, guarantor_ok],
+        ["Applicant (Priority)", "Applicant", "Guarantor"], default="None",
+    )
+
+    # --- salary_consistency / employer_type / residence ---
+    rule = _F["salary_consistency"]
+    sal = np.minimum((months / rule["full_at"]) * 100, rule["max"])
+    emp = df["employer_type"].map(EMPLOYER_TYPE_SCORES).fillna(_F["employer_type"]["default"]).to_numpy(dtype=float)
+    res = df["residence"].map(RESIDENCE_SCORES).fillna(_F["residence"]["default"]).to_numpy(dtype=float)
+
+    # --- job_tenure / age / dependents ---
+    job = ladder_scores(_F["job_tenure"], years)
+    ag = ladder_scores(_F["age"], age)
+    dep_score = ladder_scores(_F["dependents"], dep)
+
+    # --- dti_score ---
+    valid = (net_salary > 0) & (tenure > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(valid, ((outstanding / tenure) + emi) / net_salary, 0.0)
+    dti = np.where(valid, ladder_scores(_F["dti"], ratio), 0.0)
+
+    # --- final_decision ---
+    scores = {
+        "income": inc, "bank_balance": bal, "salary_consistency": sal,
+        "employer_type": emp, "job_tenure": job, "age": ag,
+        "dependents": dep_score, "residence": res, "dti": dti,
+    }
+    weighted = np.zeros(len(df))
+    for name, weight in WEIGHTS.items():
+        weighted = weighted + scores[name] * weight
+
+    applicant_type = df["applicant_type"].to_numpy()
+    tax_return = df["tax_return"].to_numpy() if "tax_return" in df.columns else np.full(len(df), "Yes")
+    no_tax_return = (applicant_type == "Businessman") & (tax_return == "No")
+    underage = ag == -1
+    no_balance = bal == 0
+    early_reject = no_tax_return | underage | no_balance
+
+    final_score = np.where(early_reject, 0.0, weighted)
+    decision = np.select(
+        [no_tax_return, early_reject, weighted >= APPROVE_CUTOFF, weighted >= REVIEW_CUTOFF],
+        ["Rejected", "Reject", "Approved", "Review"], default="Reject",
+    )
+    decision_display = np.select(
+        [no_tax_return, underage, no_balance, weighted >= APPROVE_CUTOFF, weighted >= REVIEW_CUTOFF],
+        ["❌ Rejected (No Tax Return)", "❌ Reject (Underage)", "❌ Reject (Insufficient Bank Balance)",
+         "✅ Approve", "🟡 Review"],
+        default="❌ Reject",
+    )
+
+    out = df.copy()
+    out["income_score"] = inc
+    out["bank_balance_score"] = bal
+    out["bank_balance_source"] = bal_source
+    out["salary_consistency_score"] = sal
+    out["employer_type_score"] = emp
+    out["job_tenure_score"] = job
+    out["age_score"] = ag
+    out["dependents_score"] = dep_score
+    out["residence_score"] = res
+    out["dti_ratio"] = ratio
+    out["dti_score"] = dti
+    out["final_score"] = final_score
+    out["decision"] = decision
+    out["decision_display"] = decision_display
+    out["rules_version"] = RULES_VERSION
+    return out
@@ -0,0 +1,134 @@
+"""
+Headless scoring service: the portal's eligibility rules over HTTP, for
+dealer partners who pre-screen applicants programmatically.
+
+    uvicorn scoring_service:app --workers 4 --host 0.0.0.0 --port 8000
+
+POST /score        one applicant        -> its scores and decision
+POST /score:batch  JSON array (<= PORTAL_SCORING_MAX_BATCH applicants) -> one result per applicant, same order
+GET  /health       liveness and the scoring rules version
+"""
+import os
+from typing import List, Literal, Optional
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field, field_validator
+
+from scoring import (
+    validate_cnic, validate_phone, score_applicant, score_frame,
+    EMPLOYER_TYPE_SCORES, RESIDENCE_SCORES, FINANCING_PLANS, RULES_VERSION, SCORE_COLUMNS,
+)
+
+
+# -----------------------------
+# Service Settings
+# -----------------------------
+MAX_BATCH = int(os.environ.get("PORTAL_SCORING_MAX_BATCH", "10000"))
+HOST = os.environ.get("PORTAL_SCORING_HOST", "127.0.0.1")
+PORT = int(os.environ.get("PORTAL_SCORING_PORT", "8000"))
+WORKERS = int(os.environ.get("PORTAL_SCORING_WORKERS", str(os.cpu_count() or 1)))
+
+
+# -----------------------------
+# Request / Response
+# -----------------------------
+class Applicant(BaseModel):
+    """ The Results tab's inputs; the financing plan supplies EMI and tenure """
+    reference: Optional[str] = Field(None, description="Echoed back so partners can match results")
+    applicant_type: Literal["Employee", "Businessman"]
+    gender: Literal["M", "F"]
+    cnic: Optional[str] = None
+    phone_number: Optional[str] = None
+    net_salary: float = Field(gt=0)
+    applicant_bank_balance: float = Field(ge=0)
+    guarantor_bank_balance: Optional[float] = Field(None, ge=0)
+    financing_plan: Literal[tuple(FINANCING_PLANS)]
+    salary_consistency: int = Field(ge=0, le=6)
+    employer_type: Literal[tuple(EMPLOYER_TYPE_SCORES)]
+    job_years: int = Field(ge=0)
+    age: int = Field(ge=0, le=120)
+    dependents: int = Field(ge=0)
+    residence: Literal[tuple(RESIDENCE_SCORES)]
+    outstanding: float = Field(0, ge=0)
+    tax_return: Literal["Yes", "No"] = "Yes"
+
+    @field_validator("cnic")
+    @classmethod
+    def _cnic(cls, v):
+        if v is not None and not validate_cnic(v):
+            raise ValueError("Invalid CNIC format. Use XXXXX-XXXXXXX-X")
+        return v
+
+    @field_validator("phone_number")
+    @classmethod
+    def _phone(cls, v):
+        if v is not None and not validate_phone(v):
+            raise ValueError("Invalid Phone Number - exactly 11 digits required")
+        return v
+
+    def inputs(self) -> dict:
+        plan = FINANCING_PLANS[self.financing_plan]
+        return dict(self.model_dump(), emi=plan["installment"], tenure=plan["tenure"])
+
+
+class Score(BaseModel):
+    reference: Optional[str] = None
+    income_score: float
+    bank_balance_score: float
+    bank_balance_source: str
+    salary_consistency_score: float
+    employer_type_score: float
+    job_tenure_score: float
+    age_score: float
+    dependents_score: float
+    residence_score: float
+    dti_ratio: float
+    dti_score: float
+    final_score: float
+    decision: str
+    decision_display: str
+    rules_version: str
+
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+app = FastAPI(title="Instalment Portal Scoring", version=RULES_VERSION)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "rules_version": RULES_VERSION}
+
+
+@app.post("/score", response_model=Score)
+async def score(applicant: Applicant):
+    # A handful of table lookups; cheaper inline than a threadpool hop
+    return {"reference": applicant.reference, **score_applicant(applicant.inputs())}
+
+
+@app.post("/score:batch", response_model=List[Score])
+def score_batch(applicants: List[Applicant]):
+    # Plain def: FastAPI runs it in its threadpool, so a big batch never blocks the event loop
+    if len(applicants) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH} applicants per batch")
+    if not applicants:
+        return []
+    scored = score_frame(pd.DataFrame([a.inputs() for a in applicants]))
+    # From the models, not the frame: a batch where only some set `reference` would read back NaN
+    return [
+        {"reference": a.reference, **row}
+        for a, row in zip(applicants, scored[SCORE_COLUMNS].to_dict("records"))
+    ]
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "scoring_service:app",
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+    )
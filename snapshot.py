@@ -0,0 +1,445 @@
+import argparse
+import glob
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from db import (
+    db_connection, data_version, get_storage, applicants_table, typed_table, arrow_frame,
+    APPLICANT_SELECT_COLUMNS, APPLICANT_DTYPES, BROWSE_FILTERS,
+)
+from metrics import span
+from scoring import normalize_cnic
+
+try:
+    import fcntl
+except ImportError:  # Windows: keep one syncing process per snapshot directory
+    fcntl = None
+
+
+# -----------------------------
+# Snapshot Settings
+# -----------------------------
+# Opt-in local Parquet copy of `data` (off unless PORTAL_SNAPSHOT_DIR is set; needs
+# migration 007). When set, the whole-table reads use it instead of pulling the table
+# over the WAN: the exports and the cash-flow projection (stream_applicants(),
+# iter_tables()) and fetch_all_applicants(). The Applicants browser keeps reading
+# indexed pages from the database, which are small and always current.
+#   python snapshot.py sync       # changes since the last sync (a full load the first time)
+#   python snapshot.py status
+#   python snapshot.py compact
+SNAPSHOT_DIR = os.environ.get("PORTAL_SNAPSHOT_DIR", "")
+# Reads sync first when this process wrote since the last sync, or it is older than this
+SNAPSHOT_MAX_AGE = float(os.environ.get("PORTAL_SNAPSHOT_MAX_AGE", "30"))
+# Every sync re-checks this window before its watermark, so a transaction that
+# commits after the watermark with an older updated_at is still picked up
+SYNC_OVERLAP = timedelta(seconds=float(os.environ.get("PORTAL_SNAPSHOT_OVERLAP", "300")))
+# The manifest remembers at most this many (newest) rows and tombstones seen inside that
+# window, so a bulk write cannot grow it to the size of the table; a row it no longer
+# remembers is fetched again while the window still shows it
+SYNC_RECENT_LIMIT = int(os.environ.get("PORTAL_SNAPSHOT_RECENT_LIMIT", "10000"))
+SYNC_CHUNK_SIZE = 5000
+
+# Deltas are folded into a new base once they hold this share of its rows (or there are this many)
+COMPACT_RATIO = 0.2
+MAX_DELTAS = 64
+
+MANIFEST = "manifest.json"
+
+# Stored wide (Parquet encodes small numbers compactly anyway) so every file has
+# one schema; reads narrow them back to APPLICANT_DTYPES
+SNAPSHOT_SCHEMA = pa.schema([
+    (c, pa.int64() if c == "id"
+        else pa.float64() if pa.types.is_integer(APPLICANT_DTYPES[c]) or pa.types.is_floating(APPLICANT_DTYPES[c])
+        else APPLICANT_DTYPES[c])
+    for c in APPLICANT_SELECT_COLUMNS
+])
+
+
+def _path(name: str, directory: str = None) -> str:
+    return os.path.join(directory or SNAPSHOT_DIR, name)
+
+
+def _timestamp(value) -> str:
+    """ Server timestamp (datetime from MySQL, text from SQLite) as comparable text """
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _before(timestamp: str, delta: timedelta) -> str:
+    return _timestamp(datetime.fromisoformat(timestamp) - delta)
+
+
+# -----------------------------
+# Manifest (the snapshot's only mutable file)
+# -----------------------------
+def load_manifest(directory: str = None):
+    path = _path(MANIFEST, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict, directory: str = None):
+    # Write-then-rename: readers see the old or the new snapshot, never a mix
+    path = _path(MANIFEST, directory)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def _remove_stale_files(manifest: dict, directory: str = None):
+    """ Data files of generations before the previous one (a read may still be using the previous one) """
+    keep = manifest["generation"] - 1
+    for path in glob.glob(_path("*.parquet", directory)):
+        generation = os.path.basename(path).split("-")[1].split(".")[0]
+        if generation.isdigit() and int(generation) < keep:
+            os.remove(path)
+
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _directory_lock(directory: str = None):
+    """ One sync or compaction at a time, across threads and (where flock exists) processes """
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        with open(_path(".lock", directory), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# -----------------------------
+# Sync
+# -----------------------------
+def _storage_table(rows: list) -> pa.Table:
+    return applicants_table(rows, APPLICANT_SELECT_COLUMNS).cast(SNAPSHOT_SCHEMA)
+
+
+def _recent(entries: dict, watermark: str) -> dict:
+    """ The SYNC_RECENT_LIMIT newest entries inside the overlap window of `watermark` """
+    since = _before(watermark, SYNC_OVERLAP)
+    recent = [(ts, key) for key, ts in entries.items() if ts >= since]
+    if len(recent) > SYNC_RECENT_LIMIT:
+        recent = heapq.nlargest(SYNC_RECENT_LIMIT, recent)
+    return {key: ts for ts, key in recent}
+
+
+def _full_load(generation: int, directory: str = None) -> dict:
+    """ Copy the whole table into a new base file (first sync, or `sync --full`) """
+    start = time.perf_counter()
+    base = f"base-{generation}.parquet"
+    recent, rows = [], 0  # heap of the newest (updated_at, id) in the overlap window
+    store = get_storage()
+    with db_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            watermark = _timestamp(store.now(cursor))
+            since = _before(watermark, SYNC_OVERLAP)
+            store.select(cursor, APPLICANT_SELECT_COLUMNS + ["updated_at"])
+            with pq.ParquetWriter(_path(base, directory), SNAPSHOT_SCHEMA) as writer:
+                while True:
+                    chunk = cursor.fetchmany(SYNC_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    for row in chunk:
+                        updated_at = _timestamp(row[-1])
+                        if updated_at >= since:
+                            entry = (updated_at, str(row[0]))
+                            if len(recent) < SYNC_RECENT_LIMIT:
+                                heapq.heappush(recent, entry)
+                            else:
+                                heapq.heappushpop(recent, entry)
+                    writer.write_table(_storage_table([row[:-1] for row in chunk]))
+                    rows += len(chunk)
+            conn.commit()
+        finally:
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+
+    return {
+        "generation": generation, "base": base, "base_rows": rows, "deltas": [],
+        "watermark": watermark, "recent": {"rows": {key: ts for ts, key in recent}, "deleted": {}},
+        "last_sync": {
+            "full": True, "at": watermark, "checked": rows, "changed": rows, "deleted": 0,
+            "seconds": time.perf_counter() - start,
+        },
+    }
+
+
+def _delta_sync(manifest: dict, directory: str = None) -> dict:
+    """
+    Fetch what changed since the watermark into a new delta file.
+    (id, updated_at) pairs in the overlap window come from the updated_at index;
+    only rows not already seen with that timestamp are fetched in full, so the
+    cost follows the number of changed rows, not the table size.
+    """
+    start = time.perf_counter()
+    since = _before(manifest["watermark"], SYNC_OVERLAP)
+    seen_rows, seen_deleted = manifest["recent"]["rows"], manifest["recent"]["deleted"]
+    store = get_storage()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            now = store.now(cursor)
+            # Both lookups and the row reads below share one consistent read
+            touched = {str(row_id): _timestamp(ts) for row_id, ts in store.changed_since(cursor, since)}
+            tombstones = {str(row_id): _timestamp(ts) for row_id, ts in store.deleted_since(cursor, since)}
+
+            changed = sorted(int(k) for k, ts in touched.items() if seen_rows.get(k) != ts)
+            rows = []
+            for i in range(0, len(changed), SYNC_CHUNK_SIZE):
+                ids = changed[i:i + SYNC_CHUNK_SIZE]
+                store.select(cursor, APPLICANT_SELECT_COLUMNS, ids=ids)
+                rows += cursor.fetchall()
+            conn.commit()
+        finally:
+            cursor.close()
+
+    deleted = sorted(int(k) for k in tombstones if k not in seen_deleted)
+    watermark = _timestamp(now)
+    manifest = dict(manifest, deltas=list(manifest["deltas"]), watermark=watermark)
+    if rows or deleted:
+        name = f"delta-{manifest['generation']}-{len(manifest['deltas']) + 1:05d}.parquet"
+        pq.write_table(_storage_table(rows), _path(name, directory))
+        manifest["deltas"].append({"file": name, "rows": len(rows), "deleted": deleted})
+    manifest["recent"] = {
+        "rows": _recent({**seen_rows, **touched}, watermark),
+        "deleted": _recent({**seen_deleted, **tombstones}, watermark),
+    }
+    manifest["last_sync"] = {
+        "full": False, "at": watermark, "checked": len(touched) + len(tombstones),
+        "changed": len(rows), "deleted": len(deleted), "seconds": time.perf_counter() - start,
+    }
+    return manifest
+
+
+def _needs_compaction(manifest: dict) -> bool:
+    pending = sum(d["rows"] + len(d["deleted"]) for d in manifest["deltas"])
+    return len(manifest["deltas"]) >= MAX_DELTAS or pending > COMPACT_RATIO * max(manifest["base_rows"], 1)
+
+
+def _compact(manifest: dict, directory: str = None) -> dict:
+    """ Fold the deltas into a new base (local work only; the watermark is kept) """
+    generation = manifest["generation"] + 1
+    base = f"base-{generation}.parquet"
+    rows = 0
+    with pq.ParquetWriter(_path(base, directory), SNAPSHOT_SCHEMA) as writer:
+        for table in _iter_tables(manifest, APPLICANT_SELECT_COLUMNS, None, SYNC_CHUNK_SIZE, directory):
+            writer.write_table(table.cast(SNAPSHOT_SCHEMA))
+            rows += table.num_rows
+    return dict(manifest, generation=generation, base=base, base_rows=rows, deltas=[])
+
+
+_synced = {"version": None, "at": float("-inf")}
+
+
+def sync(full: bool = False, directory: str = None) -> dict:
+    """ Bring the snapshot up to date (compacting when the deltas grew); returns the manifest """
+    directory = directory or SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    with _directory_lock(directory), span("snapshot.sync"):
+        version = data_version()
+        manifest = load_manifest(directory)
+        if full or manifest is None:
+            manifest = _full_load(manifest["generation"] + 1 if manifest else 1, directory)
+        else:
+            manifest = _delta_sync(manifest, directory)
+            if _needs_compaction(manifest):
+                manifest = _compact(manifest, directory)
+        _save_manifest(manifest, directory)
+        _remove_stale_files(manifest, directory)
+        _synced.update(version=version, at=time.monotonic())
+    return manifest
+
+
+def ensure_fresh() -> dict:
+    """ Sync if this process wrote since the last sync or it is older than SNAPSHOT_MAX_AGE """
+    with _lock:
+        fresh = _synced["version"] == data_version() and time.monotonic() - _synced["at"] < SNAPSHOT_MAX_AGE
+    return load_manifest() if fresh else sync()
+
+
+# -----------------------------
+# Reads (base + deltas, in id order)
+# -----------------------------
+def _filter_mask(table: pa.Table, filters: dict):
+    """ The browser filters of storage.SQLStorage._where(), evaluated on the snapshot """
+    mask = None
+    for column in BROWSE_FILTERS:
+        if filters.get(column):
+            mask = _and(mask, pc.equal(table[column].cast(pa.string()), filters[column]))
+    if filters.get("search"):
+        cnic = pc.starts_with(table["cnic"], normalize_cnic(filters["search"]))
+        phone = pc.starts_with(table["phone_number"], filters["search"])
+        mask = _and(mask, pc.or_kleene(cnic, phone))
+    return mask
+
+
+def _and(mask, condition):
+    condition = pc.fill_null(condition, False)
+    return condition if mask is None else pc.and_(mask, condition)
+
+
+def _filtered(table: pa.Table, filters: dict) -> pa.Table:
+    mask = _filter_mask(table, filters) if filters else None
+    return table if mask is None else table.filter(mask)
+
+
+def _changes(manifest: dict, columns: list, directory: str = None):
+    """
+    Newest version of every row in the deltas, sorted by id, and the ids whose
+    base rows they replace or delete (ids are never reused, so a deleted id
+    cannot come back in a later delta)
+    """
+    deleted = pa.array([i for d in manifest["deltas"] for i in d["deleted"]], pa.int64())
+    tables, seen = [], deleted
+    for delta in reversed(manifest["deltas"]):
+        table = pq.read_table(_path(delta["file"], directory), columns=columns)
+        table = table.filter(pc.invert(pc.is_in(table["id"], seen)))
+        seen = pa.concat_arrays([seen, table["id"].combine_chunks()])
+        tables.append(table)
+    changes = pa.concat_tables(tables) if tables else SNAPSHOT_SCHEMA.empty_table().select(columns)
+    return changes.sort_by("id"), seen
+
+
+def _iter_tables(manifest: dict, columns: list, filters, batch_size: int, directory: str = None):
+    """
+    The snapshot as Arrow tables of about `batch_size` rows in id order: base
+    batches minus superseded ids, merged with the delta rows of the same id range.
+    Memory holds one batch plus the (compaction-bounded) deltas.
+    """
+    read = list(dict.fromkeys(["id"] + columns + (BROWSE_FILTERS + ["cnic", "phone_number"] if filters else [])))
+    changes, superseded = _changes(manifest, read, directory)
+    changes = _filtered(changes, filters)
+    change_ids, position = changes["id"], 0
+
+    base = pq.ParquetFile(_path(manifest["base"], directory))
+    for batch in base.iter_batches(batch_size=batch_size, columns=read):
+        table = pa.Table.from_batches([batch])
+        if not table.num_rows:
+            continue
+        last_id = table["id"][-1]
+        table = _filtered(table.filter(pc.invert(pc.is_in(table["id"], superseded))), filters)
+        # Delta rows up to this batch's last id (both sides are sorted by id)
+        count = pc.sum(pc.less_equal(change_ids.slice(position), last_id)).as_py() or 0
+        if count:
+            table = pa.concat_tables([table, changes.slice(position, count)]).sort_by("id")
+            position += count
+        if table.num_rows:
+            yield table.select(columns)
+    if position < len(changes):
+        yield changes.slice(position).select(columns)
+
+
+def read_table(columns: list = None, filters: dict = None) -> pa.Table:
+    """ The synced snapshot (optionally only `columns`, filtered like the browser) as one Arrow table """
+    manifest = ensure_fresh()
+    columns = ["id"] + [c for c in (columns or APPLICANT_SELECT_COLUMNS) if c != "id"]
+    with span("snapshot.read"):
+        tables = list(_iter_tables(manifest, columns, filters, SYNC_CHUNK_SIZE))
+        return pa.concat_tables(tables) if tables else SNAPSHOT_SCHEMA.empty_table().select(columns)
+
+
+def read_frame(columns: list = None):
+    """ fetch_all_applicants() from the snapshot: `columns` in the requested order, typed like a DB read """
+    table = read_table(columns)
+    return arrow_frame(table.select(list(columns or APPLICANT_SELECT_COLUMNS)))
+
+
+def iter_tables(columns: list = None, filters: dict = None, chunksize: int = SYNC_CHUNK_SIZE):
+    """ The synced snapshot as Arrow tables of about `chunksize` rows in id order (numbers stored wide) """
+    manifest = ensure_fresh()
+    yield from _iter_tables(manifest, list(columns or APPLICANT_SELECT_COLUMNS), filters, chunksize)
+
+
+def stream_rows(filters: dict = None, chunksize: int = SYNC_CHUNK_SIZE, columns: list = None):
+    """ stream_applicants() from the snapshot: lists of row tuples (all columns, or `columns`) in id order """
+    for table in iter_tables(columns, filters, chunksize):
+        table = typed_table(table)
+        yield list(zip(*(column.to_pylist() for column in table.columns)))
+
+
+def snapshot_status(directory: str = None):
+    """ Size and freshness of the snapshot for Diagnostics / `status`, or None before the first sync """
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return None
+    return {
+        "generation": manifest["generation"],
+        "base_rows": manifest["base_rows"],
+        "deltas": len(manifest["deltas"]),
+        "delta_rows": sum(d["rows"] for d in manifest["deltas"]),
+        "deleted": sum(len(d["deleted"]) for d in manifest["deltas"]),
+        "watermark": manifest["watermark"],
+        "last_sync": manifest["last_sync"],
+        "bytes": sum(
+            os.path.getsize(_path(name, directory))
+            for name in [manifest["base"]] + [d["file"] for d in manifest["deltas"]]
+        ),
+    }
+
+
+def compact(directory: str = None) -> dict:
+    """ Fold the deltas into a new base now """
+    directory = directory or SNAPSHOT_DIR
+    with _directory_lock(directory):
+        manifest = _compact(load_manifest(directory), directory)
+        _save_manifest(manifest, directory)
+        _remove_stale_files(manifest, directory)
+    return manifest
+
+
+def print_status(status):
+    last = status["last_sync"]
+    print(
+        f"Generation {status['generation']}: {status['base_rows']:,} base rows, {status['deltas']} delta file(s) "
+        f"with {status['delta_rows']:,} changed and {status['deleted']:,} deleted rows, {status['bytes'] / 1e6:.1f} MB\n"
+        f"Watermark {status['watermark']}; last sync {'full' if last['full'] else 'delta'}: "
+        f"{last['checked']:,} checked, {last['changed']:,} fetched, {last['deleted']:,} deleted, {last['seconds'] * 1000:.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local columnar snapshot of the applicants table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_parser = sub.add_parser("sync", help="fetch changes since the last sync")
+    sync_parser.add_argument("--full", action="store_true", help="reload the whole table")
+    sub.add_parser("status", help="size and freshness of the snapshot")
+    sub.add_parser("compact", help="fold the deltas into a new base file")
+    args = parser.parse_args()
+
+    if not SNAPSHOT_DIR:
+        parser.error("set PORTAL_SNAPSHOT_DIR to the snapshot directory")
+    if args.command == "sync":
+        sync(full=args.full)
+    elif args.command == "compact":
+        if load_manifest() is None:
+            parser.error("no snapshot yet; run `sync` first")
+        compact()
+    status = snapshot_status()
+    if status is None:
+        print("No snapshot yet")
+        return
+    print_status(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import os
+import sqlite3
+from decimal import Decimal
+
+from mysql.connector import errorcode, errors, pooling
+
+from scoring import normalize_cnic
+
+
+# -----------------------------
+# Storage Backend Settings
+# -----------------------------
+# Where applicants are stored, per deployment:
+#   mysql   the shared MySQL/MariaDB server (PORTAL_DB_* in db.py)
+#   sqlite  one local file, for a branch office that runs on its own with no network round trips
+# Every statement db.py, snapshot.py, rescore.py and journal.py run against
+# `data` is a method of SQLStorage below, rendered in the backend's dialect;
+# tests/test_storage.py runs the same checks against each backend.
+BACKEND = os.environ.get("PORTAL_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get(
+    "PORTAL_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "portal.sqlite"),
+)
+# Seconds a write waits for another session's transaction before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("PORTAL_SQLITE_BUSY_TIMEOUT", "10"))
+
+BACKENDS = ["mysql", "sqlite"]
+
+
+class DatabaseLocked(sqlite3.OperationalError):
+    """ SQLite busy timeout ran out while another connection held the write lock """
+
+
+# Errors of either backend; the retryable ones are worth another attempt:
+# pool exhausted, a stale connection that failed to reconnect, or a SQLite file locked by a writer
+DATABASE_ERRORS = (errors.Error, sqlite3.Error)
+INTEGRITY_ERRORS = (errors.IntegrityError, sqlite3.IntegrityError)
+RETRYABLE_ERRORS = (errors.PoolError, errors.InterfaceError, errors.OperationalError, DatabaseLocked)
+# The server could not be reached or went away mid-statement: nothing was written, so a
+# queued write is worth retrying later (mysql.connector raises some of these as a bare errors.Error)
+CONNECTION_ERRNOS = {errorcode.CR_CONN_HOST_ERROR, errorcode.CR_SERVER_LOST, errorcode.ER_QUERY_TIMEOUT}
+
+# DECIMAL values read from MySQL can come back through a SQLite write (e.g. a re-save)
+sqlite3.register_adapter(Decimal, float)
+
+
+def is_retryable(error) -> bool:
+    """ Transient on either backend, or a connection-level MySQL failure (timeout, host down, server gone) """
+    return (
+        isinstance(error, RETRYABLE_ERRORS + (errors.ConnectionTimeoutError,))
+        or getattr(error, "errno", None) in CONNECTION_ERRNOS
+    )
+
+
+def is_duplicate_key(error) -> bool:
+    """ Unique index violation (the CNIC index) on either backend """
+    if isinstance(error, errors.IntegrityError):
+        return error.errno == errorcode.ER_DUP_ENTRY
+    return isinstance(error, sqlite3.IntegrityError) and str(error).startswith("UNIQUE constraint failed")
+
+
+# -----------------------------
+# Applicant Operations
+# -----------------------------
+# Equality filters the browser pushes down into SQL; `search` is a CNIC/phone prefix
+BROWSE_FILTERS = ["decision", "city", "applicant_type", "bike_type"]
+
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class SQLStorage:
+    """
+    The statements the portal runs against `data`, written once: a backend only
+    supplies its placeholder (PARAM) and its microsecond clock (NOW), so no SQL
+    is rewritten on the way to the driver. Methods take a cursor of connect();
+    checkout, retries and transactions stay with the caller. Column names come
+    from the caller's own lists, never from user input.
+
+    Queries outside these methods (portfolio.py's aggregates) take no parameters
+    and stick to SQL both engines parse: COALESCE, CASE, SUM/COUNT, UNION ALL.
+    """
+
+    PARAM = "%s"
+    NOW = "NOW(6)"
+
+    def _params(self, count: int) -> str:
+        return ", ".join([self.PARAM] * count)
+
+    def _where(self, filters=None, ids=(), ranges=(), after_id=None):
+        """
+        WHERE clause (or "") and params: the browser `filters`, then `ids` OR the
+        inclusive (first, last) id `ranges`, then id > `after_id`; all ANDed
+        """
+        p = self.PARAM
+        clauses, params = [], []
+        filters = filters or {}
+        for column in BROWSE_FILTERS:
+            if filters.get(column):
+                clauses.append(f"{column} = {p}")
+                params.append(filters[column])
+        if filters.get("search"):
+            # CNICs are stored without dashes, so "35202-12" matches as "3520212"
+            # The escape character is a parameter: SQLite has no default and spells the literal differently
+            clauses.append(f"(cnic LIKE {p} ESCAPE {p} OR phone_number LIKE {p} ESCAPE {p})")
+            params += [_like_prefix(normalize_cnic(filters["search"])), "\\", _like_prefix(filters["search"]), "\\"]
+        if ids or ranges:
+            alternatives = []
+            if ids:
+                alternatives.append(f"id IN ({self._params(len(ids))})")
+                params += [int(i) for i in ids]
+            for first, last in ranges:
+                alternatives.append(f"id BETWEEN {p} AND {p}")
+                params += [int(first), int(last)]
+            clauses.append(f"({' OR '.join(alternatives)})")
+        if after_id is not None:
+            clauses.append(f"id > {p}")
+            params.append(int(after_id))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def insert(self, cursor, columns: list, rows: list):
+        """ `rows` (tuples in `columns` order) with one executemany """
+        cursor.executemany(f"INSERT INTO data ({', '.join(columns)}) VALUES ({self._params(len(columns))})", rows)
+
+    def select(self, cursor, columns: list, filters=None, ids=(), ranges=(), after_id=None, limit=None):
+        """ Run the SELECT of `columns` in id order (see _where); the caller fetches the rows """
+        where, params = self._where(filters, ids, ranges, after_id)
+        query = f"SELECT {', '.join(columns)} FROM data{where} ORDER BY id ASC"
+        if limit is not None:
+            query += f" LIMIT {self.PARAM}"
+            params.append(int(limit))
+        cursor.execute(query, params)
+
+    def select_by_cnic(self, cursor, columns: list, cnics) -> list:
+        """ `columns` of the rows stored under the (normalized) `cnics`, through the unique index """
+        cnics = list(cnics)
+        cursor.execute(f"SELECT {', '.join(columns)} FROM data WHERE cnic IN ({self._params(len(cnics))})", cnics)
+        return cursor.fetchall()
+
+    def count(self, cursor, filters=None, ids=(), ranges=()) -> int:
+        where, params = self._where(filters, ids, ranges)
+        cursor.execute(f"SELECT COUNT(*) FROM data{where}", params)
+        (count,) = cursor.fetchone()
+        return count
+
+    def delete(self, cursor, filters=None, ids=(), ranges=()) -> int:
+        """ One DELETE of the matching rows; returns how many were deleted """
+        where, params = self._where(filters, ids, ranges)
+        if not where:
+            raise ValueError("Refusing to delete every applicant: no condition given")
+        cursor.execute(f"DELETE FROM data{where}", params)
+        return cursor.rowcount
+
+    def select_unscored(self, cursor, columns: list, rules_version: str, after_id: int, limit: int,
+                        required=()) -> list:
+        """
+        The next `limit` rows after `after_id` not yet decided by `rules_version`, by id;
+        rows with a NULL in any `required` column cannot be scored and are left out
+        """
+        p = self.PARAM
+        stored = "".join(f" AND {c} IS NOT NULL" for c in required)
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM data "
+            f"WHERE id > {p} AND (rules_version IS NULL OR rules_version <> {p}){stored} ORDER BY id LIMIT {p}",
+            (after_id, rules_version, limit),
+        )
+        return cursor.fetchall()
+
+    def count_missing(self, cursor, columns: list) -> int:
+        """ Rows with a NULL in any of `columns` """
+        cursor.execute(f"SELECT COUNT(*) FROM data WHERE {' OR '.join(f'{c} IS NULL' for c in columns)}")
+        (count,) = cursor.fetchone()
+        return count
+
+    def set_decision(self, cursor, decision: str, rules_version: str, ids: list) -> int:
+        cursor.execute(
+            f"UPDATE data SET decision = {self.PARAM}, rules_version = {self.PARAM} WHERE id IN ({self._params(len(ids))})",
+            [decision, rules_version] + [int(i) for i in ids],
+        )
+        return cursor.rowcount
+
+    def now(self, cursor):
+        """ The server's clock, at the precision of `updated_at` """
+        cursor.execute(f"SELECT {self.NOW}")
+        # fetchall: an unbuffered MySQL cursor must read to the end before the next statement
+        return cursor.fetchall()[0][0]
+
+    def changed_since(self, cursor, since) -> list:
+        """ (id, updated_at) of every row written at or after `since`, from the updated_at index """
+        cursor.execute(f"SELECT id, updated_at FROM data WHERE updated_at >= {self.PARAM}", (since,))
+        return cursor.fetchall()
+
+    def deleted_since(self, cursor, since) -> list:
+        """ (id, deleted_at) of every row deleted at or after `since` (migration 007's tombstones) """
+        cursor.execute(f"SELECT id, deleted_at FROM data_deleted WHERE deleted_at >= {self.PARAM}", (since,))
+        return cursor.fetchall()
+
+
+# -----------------------------
+# MySQL / MariaDB
+# -----------------------------
+class MySQLStorage(SQLStorage):
+    """ The shared server, through one connection pool per process """
+
+    name = "mysql"
+
+    def __init__(self, config: dict, pool_size: int):
+        self.config = config
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name="instalment_portal",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            **config
+        )
+
+    def connect(self):
+        """ A pooled connection; the pool pings it and reconnects it if it went stale """
+        return self.pool.get_connection()
+
+    def ensure_schema(self):
+        """ Nothing to do: the server's schema is managed with migrations/*.sql """
+
+
+# -----------------------------
+# SQLite (local file)
+# -----------------------------
+# Same text layout as MySQL's TIMESTAMP(6), at millisecond precision
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# `data` as it stands after migrations 001-007, in SQLite types.
+# AUTOINCREMENT keeps deleted ids from being handed out again, as InnoDB does.
+SQLITE_TABLES = [
+    f"""CREATE TABLE IF NOT EXISTS data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        applicant_type TEXT, name TEXT, cnic TEXT NOT NULL, license_no TEXT,
+        phone_number TEXT, gender TEXT,
+        guarantors TEXT, female_guarantor TEXT, electricity_bill TEXT, pdc_option TEXT,
+        education TEXT, occupation TEXT, designation TEXT,
+        employer_name TEXT, employer_contact TEXT,
+        address TEXT, city TEXT, state_province TEXT, postal_code TEXT, country TEXT,
+        net_salary REAL, applicant_bank_balance REAL, guarantor_bank_balance REAL,
+        employer_type TEXT, age INTEGER, residence TEXT,
+        bike_type TEXT, bike_price REAL, down_payment REAL, tenure INTEGER, emi REAL,
+        outstanding REAL, salary_consistency INTEGER, job_years INTEGER, dependents INTEGER, tax_return TEXT,
+        decision TEXT, rules_version TEXT,
+        updated_at TEXT NOT NULL DEFAULT ({SQLITE_NOW})
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_data_cnic ON data (cnic)",
+    "CREATE INDEX IF NOT EXISTS idx_data_decision_id ON data (decision, id)",
+    "CREATE INDEX IF NOT EXISTS idx_data_city_id ON data (city, id)",
+    "CREATE INDEX IF NOT EXISTS idx_data_applicant_type_id ON data (applicant_type, id)",
+    "CREATE INDEX IF NOT EXISTS idx_data_bike_type_id ON data (bike_type, id)",
+    "CREATE INDEX IF NOT EXISTS idx_data_phone_number ON data (phone_number)",
+    "CREATE INDEX IF NOT EXISTS idx_data_updated_at ON data (updated_at)",
+    """CREATE TABLE IF NOT EXISTS portfolio_summary (
+        dimension TEXT NOT NULL, value TEXT NOT NULL,
+        applicants INTEGER NOT NULL DEFAULT 0, financed REAL NOT NULL DEFAULT 0, emi_total REAL NOT NULL DEFAULT 0,
+        dti_sum REAL NOT NULL DEFAULT 0, dti_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, value)
+    )""",
+    f"CREATE TABLE IF NOT EXISTS data_deleted (id INTEGER PRIMARY KEY, deleted_at TEXT NOT NULL DEFAULT ({SQLITE_NOW}))",
+    "CREATE INDEX IF NOT EXISTS idx_data_deleted_deleted_at ON data_deleted (deleted_at)",
+]
+
+
+def _summary_upsert(row: str, sign: int) -> str:
+    """ SQLite version of migration 005's portfolio_summary_apply() for trigger row `row` (NEW/OLD) """
+    from portfolio import SUMMARY_COLUMNS, SUMMARY_DIMENSIONS  # portfolio.py imports db.py, which imports this module
+
+    financed = f"COALESCE({row}.bike_price, 0) - COALESCE({row}.down_payment, 0)"
+    dti = (
+        f"CASE WHEN {row}.net_salary > 0 AND {row}.tenure > 0 "
+        f"THEN (COALESCE({row}.outstanding, 0) * 1.0 / {row}.tenure + COALESCE({row}.emi, 0)) / {row}.net_salary END"
+    )
+    figures = f"{sign}, {sign} * ({financed}), {sign} * COALESCE({row}.emi, 0), {sign} * COALESCE({dti}, 0), {sign} * (({dti}) IS NOT NULL)"
+    values = [f"('all', '', {figures})"] + [f"('{d}', COALESCE({row}.{d}, ''), {figures})" for d in SUMMARY_DIMENSIONS]
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in SUMMARY_COLUMNS[2:])
+    return (
+        f"INSERT INTO portfolio_summary ({', '.join(SUMMARY_COLUMNS)}) VALUES {', '.join(values)} "
+        f"ON CONFLICT (dimension, value) DO UPDATE SET {updates};"
+    )
+
+
+def sqlite_triggers() -> list:
+    """ Migration 005's summary triggers and 007's ON UPDATE timestamp and tombstones """
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS data_summary_insert AFTER INSERT ON data BEGIN {_summary_upsert('NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS data_summary_delete AFTER DELETE ON data BEGIN {_summary_upsert('OLD', -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS data_summary_update AFTER UPDATE ON data "
+        f"BEGIN {_summary_upsert('OLD', -1)} {_summary_upsert('NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS data_touch AFTER UPDATE ON data WHEN NEW.updated_at = OLD.updated_at "
+        f"BEGIN UPDATE data SET updated_at = {SQLITE_NOW} WHERE id = NEW.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS data_tombstone AFTER DELETE ON data BEGIN "
+        f"INSERT INTO data_deleted (id) VALUES (OLD.id) ON CONFLICT (id) DO UPDATE SET deleted_at = {SQLITE_NOW}; END",
+    ]
+
+
+class _SQLiteCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _run(self, method, query, params):
+        try:
+            return method(query, params)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                raise DatabaseLocked(str(e)) from e
+            raise
+
+    def execute(self, query, params=()):
+        return self._run(self._cursor.execute, query, tuple(params or ()))
+
+    def executemany(self, query, rows):
+        return self._run(self._cursor.executemany, query, rows)
+
+    def __getattr__(self, attr):
+        return getattr(self._cursor, attr)
+
+
+class SQLiteConnection:
+    """ sqlite3 connection with the calls db.py makes on a mysql.connector one (SQL is passed through as is) """
+
+    # SQLite cursors never leave a half-read result on the connection
+    unread_result = False
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+
+    def cursor(self, *args, **kwargs):
+        # buffered=False needs no counterpart: SQLite cursors step through results lazily
+        return _SQLiteCursor(self._conn.cursor())
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+
+def create_sqlite_schema(path: str, triggers: bool = True):
+    """ Create whatever is missing at `path` (a new file gets the full schema) """
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT)
+    try:
+        # WAL: readers never wait for the writer, and it sticks to the file
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SQLITE_TABLES + (sqlite_triggers() if triggers else []):
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class SQLiteStorage(SQLStorage):
+    """ One local SQLite file in WAL mode; every checkout opens its own connection """
+
+    name = "sqlite"
+    PARAM = "?"
+    NOW = SQLITE_NOW
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ensure_schema()
+
+    def connect(self):
+        return SQLiteConnection(self.path)
+
+    def ensure_schema(self):
+        create_sqlite_schema(self.path)
+
+
+def describe(config: dict) -> str:
+    """ Where PORTAL_DB_BACKEND stores applicants, for diagnostics (does not connect) """
+    if BACKEND == "sqlite":
+        return f"SQLite {SQLITE_PATH}"
+    return f"MySQL {config['host']}:{config['port']}/{config['database']}"
+
+
+def open_storage(backend: str, config: dict, pool_size: int):
+    """ The storage for PORTAL_DB_BACKEND (`config` and `pool_size` are MySQL's) """
+    if backend == "mysql":
+        return MySQLStorage(config, pool_size)
+    if backend == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+    raise ValueError(f"Unknown PORTAL_DB_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
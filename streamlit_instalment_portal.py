@@ -1,278 +1,34 @@
-import streamlit as st
+import importlib
+import io
+import os
 import re
+import threading
 import urllib.parse
-import mysql.connector
-import pandas as pd
-from io import BytesIO
-
-
-# -----------------------------
-# Database Connection
-# -----------------------------
-def get_db_connection():
-    return mysql.connector.connect(
-        host="3.17.21.91",
-        user="ahsan",
-        password="ahsan@321",
-        database="ev_installment_project"
-    )
-def save_to_db(data: dict):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # --- Check if CNIC already exists ---
-    cursor.execute("SELECT COUNT(*) FROM data WHERE cnic = %s", (data["cnic"],))
-    (exists,) = cursor.fetchone()
-    if exists > 0:
-        cursor.close()
-        conn.close()
-        raise ValueError("❌ CNIC already exists in the database. Please enter a unique CNIC.")
-
-    # Columns in the exact order we will pass values
-    columns = [
-        "applicant_type", "name", "cnic", "license_no",
-        "phone_number", "gender",
-        "guarantors", "female_guarantor", "electricity_bill", "pdc_option",  
-        "education", "occupation", "designation",
-        "employer_name", "employer_contact",
-        "address", "city", "state_province", "postal_code", "country",
-        "net_salary", "applicant_bank_balance", "guarantor_bank_balance",
-        "employer_type", "age", "residence",
-        "bike_type", "bike_price", "down_payment", "tenure", "emi",
-        "outstanding",
-        "decision"
-    ]
-
-    full_name = f"{data['first_name']} {data['last_name']}".strip()
-    full_address = f"{data['street_address']}, {data['area_address']}"
-
-    # Values in the same order as `columns`
-    values = (
-        data["applicant_type"],
-        full_name, data["cnic"], data["license_no"],
-        data["phone_number"], data["gender"],
-        data["guarantors"], data["female_guarantor"], data["electricity_bill"], data["pdc_option"],
-        data.get("education"), data.get("occupation"), data.get("designation"),
-        data.get("employer_name"), data.get("employer_contact"),
-        full_address, data["city"], data["state_province"], data["postal_code"], data["country"],
-        data["net_salary"], data["applicant_bank_balance"], data.get("guarantor_bank_balance"),
-        data["employer_type"], data["age"], data["residence"],
-        data["bike_type"], data["bike_price"], data["down_payment"], data["tenure"], data["emi"],data["outstanding"],
-        data["decision"]
-    )
-
-
-    # Build placeholders dynamically so counts always match
-    placeholders = ", ".join(["%s"] * len(values))
-    cols_sql = ", ".join(columns)
-    query = f"INSERT INTO data ({cols_sql}) VALUES ({placeholders})"
-
-    cursor.execute(query, values)
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-
-def fetch_all_applicants():
-    conn = get_db_connection()
-    query = """
-    SELECT 
-        id, 
-        applicant_type,
-        name, 
-        cnic, 
-        license_no,
-        phone_number, 
-        gender,
-        guarantors, 
-        female_guarantor, 
-        electricity_bill,
-        pdc_option,
-        education, 
-        occupation, 
-        designation,
-        employer_name,
-        employer_contact,
-        address, 
-        city, 
-        state_province, 
-        postal_code, 
-        country,
-        net_salary, 
-        applicant_bank_balance, 
-        guarantor_bank_balance,
-        employer_type, 
-        age, 
-        residence,
-        bike_type, 
-        bike_price, 
-        down_payment,
-        tenure,
-        emi, 
-        outstanding,
-        decision
-    FROM data
-    ORDER BY id ASC;
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
-
-
-def resequence_ids():
-    """ Re-sequence IDs after deletion and reset AUTO_INCREMENT """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SET @count = 0;")
-        cursor.execute("UPDATE data SET id = (@count := @count + 1)")
-        cursor.execute("ALTER TABLE data AUTO_INCREMENT = 1")
-        conn.commit()
-        cursor.close()
-        conn.close()
-        st.success("✅ IDs resequenced successfully!")
-    except Exception as e:
-        st.error(f"❌ Failed to resequence IDs: {e}")
-
-import math
-import re
-
-# -----------------------------
-# Validation Functions
-# -----------------------------
-def validate_cnic(cnic: str) -> bool:
-    return bool(re.fullmatch(r"\d{5}-?\d{7}-?\d", cnic))
-
 
-def validate_phone(phone: str) -> bool:
-    return phone.isdigit() and len(phone) == 11
-
-# -----------------------------
-# Scoring Functions
-# -----------------------------
-def income_score(net_salary, gender):
-    if net_salary < 50000:
-        base = 0
-    elif net_salary < 70000:
-        base = 20
-    elif net_salary < 90000:
-        base = 35
-    elif net_salary < 100000:
-        base = 50
-    elif net_salary < 120000:
-        base = 60
-    elif net_salary < 150000:
-        base = 80
-    else:
-        base = 100
-    if gender == "F":
-        base *= 1.1
-    return min(base, 100)
-    
-def bank_balance_score_custom(applicant_balance, guarantor_balance, emi):
-    """
-    Binary scoring logic:
-    - Applicant >= 3x EMI → 100
-    - Guarantor >= 6x EMI → 100
-    - If both provided:
-        → Applicant takes priority if both qualify
-    """
-    score = 0
-    source = "None"
-
-    applicant_ok = applicant_balance is not None and applicant_balance >= 3 * emi
-    guarantor_ok = guarantor_balance is not None and guarantor_balance >= 6 * emi
-
-    if applicant_ok and guarantor_ok:
-        score, source = 100, "Applicant (Priority)"
-    elif applicant_ok:
-        score, source = 100, "Applicant"
-    elif guarantor_ok:
-        score, source = 100, "Guarantor"
-    else:
-        score, source = 0, "None"
-
-    return score, source
-
-
-def salary_consistency_score(months):
-    return min((months / 6) * 100, 100)
-
-def employer_type_score(emp_type):
-    mapping = {"Govt": 100, "MNC": 80, "Private Limited": 70, "SME": 60, "Startup": 40, "Self-employed": 20}
-    return mapping.get(emp_type, 0)
+import streamlit as st
 
-def job_tenure_score(years):
-    if years >= 10:
-        return 100
-    elif years >= 5:
-        return 70
-    elif years >= 3:
-        return 50
-    elif years >= 1:
-        return 20
-    else:
-        return 0
-
-def age_score(age):
-    if age < 18:
-        return -1  # reject
-    elif age <= 25:
-        return 80
-    elif age <= 30:
-        return 100
-    elif age <= 40:
-        return 60
-    else:
-        return 30
-
-def dependents_score(dep):
-    if dep == 0:
-        return 100
-    elif dep <= 2:
-        return 80
-    elif dep <= 4:
-        return 60
-    else:
-        return 40
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
-def residence_score(res):
-    mapping = {"Owned": 100, "Family": 80, "Rented": 60, "Temporary": 40}
-    return mapping.get(res, 0)
+# Everything past the landing page; pandas alone is half a second on a cold start
+PORTAL_MODULES = ["pandas", "db", "scoring", "journal", "metrics", "profiling", "bulk_import", "export", "portfolio", "whatif", "snapshot", "cashflow"]
 
-def dti_score(outstanding, emi, net_salary, tenure):
-    """
-    Debt-to-Income (DTI) Score:
-    ratio = (Outstanding / tenure + EMI) / Net Salary
-    """
-    if net_salary <= 0 or tenure <= 0:
-        return 0, 0
-
-    monthly_obligation = (outstanding / tenure) + emi
-    ratio = monthly_obligation / net_salary
-
-    if ratio <= 0.1:
-        score = 100
-    elif ratio <= 0.2:
-        score = 80
-    elif ratio <= 0.3:
-        score = 60
-    elif ratio <= 0.5:
-        score = 40
-    else:
-        score = 20
 
-    return score, ratio
+@st.cache_resource
+def load_css(name: str) -> str:
+    """ Stylesheets are read from disk once per server process """
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
 
-def calculate_min_emi(bike_price, down_payment, tenure):
-    """Minimum EMI needed to cover bike price"""
-    if tenure <= 0:
-        return 0
-    return math.ceil((bike_price - down_payment) / tenure)
 
+@st.cache_resource
+def preload_portal():
+    """ Import PORTAL_MODULES on a background thread, once per server process """
+    def preload():
+        for module in PORTAL_MODULES:
+            importlib.import_module(module)
 
+    threading.Thread(target=preload, name="portal-preload", daemon=True).start()
 
-import streamlit as st
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="EV Bike Finance Portal", layout="centered")
@@ -284,54 +40,7 @@ if 'app_started' not in st.session_state:
 # --- LANDING PAGE ---
 if not st.session_state['app_started']:
     # Custom styling (gradient background + blue button)
-    page_bg = """
-    <style>
-    [data-testid="stAppViewContainer"] {
-        background: linear-gradient(135deg, #001F3F 0%, #0074D9 50%, #7FDBFF 100%);
-        color: white;
-        padding-top: 6rem;
-    }
-    [data-testid="stHeader"] {background: rgba(0,0,0,0);}
-    .title {
-        font-size: 2.8rem;
-        font-weight: 800;
-        margin-bottom: 1rem;
-        text-align: center;
-        background: linear-gradient(to right, #7FDBFF, #39CCCC, #01FF70);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-    .subtitle {
-        font-size: 1.1rem;
-        color: #E0E0E0;
-        text-align: center;
-        margin-bottom: 2.5rem;
-    }
-    .divider {
-        border: none;
-        height: 1px;
-        background-color: rgba(255, 255, 255, 0.3);
-        margin: 2rem 0;
-    }
-    /* --- Custom blue button --- */
-    div.stButton > button:first-child {
-        background-color: #0074D9;
-        color: white;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        border-radius: 10px;
-        font-size: 1.1rem;
-        font-weight: 600;
-        transition: 0.3s ease-in-out;
-    }
-    div.stButton > button:first-child:hover {
-        background-color: #005fa3;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 10px rgba(0,0,0,0.3);
-    }
-    </style>
-    """
-    st.markdown(page_bg, unsafe_allow_html=True)
+    st.markdown(load_css("landing.css"), unsafe_allow_html=True)
 
     # Main content block
     st.markdown('<h1 class="title">⚡ EV Bike Finance Portal</h1>', unsafe_allow_html=True)
@@ -347,67 +56,79 @@ if not st.session_state['app_started']:
         st.session_state['app_started'] = True
         st.rerun()
 
+    # Import the rest of the portal while the officer reads this page
+    preload_portal()
     st.stop()
-st.markdown(
+
+# -----------------------------
+# Portal Dependencies
+# -----------------------------
+# Imported only past the landing page (already loaded by preload_portal() by then)
+import numpy as np
+import pandas as pd
+
+from db import (
+    refresh_reads,
+    fetch_applicants_page, count_applicants, count_applicants_by_id, cnic_exists, quick_lookup,
+    data_version, get_cache_stats, get_pool_stats, APPLICANT_VIEWS,
+    delete_applicants, delete_matching_applicants,
+)
+from bulk_import import import_applicants, IMPORT_COLUMNS
+from export import export_applicants, EXPORT_FORMATS
+from journal import enqueue_save, journal_counts, failed_saves, retry_failed, discard_failed, start_worker
+from metrics import span, tab, render_prometheus, start_metrics_server
+from portfolio import fetch_portfolio_summary, portfolio_kpis, breakdown, rebuild_portfolio_summary
+from whatif import what_if_grid, qualifying_values
+from snapshot import SNAPSHOT_DIR, snapshot_status
+from cashflow import fetch_projection, monthly_inflows, amortization, write_projection, PROJECTION_DIMENSIONS, PROJECTION_FORMATS
+from profiling import begin_rerun, end_rerun, profiled_fragment, section_totals, to_speedscope, to_folded
+from scoring import (
+    validate_cnic, validate_phone,
+    income_score, bank_balance_score_custom, salary_consistency_score,
+    employer_type_score, job_tenure_score, age_score, dependents_score,
+    residence_score, dti_score, final_decision, FINANCING_PLANS, RULES_VERSION,
+)
+
+
+# -----------------------------
+# Applicants Snapshot (per session)
+# -----------------------------
+def load_applicants_page(filters: dict, after_id, page_size: int, view: str):
     """
-    <style>
-    /* 🔵 Global Blue Gradient Background */
-    [data-testid="stAppViewContainer"] {
-        background: linear-gradient(to bottom right, #004aad, #5de0e6);
-        background-attachment: fixed;
-    }
+    Query a page only when the filters, cursor, page size or view change, or when
+    any session has written since (the shared data version moved on)
+    """
+    key = (tuple(sorted(filters.items())), after_id, page_size, view, data_version())
+    cached = st.session_state.get("applicants_page")
+    if cached is None or cached["key"] != key:
+        df, has_next = fetch_applicants_page(filters, after_id, page_size, tuple(APPLICANT_VIEWS[view]))
+        cached = st.session_state.applicants_page = {"key": key, "df": df, "has_next": has_next}
+    return cached["df"], cached["has_next"]
 
-    /* 📄 Solid White Form Container */
-    .block-container {
-        background-color: #ffffff;  /* Fully opaque white */
-        padding: 2rem 3rem;
-        border-radius: 20px;
-        box-shadow: 0px 3px 10px rgba(0,0,0,0.2);
-        margin-top: 2rem;
-        margin-bottom: 2rem;
-    }
 
-    /* 🌈 Headings on Blue Background (Landing Page Titles) */
-    h1, h2, h3, h4 {
-        color: #ffffff;
-        font-weight: 700;
-    }
+def load_applicants_count(filters: dict):
+    """ COUNT(*) runs only when the filters or the data change """
+    key = (tuple(sorted(filters.items())), data_version())
+    cached = st.session_state.get("applicants_count")
+    if cached is None or cached["key"] != key:
+        cached = st.session_state.applicants_count = {"key": key, "count": count_applicants(filters)}
+    return cached["count"]
 
-    /* 🧾 Form and Body Text (on white areas) */
-    .stTextInput label,
-    .stSelectbox label,
-    .stNumberInput label,
-    .stRadio label,
-    .stCheckbox label,
-    p, span, div, label {
-        color: #002b80 !important;  /* Dark blue text for readability */
-    }
 
-    /* 💾 Primary Buttons */
-    button[kind="primary"] {
-        background-color: #004aad !important;
-        color: white !important;
-        font-weight: 600 !important;
-        border-radius: 10px !important;
-        border: none !important;
-    }
+def invalidate_applicants():
+    st.session_state.applicants_page = None
+    st.session_state.applicants_count = None
 
-    button[kind="primary"]:hover {
-        background-color: #0059d6 !important;
-        color: white !important;
-    }
 
-    /* 🎯 Input Styling */
-    .stTextInput > div > div > input,
-    .stNumberInput input,
-    .stSelectbox select {
-        border-radius: 10px !important;
-        border: 1px solid #004aad !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Saves are queued locally and written to MySQL by this process's drain thread
+start_worker()
+# Timing histograms on http://127.0.0.1:PORTAL_METRICS_PORT/metrics
+start_metrics_server()
+# Admin profiling (?profile=N&token=...); a no-op unless PORTAL_PROFILE_TOKEN is set.
+# Fragment reruns skip this and end_rerun(); @profiled_fragment samples those.
+begin_rerun(__file__)
+
+st.markdown(load_css("portal.css"), unsafe_allow_html=True)
 
 
 # -----------------------------
@@ -415,12 +136,12 @@ st.markdown(
 # -----------------------------
 st.title("⚡ Electric Bike Finance Portal")
 
-tabs = st.tabs(["📋 Applicant Information", "📊 Evaluation", "🎯 Results", "📂 Applicants"])
+tabs = st.tabs(["📋 Applicant Information", "📊 Evaluation", "🎯 Results", "📂 Applicants", "📈 Portfolio"])
 
 # -----------------------------
 # Page 1: Applicant Info
 # -----------------------------
-with tabs[0]:
+with tabs[0], tab("Applicant Information"):
     st.subheader("Applicant Information")
 
     applicant_type = st.selectbox(
@@ -435,6 +156,11 @@ with tabs[0]:
     cnic = st.text_input("CNIC Number (Format: XXXXX-XXXXXXX-X)")
     if cnic and not validate_cnic(cnic):
         st.error("❌ Invalid CNIC format. Use XXXXX-XXXXXXX-X")
+    elif cnic:
+        # Indexed lookup, served from the shared cache on later reruns; skipped while the
+        # database is slow or down (Save checks again, and the unique index on drain)
+        if quick_lookup(cnic_exists, cnic):
+            st.error("❌ CNIC already exists in the database. Please enter a unique CNIC.")
 
     license_suffix = st.number_input(
         "Enter last 3 digits for License Number (#XXX)",
@@ -525,7 +251,7 @@ with tabs[0]:
 # -------------------
 # EVALUATION 
 # -------------------
-with tabs[1]:
+with tabs[1], tab("Evaluation"):
     if not st.session_state.get("applicant_valid", False):
         st.error("🚫 Please complete Applicant Information first.")
     else:
@@ -591,11 +317,7 @@ with tabs[1]:
         bike_type = st.selectbox("Bike Type", ["EV-1", "EV-125"])
 
         # 🏦 Financing Plan Dropdown (Dynamic)
-        financing_plans = {
-            "1 Year Plan": {"upfront": 60000, "installment": 25500, "tenure": 12},
-            "2 Year Plan": {"upfront": 40000, "installment": 14900, "tenure": 24},
-            "3 Year Plan": {"upfront": 40000, "installment": 9900, "tenure": 36},
-        }
+        financing_plans = FINANCING_PLANS
 
         selected_plan = st.selectbox("Financing Plan", list(financing_plans.keys()))
 
@@ -628,7 +350,78 @@ with tabs[1]:
 # -------------------
 # RESULTS (Reactive)
 # -------------------
-with tabs[2]:
+def _rupees(value):
+    if value != value:
+        return "Not reachable"
+    if value == float("inf"):
+        return "Any amount"
+    return f"Rs. {value:,.0f}"
+
+
+@st.fragment
+@profiled_fragment
+def what_if_panel(applicant: dict):
+    """ Reruns on its own while the officer explores; nothing is computed until it is switched on """
+    if not st.toggle("🔮 What-if Analysis", key="what_if"):
+        return
+
+    with span("whatif"):
+        qualifying = qualifying_values(applicant)
+    st.markdown("#### 🎯 What it takes (one input changed, the rest as entered)")
+    st.dataframe(
+        pd.DataFrame({
+            "Plan": qualifying["plan"],
+            "Target": qualifying["band"],
+            "Now": qualifying["current_decision"],
+            "Min Net Salary": qualifying["min_net_salary"].map(_rupees),
+            "Min Applicant Balance": qualifying["min_applicant_balance"].map(_rupees),
+            "Min Guarantor Balance": qualifying["min_guarantor_balance"].map(_rupees),
+            "Max Outstanding": qualifying["max_outstanding"].map(_rupees),
+        }),
+        hide_index=True, use_container_width=True,
+    )
+
+    st.markdown("#### 🧮 Scenario Grid (all plans)")
+    salary = applicant["net_salary"]
+    balance = applicant["applicant_bank_balance"] or 0
+    outstanding = applicant["outstanding"] or 0
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        salary_range = st.slider("Net Salary", 0, max(500_000, salary * 2), (salary // 2, salary * 2), step=5000)
+    with col2:
+        balance_range = st.slider("Applicant Balance", 0, max(500_000, balance * 2), (0, max(balance * 2, 150_000)), step=5000)
+    with col3:
+        outstanding_range = st.slider(
+            "Outstanding", 0, max(1_000_000, outstanding * 2), (0, max(outstanding * 2, 300_000)), step=10000,
+        )
+    steps = st.select_slider("Points per input", [5, 10, 15, 20, 25, 30], value=20)
+
+    with span("whatif"):
+        grid = what_if_grid(
+            applicant,
+            np.linspace(*salary_range, steps), np.linspace(*balance_range, steps), np.linspace(*outstanding_range, steps),
+        )
+    shares = pd.crosstab(grid["plan"], grid["decision"], normalize="index")
+    st.caption(f"{len(grid):,} scenarios evaluated")
+    st.dataframe(shares.reindex(columns=["Approved", "Review", "Reject"], fill_value=0.0), use_container_width=True,
+                 column_config={c: st.column_config.NumberColumn(format="percent") for c in shares.columns})
+
+    col1, col2 = st.columns(2)
+    with col1:
+        grid_plan = st.selectbox("Plan", list(FINANCING_PLANS), key="what_if_plan")
+    with col2:
+        grid_outstanding = st.select_slider(
+            "At Outstanding", sorted(grid["outstanding"].unique()), format_func=lambda v: f"Rs. {v:,.0f}",
+        )
+    view = grid[(grid["plan"] == grid_plan) & (grid["outstanding"] == grid_outstanding)]
+    icons = {"Approved": "✅", "Review": "🟡", "Reject": "❌"}
+    table = view.pivot(index="net_salary", columns="applicant_bank_balance", values="decision").map(icons.get)
+    table.index = [f"Salary {v:,.0f}" for v in table.index]
+    table.columns = [f"Bal {v:,.0f}" for v in table.columns]
+    st.dataframe(table, use_container_width=True)
+
+
+with tabs[2], tab("Results"):
     if not st.session_state.get("applicant_valid", False):
         st.error("🚫 Please complete Applicant Information first.")
     else:
@@ -636,47 +429,31 @@ with tabs[2]:
 
         if net_salary > 0 and tenure > 0:
             # --- Calculate Scores ---
-            inc = income_score(net_salary, gender)
-            bal, bal_source = bank_balance_score_custom(applicant_bank_balance, guarantor_bank_balance, emi)
-            sal = salary_consistency_score(salary_consistency)
-            emp = employer_type_score(employer_type)
-            job = job_tenure_score(job_years)
-            ag = age_score(age)
-            dep = dependents_score(dependents)
-            res = residence_score(residence)
-            dti, ratio = dti_score(outstanding, emi, net_salary, tenure)
-
-            # --- Final Decision ---
-            final_score = 0  # ✅ Prevent NameError if rejected early
-
-            applicant_type = st.session_state.get("applicant_type", "")
-            tax_return = st.session_state.get("tax_return", "Yes")
-
-            if applicant_type == "Businessman" and tax_return == "No":
-                decision = "Rejected"
-                decision_display = "❌ Rejected (No Tax Return)"
-                st.error("❌ Rejected: No evidence of tax return provided.")
-            elif ag == -1:
-                decision = "Reject"
-                decision_display = "❌ Reject (Underage)"
-            elif bal == 0:
-                decision = "Reject"
-                decision_display = "❌ Reject (Insufficient Bank Balance)"
-            else:
-                final_score = (
-                    inc * 0.40 + bal * 0.30 + sal * 0.04 + emp * 0.04 +
-                    job * 0.04 + ag * 0.04 + dep * 0.04 + res * 0.05 +
-                    dti * 0.05
+            with span("scoring"):
+                inc = income_score(net_salary, gender)
+                bal, bal_source = bank_balance_score_custom(applicant_bank_balance, guarantor_bank_balance, emi)
+                sal = salary_consistency_score(salary_consistency)
+                emp = employer_type_score(employer_type)
+                job = job_tenure_score(job_years)
+                ag = age_score(age)
+                dep = dependents_score(dependents)
+                res = residence_score(residence)
+                dti, ratio = dti_score(outstanding, emi, net_salary, tenure)
+
+                # --- Final Decision ---
+                applicant_type = st.session_state.get("applicant_type", "")
+                tax_return = st.session_state.get("tax_return", "Yes")
+
+                final_score, decision, decision_display = final_decision(
+                    {
+                        "income": inc, "bank_balance": bal, "salary_consistency": sal,
+                        "employer_type": emp, "job_tenure": job, "age": ag,
+                        "dependents": dep, "residence": res, "dti": dti,
+                    },
+                    applicant_type, tax_return,
                 )
-                if final_score >= 75:
-                    decision = "Approved"
-                    decision_display = "✅ Approve"
-                elif final_score >= 60:
-                    decision = "Review"
-                    decision_display = "🟡 Review"
-                else:
-                    decision = "Reject"
-                    decision_display = "❌ Reject"
+            if decision == "Rejected":
+                st.error("❌ Rejected: No evidence of tax return provided.")
 
             # --- Display Scores ---
             st.markdown("### 🔹 Detailed Scores")
@@ -699,6 +476,7 @@ with tabs[2]:
                 st.write(f"Final Score: {final_score:.1f}")
 
             st.subheader(f"🏆 Decision: {decision_display}")
+            st.caption(f"Scoring rules version {RULES_VERSION}")
 
             # -------------------------------
             # ⚠️ Bank Balance Rejection Message
@@ -731,6 +509,15 @@ with tabs[2]:
                             unsafe_allow_html=True
                         )
 
+            # 🔮 What would change the decision (all plans, minimum qualifying values)
+            what_if_panel({
+                "applicant_type": applicant_type, "tax_return": tax_return, "gender": gender,
+                "net_salary": net_salary, "applicant_bank_balance": applicant_bank_balance,
+                "guarantor_bank_balance": guarantor_bank_balance, "salary_consistency": salary_consistency,
+                "employer_type": employer_type, "job_years": job_years, "age": age,
+                "dependents": dependents, "residence": residence, "outstanding": outstanding,
+            })
+
             # --- Financial Plan ---
             if decision in ["Approved", "Review", "Reject"]:
                 st.markdown("### 💰 Applicant Financial Plan")
@@ -744,6 +531,17 @@ with tabs[2]:
                 st.write(f"**Monthly EMI:** {emi:,.0f}")
                 st.write(f"**Total EMI over Tenure:** {total_payment:,.0f}")
                 st.write(f"**Total Paid Towards Bike (Down Payment + EMIs):** {break_even:,.0f}")
+                with st.expander("📅 Instalment Schedule"):
+                    st.dataframe(
+                        amortization(bike_price, down_payment, emi, tenure).rename(columns={
+                            "month": "Month", "instalment": "Instalment", "paid": "Paid to Date", "balance": "Balance",
+                        }),
+                        hide_index=True, use_container_width=True,
+                        column_config={
+                            c: st.column_config.NumberColumn(format="localized")
+                            for c in ("Instalment", "Paid to Date", "Balance")
+                        },
+                    )
 
                 # --- Save Applicant Button ONLY if Approved ---
                 if st.button("💾 Save Applicant to Database"):
@@ -782,13 +580,21 @@ with tabs[2]:
                             "tenure": tenure,
                             "emi": emi,
                             "outstanding": outstanding,
+                            "salary_consistency": salary_consistency,
+                            "job_years": job_years,
+                            "dependents": dependents,
+                            "tax_return": tax_return,
                             "decision": decision,
+                            "rules_version": RULES_VERSION,
                             "applicant_type": st.session_state.get("applicant_type", "Employee"),
 
                         }
 
-                        save_to_db(applicant_data)
+                        enqueue_save(applicant_data)
                         st.success("✅ Applicant saved successfully!")
+                        pending = journal_counts()["pending"]
+                        if pending:
+                            st.caption(f"⏳ {pending:,} saved applicant(s) waiting to be written to the database")
                     except Exception as e:
                         st.error(f"❌ Failed to save applicant: {e}")
 
@@ -798,75 +604,416 @@ with tabs[2]:
 # -----------------------------
 # Page 4: Applicants
 # -----------------------------
-with tabs[3]:
+DELETE_SCOPES = ["Selected rows", "IDs / ranges", "All matching the filters"]
+
+
+def _parse_ids(text: str):
+    """ "12, 15, 20-40" -> ([12, 15], [(20, 40)]) """
+    ids, ranges = [], []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = (p.strip() for p in part.partition("-"))
+        if not first.isdigit() or (dash and not last.isdigit()):
+            raise ValueError(f"❌ '{part}' is not an ID or a range like 20-40.")
+        if dash:
+            ranges.append(tuple(sorted((int(first), int(last)))))
+        else:
+            ids.append(int(first))
+    return ids, ranges
+
+
+def _describe_ids(ids: list, ranges: list) -> str:
+    shown = [str(i) for i in ids[:10]] + [f"{a}–{b}" for a, b in ranges[:5]]
+    more = len(ids) - 10 if len(ids) > 10 else 0
+    return "ID " + ", ".join(shown) + (f" and {more:,} more" if more else "")
+
+
+def delete_confirmed(request: dict):
+    """ Run the confirmed delete as one statement and report how many rows it removed """
+    try:
+        if request["filters"] is not None:
+            deleted = delete_matching_applicants(request["filters"])
+        else:
+            deleted = delete_applicants(request["ids"], request["ranges"])
+        invalidate_applicants()
+        st.success(f"✅ Deleted {deleted:,} applicant(s) ({request['label']}).")
+    except Exception as e:
+        st.error(f"❌ Failed to delete applicants: {e}")
+
+
+def _reset_pager():
+    st.session_state.page_cursors = [None]
+
+
+def _next_page(last_id: int):
+    st.session_state.page_cursors.append(last_id)
+
+
+def _previous_page():
+    st.session_state.page_cursors.pop()
+
+
+@st.fragment
+@profiled_fragment
+@tab("Applicants")
+def applicants_tab():
+    """ Reruns on its own when its widgets change; form edits elsewhere reuse the loaded page """
     st.subheader("📂 Applicants Database")
 
     if st.button("🔄 Refresh Data"):
-        resequence_ids()
+        refresh_reads()
         st.session_state.refresh = True
 
-    def delete_applicant(applicant_id: int):
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM data WHERE id = %s", (applicant_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            st.success(f"✅ Applicant with ID {applicant_id} deleted successfully!")
-        except Exception as e:
-            st.error(f"❌ Failed to delete applicant: {e}")
+    # ⏳ Saves still in the local journal (not yet in the table below)
+    counts = journal_counts()
+    if counts["pending"]:
+        st.info(f"⏳ {counts['pending']:,} saved applicant(s) waiting to be written to the database")
+    if counts["failed"]:
+        with st.expander(f"⚠️ {counts['failed']:,} save(s) could not be written"):
+            failed = failed_saves()
+            st.dataframe(pd.DataFrame(failed), use_container_width=True, hide_index=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("🔁 Retry Failed Saves"):
+                    retry_failed()
+                    st.rerun(scope="fragment")
+            with col2:
+                discard = st.selectbox("Discard save for CNIC", [f["cnic"] for f in failed])
+                if st.button("🗑️ Discard"):
+                    discard_failed(discard)
+                    st.rerun(scope="fragment")
+
+    with st.expander("📤 Bulk Import (CSV / Excel)"):
+        st.download_button(
+            label="📄 Download Template",
+            data=",".join(IMPORT_COLUMNS) + "\n",
+            file_name="applicants_template.csv",
+            mime="text/csv"
+        )
+        upload = st.file_uploader("Upload applicants file", type=["csv", "xlsx"])
+        if upload is not None and st.button("📤 Import Applicants"):
+            try:
+                report = import_applicants(upload, upload.name)
+                invalidate_applicants()
+                st.success(
+                    f"✅ Imported {report['inserted']:,} of {report['rows']:,} rows "
+                    f"in {report['seconds']:.1f}s"
+                )
+                if report["rejected"]:
+                    st.warning(f"⚠️ {len(report['rejected']):,} rows were rejected")
+                    st.dataframe(pd.DataFrame(report["rejected"]), use_container_width=True)
+            except Exception as e:
+                st.error(f"❌ Import failed: {e}")
+
+    # 🔎 Filters are applied in SQL; changing any of them starts again from page 1
+    if "page_cursors" not in st.session_state:
+        _reset_pager()
+
+    with st.expander("🔎 Filters"):
+        col1, col2 = st.columns(2)
+        with col1:
+            decision_filter = st.selectbox(
+                "Decision", ["All", "Approved", "Review", "Reject", "Rejected"],
+                key="filter_decision", on_change=_reset_pager
+            )
+            applicant_type_filter = st.selectbox(
+                "Applicant Type", ["All", "Employee", "Businessman"],
+                key="filter_applicant_type", on_change=_reset_pager
+            )
+            search_filter = st.text_input("CNIC / Phone starts with", key="filter_search", on_change=_reset_pager)
+        with col2:
+            bike_type_filter = st.selectbox(
+                "Bike Type", ["All", "EV-1", "EV-125"],
+                key="filter_bike_type", on_change=_reset_pager
+            )
+            city_filter = st.text_input("City", key="filter_city", on_change=_reset_pager)
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="page_size", on_change=_reset_pager)
+            # Only the chosen view's columns are read from the database
+            view = st.radio("Columns", list(APPLICANT_VIEWS), horizontal=True, key="applicants_view")
+
+    filters = {
+        "decision": decision_filter,
+        "applicant_type": applicant_type_filter,
+        "bike_type": bike_type_filter,
+        "city": city_filter.strip(),
+        "search": search_filter.strip(),
+    }
+    filters = {k: v for k, v in filters.items() if v and v != "All"}
 
     try:
-        df = fetch_all_applicants()
+        total = load_applicants_count(filters)
+        cursors = st.session_state.page_cursors
+        df, has_next = load_applicants_page(filters, cursors[-1], page_size, view)
+        if df.empty and len(cursors) > 1:
+            # The page we were on no longer has rows (e.g. after deletes)
+            _reset_pager()
+            cursors = st.session_state.page_cursors
+            df, has_next = load_applicants_page(filters, None, page_size, view)
+
         if not df.empty:
-            st.dataframe(df, use_container_width=True)
+            # IDs are stable (gaps after deletes); "no" is the gap-free position in the filtered list
+            page = len(cursors)
+            first_row = (page - 1) * page_size + 1
+            page_df = df.copy()
+            page_df.insert(0, "no", range(first_row, first_row + len(df)))
+            # Ticked rows are the delete selection; a different page starts a fresh selection
+            table = st.dataframe(
+                page_df, use_container_width=True, hide_index=True,
+                on_select="rerun", selection_mode="multi-row",
+                key=f"applicants_table_{hash(tuple(df['id']))}",
+            )
+            selected = [int(page_df["id"].iloc[r]) for r in table.selection.rows if r < len(page_df)]
 
-            delete_id = st.number_input("Enter Applicant ID to Delete", min_value=1, step=1)
+            st.caption(f"Page {page} · rows {first_row:,}–{first_row + len(df) - 1:,} of {total:,}")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button("⬅️ Previous", disabled=page == 1, on_click=_previous_page)
+            with col2:
+                st.button("Next ➡️", disabled=not has_next, on_click=_next_page, args=(int(df["id"].iloc[-1]),))
 
-            # 🔹 NEW: Two-step confirmation logic
+            # 🗑️ One confirmation, then one DELETE for the whole selection (validated by primary key)
             if "confirm_delete" not in st.session_state:
                 st.session_state.confirm_delete = None
 
-            if st.button("🗑️ Delete Applicant"):
-                if delete_id in df["id"].values:
-                    # Store selected ID + Name for confirmation
-                    applicant_name = df.loc[df["id"] == delete_id, "name"].values[0]
-                    st.session_state.confirm_delete = {"id": delete_id, "name": applicant_name}
-                else:
-                    st.error("❌ Invalid ID. Please enter a valid Applicant ID from the table.")
+            scope = st.radio("Delete", DELETE_SCOPES, horizontal=True, key="delete_scope")
+            if scope == "IDs / ranges":
+                id_text = st.text_input("Applicant IDs to delete", placeholder="e.g. 12, 15, 20-40", key="delete_ids")
+            elif scope == "Selected rows":
+                st.caption(f"{len(selected):,} row(s) selected in the table above")
+
+            if st.button("🗑️ Delete Applicants"):
+                st.session_state.confirm_delete = None
+                try:
+                    if scope == "All matching the filters":
+                        if not filters:
+                            raise ValueError("❌ Set at least one filter first; this would delete every applicant.")
+                        request = {"ids": [], "ranges": [], "filters": filters, "count": total,
+                                   "label": "all matching the filters"}
+                    else:
+                        ids, ranges = (selected, []) if scope == "Selected rows" else _parse_ids(id_text)
+                        request = {"ids": ids, "ranges": ranges, "filters": None,
+                                   "count": count_applicants_by_id(tuple(ids), tuple(ranges)),
+                                   "label": _describe_ids(ids, ranges) if ids or ranges else ""}
+                    if not request["count"]:
+                        st.error("❌ No applicants to delete. Select rows or enter valid Applicant IDs.")
+                    else:
+                        st.session_state.confirm_delete = request
+                except ValueError as e:
+                    st.error(str(e))
 
             # Show confirmation prompt if a delete is triggered
             if st.session_state.confirm_delete:
-                c_id = st.session_state.confirm_delete["id"]
-                c_name = st.session_state.confirm_delete["name"]
-                st.warning(f"⚠️ Are you sure you want to delete the data for ID: {c_id} and Name: {c_name}?")
+                request = st.session_state.confirm_delete
+                st.warning(f"⚠️ Are you sure you want to delete {request['count']:,} applicant(s) ({request['label']})?")
 
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("✅ Yes, Delete"):
-                        delete_applicant(c_id)
+                        delete_confirmed(request)
                         st.session_state.confirm_delete = None  # reset confirmation
                 with col2:
                     if st.button("❌ No, Cancel"):
                         st.info("Deletion cancelled.")
                         st.session_state.confirm_delete = None  # reset confirmation
 
-            # Excel download remains the same
-            df = df.sort_values(by="id", ascending=True)
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                df.to_excel(writer, index=False, sheet_name="Applicants")
-            excel_data = output.getvalue()
-
+            # 📥 The export is generated only when Download is clicked, streamed from the DB in chunks
+            col1, col2 = st.columns(2)
+            with col1:
+                export_format = st.selectbox("Export Format", list(EXPORT_FORMATS), key="export_format")
+            with col2:
+                export_filters = filters if st.checkbox("Apply current filters", key="export_filtered") else None
             st.download_button(
-                label="📥 Download Excel",
-                data=excel_data,
-                file_name="applicants.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                label=f"📥 Download {export_format}",
+                data=lambda: export_applicants(export_format, export_filters),
+                file_name=f"applicants.{EXPORT_FORMATS[export_format]['extension']}",
+                mime=EXPORT_FORMATS[export_format]["mime"]
             )
+        elif filters:
+            st.info("ℹ️ No applicants match the selected filters.")
         else:
             st.info("ℹ️ No applicants found in the database yet.")
     except Exception as e:
         st.error(f"❌ Failed to load applicants: {e}")
 
+    with st.expander("🛠️ Diagnostics"):
+        cache = get_cache_stats()
+        pool = get_pool_stats()
+        st.caption(
+            f"Shared read cache: {cache['hits']:,} hits / {cache['misses']:,} misses "
+            f"({cache['hit_ratio']:.0%}), data version {cache['version']}"
+        )
+        st.caption(
+            f"Storage: {pool['storage']}. "
+            f"Connection pool: size {pool['pool_size']}, {pool['checkouts']:,} checkouts, "
+            f"avg wait {pool['avg_wait_ms']:.1f} ms, max wait {pool['max_wait_ms']:.1f} ms"
+        )
+        snapshot = snapshot_status() if SNAPSHOT_DIR else None
+        if snapshot:
+            st.caption(
+                f"Local snapshot: {snapshot['base_rows']:,} rows + {snapshot['delta_rows']:,} changed / "
+                f"{snapshot['deleted']:,} deleted in {snapshot['deltas']} delta file(s), "
+                f"synced {snapshot['last_sync']['at'][:19]} ({snapshot['last_sync']['seconds'] * 1000:.0f} ms)"
+            )
+        st.download_button(
+            label="📈 Download Timing Metrics (Prometheus)",
+            data=render_prometheus,
+            file_name="portal_metrics.prom",
+            mime="text/plain",
+        )
+
+
+with tabs[3]:
+    applicants_tab()
+
+
+# -----------------------------
+# Page 5: Portfolio
+# -----------------------------
+PORTFOLIO_BREAKDOWNS = {
+    "decision": "Decision", "bike_type": "Bike Type", "city": "City", "applicant_type": "Applicant Type",
+}
+
+
+@st.fragment
+@profiled_fragment
+@tab("Portfolio")
+def portfolio_tab():
+    """ Reads only the trigger-maintained summary rows, never the applicants table """
+    st.subheader("📈 Portfolio Dashboard")
+
+    try:
+        summary = fetch_portfolio_summary()
+    except Exception as e:
+        st.error(f"❌ Failed to load the portfolio summary: {e}")
+        return
+
+    overall = portfolio_kpis(summary)
+    approved = portfolio_kpis(summary, "decision", "Approved")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Applicants", f"{overall['applicants']:,}", f"{approved['applicants']:,} approved", delta_color="off")
+    col2.metric("Total Financed", f"PKR {overall['financed']:,.0f}",
+                f"PKR {approved['financed']:,.0f} approved", delta_color="off")
+    col3.metric("Average DTI", "-" if overall["avg_dti"] is None else f"{overall['avg_dti']:.1%}",
+                None if approved["avg_dti"] is None else f"{approved['avg_dti']:.1%} approved", delta_color="off")
+    col4.metric("Monthly EMI Inflow", f"PKR {overall['emi_inflow']:,.0f}",
+                f"PKR {approved['emi_inflow']:,.0f} approved", delta_color="off")
+
+    for dimension, label in PORTFOLIO_BREAKDOWNS.items():
+        df = breakdown(summary, dimension).rename(columns={
+            "value": label, "applicants": "Applicants", "financed": "Financed (PKR)",
+            "emi_total": "Monthly EMI (PKR)", "avg_dti": "Avg DTI",
+        })
+        with st.expander(f"By {label}", expanded=dimension == "decision"):
+            st.dataframe(
+                df, hide_index=True, use_container_width=True,
+                column_config={
+                    "Financed (PKR)": st.column_config.NumberColumn(format="localized"),
+                    "Monthly EMI (PKR)": st.column_config.NumberColumn(format="localized"),
+                    "Avg DTI": st.column_config.NumberColumn(format="percent"),
+                },
+            )
+
+    cash_flow_projection()
+
+    # Triggers keep the summary in step with every write; this is the manual reconciliation
+    if st.button("♻️ Rebuild Summary", help="Recompute the summary from every applicant (full table scan)"):
+        try:
+            rebuild_portfolio_summary()
+            st.rerun(scope="fragment")
+        except Exception as e:
+            st.error(f"❌ Failed to rebuild the portfolio summary: {e}")
+
+
+def _projection_file(projection, fmt):
+    out = io.BytesIO()
+    write_projection(projection, out, fmt)
+    return out.getvalue()
+
+
+def cash_flow_projection():
+    """ Month-by-month inflows of the whole book; reads every applicant, so only on request """
+    with st.expander("📅 Cash-flow Projection"):
+        col1, col2 = st.columns(2)
+        with col1:
+            months = st.slider("Months", 6, 60, 36, step=6, key="projection_months")
+        with col2:
+            by = st.multiselect(
+                "Group by", PROJECTION_DIMENSIONS, default=PROJECTION_DIMENSIONS, key="projection_by",
+                format_func=lambda d: PORTFOLIO_BREAKDOWNS.get(d, d.title()),
+            )
+        if not st.toggle("Project the book", key="projection_on",
+                         help="Schedules every stored contract (full table read, shared until the next write)"):
+            return
+        try:
+            projection = fetch_projection(months, tuple(by))
+        except Exception as e:
+            st.error(f"❌ Failed to project cash flows: {e}")
+            return
+
+        st.caption(
+            "Every contract is projected from its first instalment in the first month shown "
+            "(no disbursement dates or payments are stored)."
+        )
+        chart_by = st.selectbox(
+            "Chart by", [None] + by, key="projection_chart_by",
+            format_func=lambda d: "Whole book" if d is None else PORTFOLIO_BREAKDOWNS.get(d, d.title()),
+        )
+        st.bar_chart(monthly_inflows(projection, chart_by))
+        book = projection.groupby("due_month", as_index=False)[["instalments", "inflow", "balance"]].sum()
+        st.dataframe(
+            book.rename(columns={
+                "due_month": "Month", "instalments": "Instalments", "inflow": "Inflow (PKR)", "balance": "Balance (PKR)",
+            }),
+            hide_index=True, use_container_width=True,
+            column_config={
+                "Inflow (PKR)": st.column_config.NumberColumn(format="localized"),
+                "Balance (PKR)": st.column_config.NumberColumn(format="localized"),
+            },
+        )
+        if projection.attrs.get("skipped"):
+            st.caption(f"{projection.attrs['skipped']:,} contract(s) without a usable tenure or EMI left out")
+
+        projection_format = st.selectbox("Projection Format", PROJECTION_FORMATS, key="projection_format")
+        st.download_button(
+            label=f"📥 Download Projection ({projection_format})",
+            data=lambda: _projection_file(projection, projection_format),
+            file_name=f"cashflow_projection.{EXPORT_FORMATS[projection_format]['extension']}",
+            mime=EXPORT_FORMATS[projection_format]["mime"],
+        )
+
+
+with tabs[4]:
+    portfolio_tab()
+
+
+# -----------------------------
+# Profiler (admin only)
+# -----------------------------
+end_rerun()
+
+if st.session_state.get("profiles") is not None:
+    with st.sidebar:
+        st.subheader("🔬 Rerun Profiler")
+        profiles = st.session_state.profiles
+        remaining = st.session_state.get("profile_remaining", 0)
+        st.caption(f"{len(profiles)} rerun(s) captured" + (f", {remaining} to go" if remaining else ""))
+        if profiles:
+            totals = section_totals(profiles)
+            st.dataframe(
+                pd.DataFrame({"Section": list(totals), "ms": [round(v * 1e3, 1) for v in totals.values()]}),
+                hide_index=True, use_container_width=True,
+            )
+            st.download_button(
+                "⬇️ Speedscope profile", data=lambda: to_speedscope(profiles),
+                file_name="portal_reruns.speedscope.json", mime="application/json",
+            )
+            st.download_button(
+                "⬇️ Flamegraph stacks (folded)", data=lambda: to_folded(profiles),
+                file_name="portal_reruns.folded", mime="text/plain",
+            )
+        if st.button("Stop Profiling"):
+            for key in ("profiles", "profile_remaining"):
+                st.session_state.pop(key, None)
+            st.rerun()
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+
+# Applicants seeded into every scratch database
+SEEDED_ROWS = 200
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+def _use_backend(backend: str, directory: str, monkeypatch):
+    """ db.py pointed at a freshly seeded scratch database on `backend` """
+    import db
+    import storage
+    from standin import seed_mysql, use_standin
+
+    monkeypatch.setattr(storage, "BACKEND", storage.BACKEND)
+    monkeypatch.setattr(storage, "SQLITE_PATH", storage.SQLITE_PATH)
+    monkeypatch.setitem(db.DB_CONFIG, "database", db.DB_CONFIG["database"])
+    if backend == "mysql":
+        # Never the production server: only a local one named explicitly
+        if os.environ.get("PORTAL_DB_HOST") not in LOCAL_HOSTS:
+            pytest.skip("needs a local MySQL/MariaDB server (PORTAL_DB_HOST=127.0.0.1)")
+        try:
+            seed_mysql(SEEDED_ROWS, "portal_test")
+        except storage.DATABASE_ERRORS as e:
+            pytest.skip(f"local MySQL/MariaDB server unavailable: {e}")
+    else:
+        use_standin(SEEDED_ROWS, directory)
+    # Reads cached against another test's database must not be served
+    db.refresh_reads()
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    """ db.py pointed at a fresh SQLite stand-in with SEEDED_ROWS synthetic applicants """
+    import db
+
+    _use_backend("sqlite", str(tmp_path), monkeypatch)
+    yield
+    db.get_storage.clear()
+
+
+@pytest.fixture(params=["sqlite", "mysql"])
+def backend(request, tmp_path, monkeypatch):
+    """ Each storage backend in turn, freshly seeded (mysql is skipped without a local server) """
+    import db
+
+    _use_backend(request.param, str(tmp_path), monkeypatch)
+    yield request.param
+    db.get_storage.clear()
+
+
+@pytest.fixture
+def applicant():
+    """ Factory for a form-shaped applicant; CNICs 61101-* are outside the stand-in's seeded range """
+    from scoring import RULES_VERSION
+
+    def make(n: int, **overrides) -> dict:
+        data = {
+            "applicant_type": "Employee", "first_name": "Test", "last_name": str(n),
+            "cnic": f"61101-{n:07d}-1", "license_no": f"61101-{n:07d}-1#0",
+            "phone_number": "03001234567", "gender": "F",
+            "guarantors": "Yes", "female_guarantor": "Yes", "electricity_bill": "Yes", "pdc_option": "No",
+            "street_address": "1 Main Street", "area_address": "Block A",
+            "city": "Quetta", "state_province": "Balochistan", "postal_code": "87300", "country": "Pakistan",
+            "net_salary": 150000, "applicant_bank_balance": 80000, "guarantor_bank_balance": None,
+            "employer_type": "Govt", "age": 41, "residence": "Owned",
+            "bike_type": "EV-125", "bike_price": 350000, "down_payment": 50000, "tenure": 36,
+            "emi": 9000, "outstanding": 20000, "decision": "Review", "rules_version": RULES_VERSION,
+        }
+        data.update(overrides)
+        return data
+
+    return make
@@ -0,0 +1,70 @@
+import io
+
+import pandas as pd
+import pytest
+
+import db
+from bulk_import import IMPORT_COLUMNS, import_applicants
+from conftest import SEEDED_ROWS
+
+
+def upload_row(n: int, **overrides) -> dict:
+    row = dict.fromkeys(IMPORT_COLUMNS, "")
+    row.update({
+        "applicant_type": "Employee", "first_name": "Import", "last_name": str(n),
+        "cnic": f"61102-{n:07d}-1", "phone_number": "03001234567", "gender": "M",
+        "guarantors": "Yes", "female_guarantor": "Yes", "electricity_bill": "Yes", "pdc_option": "Yes",
+        "street_address": "2 Canal Road", "area_address": "Block B", "city": "Multan",
+        "state_province": "Punjab", "country": "Pakistan", "employer_type": "MNC", "residence": "Rented",
+        "bike_type": "EV-1", "financing_plan": "3 Year Plan",
+        "net_salary": "95,000", "applicant_bank_balance": "40000", "salary_consistency": "6",
+        "age": "33", "job_years": "4", "dependents": "1", "outstanding": "0",
+    })
+    row.update(overrides)
+    return row
+
+
+REJECTED = {
+    3: ("bad CNIC", {"cnic": "61102-12"}),
+    4: ("missing name", {"first_name": ""}),
+    5: ("too young", {"age": "16"}),
+    6: ("no tax return", {"applicant_type": "Businessman", "tax_return": "No"}),
+    7: ("stored CNIC", {"cnic": "35202-0000000-0"}),
+}
+
+
+def upload(fmt: str) -> tuple:
+    rows = [upload_row(n, **REJECTED[n][1]) if n in REJECTED else upload_row(n) for n in range(1, 11)]
+    rows.append(upload_row(2, first_name="Again"))  # same CNIC as row 3 of the sheet
+    frame = pd.DataFrame(rows, columns=IMPORT_COLUMNS)
+    buffer = io.BytesIO()
+    if fmt == "CSV":
+        frame.to_csv(buffer, index=False)
+    else:
+        frame.to_excel(buffer, index=False)
+    buffer.seek(0)
+    return buffer, f"upload.{'csv' if fmt == 'CSV' else 'xlsx'}"
+
+
+@pytest.mark.parametrize("fmt", ["CSV", "Excel"])
+def test_import_reports_every_row(standin, fmt):
+    report = import_applicants(*upload(fmt), chunksize=4)
+    assert report["rows"] == 11
+    # Spreadsheet row numbers: the header is row 1
+    assert [(r["row"], r["reason"].split(" ")[0]) for r in report["rejected"]] == [
+        (4, "Invalid"), (5, "Missing"), (6, "age"), (7, "Rejected:"), (8, "CNIC"), (12, "Duplicate"),
+    ]
+    assert report["inserted"] == 5
+    assert db.count_applicants({}) == SEEDED_ROWS + 5
+
+    stored = db.fetch_applicants_page({"search": "61102"}, columns=("cnic", "name", "net_salary", "tenure", "decision"))[0]
+    assert sorted(stored["cnic"]) == [f"61102{n:07d}1" for n in (1, 2, 8, 9, 10)]
+    assert set(stored["name"]) == {f"Import {n}" for n in (1, 2, 8, 9, 10)}
+    assert (stored["net_salary"] == 95000).all() and (stored["tenure"] == 36).all()
+    assert (stored["decision"] == "Review").all()
+
+
+def test_missing_columns_are_named(standin):
+    buffer = io.BytesIO(b"first_name,last_name\nA,B\n")
+    with pytest.raises(ValueError, match="applicant_type"):
+        import_applicants(buffer, "upload.csv")
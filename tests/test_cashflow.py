@@ -0,0 +1,64 @@
+"""
+project_cashflows() never builds a contracts × months matrix; its group
+totals must equal the per-contract schedules (amortization()) summed up.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cashflow
+import db
+from cashflow import CONTRACT_COLUMNS, amortization, project_cashflows, schedule
+
+
+@pytest.mark.parametrize("financed, emi, tenure", [
+    (300000, 14900, 24),   # EMIs fall short: larger last instalment
+    (100000, 14900, 24),   # EMIs overshoot: ends early with a smaller one
+    (178800, 14900, 12),   # exact
+    (50000, 0, 6),         # no EMI: everything in the last month
+    (0, 9900, 36),
+])
+def test_schedule_pays_exactly_the_financed_amount(financed, emi, tenure):
+    due = schedule([financed], [emi], [tenure], tenure + 6)[0]
+    assert due.sum() == pytest.approx(financed)
+    assert (due[tenure:] == 0).all()
+
+
+def reference_projection(months: int) -> pd.DataFrame:
+    """ Per bike_type / plan / decision and month: every contract's amortization() summed """
+    contracts = db.fetch_all_applicants(tuple(CONTRACT_COLUMNS))
+    plan = cashflow._plans(*(contracts[c].astype(float).to_numpy() for c in ("down_payment", "tenure", "emi")))
+    rows = []
+    for contract, plan_name in zip(contracts.itertuples(), plan):
+        if not contract.tenure >= 1 or not contract.emi >= 0:
+            continue
+        due = amortization(contract.bike_price, contract.down_payment, contract.emi, contract.tenure)
+        due = due.set_index("month")["instalment"].reindex(range(1, months + 1), fill_value=0.0)
+        rows += [
+            {"bike_type": contract.bike_type, "plan": plan_name, "decision": contract.decision,
+             "month": m, "inflow": inflow, "instalments": int(inflow > 0)}
+            for m, inflow in due.items()
+        ]
+    return pd.DataFrame(rows).groupby(["bike_type", "plan", "decision", "month"])[["inflow", "instalments"]].sum()
+
+
+def test_projection_matches_per_contract_schedules(standin):
+    months = 40
+    projection = project_cashflows(months, start=date(2030, 1, 1), chunksize=37)
+    assert projection.attrs["skipped"] == 0
+    assert projection["due_month"].iloc[0] == "2030-01" and projection["due_month"].iloc[months - 1] == "2033-04"
+
+    actual = projection.set_index(["bike_type", "plan", "decision", "month"])[["inflow", "instalments"]]
+    expected = reference_projection(months)
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_dtype=False)
+    # The last month's balance of every group is fully paid off
+    assert np.allclose(projection.groupby(["bike_type", "plan", "decision"])["balance"].last(), 0.0)
+
+
+def test_projection_by_one_dimension(standin):
+    full = project_cashflows(12, start=date(2030, 1, 1))
+    by_plan = project_cashflows(12, ["plan"], start=date(2030, 1, 1))
+    expected = full.groupby(["plan", "month"])["inflow"].sum()
+    pd.testing.assert_series_equal(by_plan.set_index(["plan", "month"])["inflow"], expected)
@@ -0,0 +1,26 @@
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from export import EXPORT_COLUMNS, EXPORT_FORMATS, NUMBER_COLUMNS, export_applicants
+
+
+@pytest.mark.parametrize("fmt", list(EXPORT_FORMATS))
+def test_download_button_accepts_export(standin, fmt):
+    # What st.download_button does with the deferred `data=` callable on click
+    data, _ = convert_data_to_bytes_and_infer_mime(
+        export_applicants(fmt), unsupported_error=TypeError("unsupported type")
+    )
+    read = {"Excel": pd.read_excel, "CSV": pd.read_csv, "Parquet": pd.read_parquet}[fmt]
+    df = read(io.BytesIO(data))
+    assert list(df.columns) == EXPORT_COLUMNS
+    assert df["no"].tolist() == list(range(1, 201))
+    assert [c for c in NUMBER_COLUMNS if not pd.api.types.is_numeric_dtype(df[c])] == []
+    assert {"salary_consistency", "job_years", "dependents"} <= NUMBER_COLUMNS
+
+
+def test_filtered_export(standin):
+    df = pd.read_csv(io.BytesIO(export_applicants("CSV", {"decision": "Approved"})))
+    assert len(df) > 0 and set(df["decision"]) == {"Approved"}
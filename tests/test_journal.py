@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from mysql.connector import errorcode, errors
+
+import db
+import journal
+from db import DUPLICATE_CNIC_MESSAGE
+
+
+@pytest.fixture
+def scratch_journal(standin, tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_PATH", str(tmp_path / "journal.sqlite"))
+    monkeypatch.setattr(journal, "_schema_ready", False)
+    monkeypatch.setattr(db, "_lookups_down_until", 0.0)
+
+
+def test_stored_cnic_rejected_before_queueing(scratch_journal, applicant):
+    # The stand-in's first seeded applicant has CNIC 3520200000000
+    with pytest.raises(ValueError, match=DUPLICATE_CNIC_MESSAGE):
+        journal.enqueue_save(applicant(1, cnic="35202-0000000-0"))
+    assert journal.journal_counts() == {"pending": 0, "failed": 0}
+
+
+def test_unreachable_database_does_not_block_save(scratch_journal, applicant, monkeypatch):
+    calls = []
+
+    def hanging(cnic):
+        calls.append(cnic)
+        time.sleep(1)  # a connect that waits out connection_timeout
+    monkeypatch.setattr(journal, "cnic_exists", hanging)
+    monkeypatch.setattr(db, "LOOKUP_TIMEOUT", 0.05)
+
+    start = time.perf_counter()
+    journal.enqueue_save(applicant(1))
+    journal.enqueue_save(applicant(2))
+    assert time.perf_counter() - start < 0.5
+    # The first timeout opened the breaker; the second save did not try the database
+    assert len(calls) == 1
+    assert journal.journal_counts() == {"pending": 2, "failed": 0}
+
+
+def test_same_application_twice_is_a_no_op(scratch_journal, applicant):
+    journal.enqueue_save(applicant(1))
+    journal.enqueue_save(applicant(1))
+    with pytest.raises(ValueError, match=DUPLICATE_CNIC_MESSAGE):
+        journal.enqueue_save(applicant(1, first_name="Other"))
+    assert journal.journal_counts() == {"pending": 1, "failed": 0}
+
+
+def test_corrected_application_replaces_failed_save(scratch_journal, applicant):
+    journal.enqueue_save(applicant(2, age=-1))
+    conn = journal._connect()
+    conn.execute("UPDATE pending_saves SET status = 'failed', attempts = 5, last_error = 'bad age'")
+    conn.close()
+
+    journal.enqueue_save(applicant(2))
+    assert journal.journal_counts() == {"pending": 1, "failed": 0}
+    assert journal.drain_once() == 1
+    assert db.cnic_exists("61101-0000002-1")
+
+
+@pytest.mark.parametrize("error", [
+    errors.ConnectionTimeoutError(msg="connect timed out"),
+    errors.Error(msg="Maximum statement execution time exceeded", errno=errorcode.ER_QUERY_TIMEOUT),
+    errors.Error(msg="Lost connection to MySQL server during query", errno=errorcode.CR_SERVER_LOST),
+])
+def test_unreachable_database_keeps_save_pending(scratch_journal, applicant, monkeypatch, error):
+    journal.enqueue_save(applicant(3))
+
+    def unreachable():
+        raise error
+    monkeypatch.setattr(journal, "db_connection", unreachable)
+    before = time.time()
+    assert journal.drain_once() == 0
+    assert journal.journal_counts() == {"pending": 1, "failed": 0}
+    conn = journal._connect()
+    attempts, next_attempt = conn.execute("SELECT attempts, next_attempt FROM pending_saves").fetchone()
+    conn.close()
+    assert attempts == 1 and next_attempt >= before + journal.RETRY_BACKOFF
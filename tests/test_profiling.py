@@ -0,0 +1,55 @@
+import sys
+import time
+
+import pytest
+import streamlit as st
+
+import profiling
+from metrics import tab
+
+
+@pytest.fixture
+def profiling_session(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    st.session_state.profile_remaining = 2
+    st.session_state.profiles = []
+    yield
+    for key in ("profile_remaining", "profiles", "profiler"):
+        st.session_state.pop(key, None)
+
+
+@profiling.profiled_fragment
+@tab("Applicants")
+def busy_fragment():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+
+
+def test_fragment_rerun_is_profiled(profiling_session):
+    interval = sys.getswitchinterval()
+    busy_fragment()
+    assert sys.getswitchinterval() == interval
+    assert st.session_state.profile_remaining == 1
+    (profile,) = st.session_state.profiles
+    assert profile["name"] == "busy_fragment fragment"
+    assert profile["samples"] and profile["seconds"] >= 0.05
+    assert "Applicants" in profiling.section_totals([profile])
+
+
+def test_fragment_inside_a_full_rerun_is_left_to_the_script_sampler(profiling_session):
+    profiling.begin_rerun(__file__)
+    busy_fragment()
+    profiling.end_rerun()
+    assert [p["name"] for p in st.session_state.profiles] == ["rerun"]
+
+
+def test_raising_fragment_still_finishes(profiling_session):
+    @profiling.profiled_fragment
+    def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        broken()
+    assert "profiler" not in st.session_state
+    assert len(st.session_state.profiles) == 1
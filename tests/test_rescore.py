@@ -0,0 +1,34 @@
+import db
+import rescore
+from conftest import SEEDED_ROWS
+from scoring import RULES_VERSION
+
+OLD_RULES = "2024.1"
+
+
+def stamp(ids: list, decision: str, version: str):
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        db.get_storage().set_decision(cursor, decision, version, ids)
+        conn.commit()
+        cursor.close()
+    db.bump_data_version()
+
+
+def test_repeat_run_is_a_no_op(standin, applicant, tmp_path):
+    # Decided by older rules; the form-shaped applicant lacks the inputs added by migration 006
+    stamp(list(range(1, 51)), "Review", OLD_RULES)
+    db.save_to_db(applicant(1, decision="Approved", rules_version=OLD_RULES))
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    first = rescore.run(workers=1, chunk_size=16, checkpoint=checkpoint)
+    assert (first["rows"], first["updated"], first["missing_inputs"]) == (50, 50, 1)
+
+    again = rescore.run(workers=1, checkpoint=checkpoint, restart=True)
+    assert (again["rows"], again["updated"], again["missing_inputs"]) == (0, 0, 1)
+
+    rows = db.fetch_all_applicants(("cnic", "decision", "rules_version"))
+    assert len(rows) == SEEDED_ROWS + 1
+    unscorable = rows[rows["cnic"] == "6110100000011"].iloc[0]
+    assert (unscorable["decision"], unscorable["rules_version"]) == ("Approved", OLD_RULES)
+    assert (rows[rows["cnic"] != "6110100000011"]["rules_version"] == RULES_VERSION).all()
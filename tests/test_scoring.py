@@ -0,0 +1,68 @@
+"""
+score_frame() is the vectorized copy of the Results tab's scalar path
+(score_applicant): every row it scores must come out exactly as the scalar
+functions would score it, bound for bound.
+"""
+import pandas as pd
+import pytest
+
+from db import APPLICANT_COLUMNS
+from scoring import FINANCING_PLANS, SCORE_COLUMNS, score_applicant, score_frame
+from standin import synthetic_applicants
+
+PLAN = FINANCING_PLANS["2 Year Plan"]
+
+
+def boundary_applicants() -> list:
+    """ One applicant per rule bound (on, just below, just above) plus the optional inputs left out """
+    base = dict(zip(APPLICANT_COLUMNS, next(synthetic_applicants(1))))
+    base.update(
+        applicant_type="Employee", gender="M", net_salary=100000, applicant_bank_balance=3 * PLAN["installment"],
+        guarantor_bank_balance=None, emi=PLAN["installment"], tenure=PLAN["tenure"], outstanding=0,
+        salary_consistency=6, employer_type="Govt", job_years=5, age=30, dependents=2, residence="Owned",
+    )
+    overrides = (
+        [{"net_salary": s} for s in (49999, 50000, 69999, 70000, 89999, 90000, 100000, 119999, 120000, 150000)]
+        + [{"net_salary": 140000, "gender": "F"}]
+        + [{"age": a} for a in (17, 18, 25, 26, 30, 31, 40, 41)]
+        + [{"job_years": y} for y in (0, 1, 2, 3, 5, 9, 10)]
+        + [{"dependents": d} for d in (0, 1, 2, 3, 4, 5)]
+        + [{"salary_consistency": m} for m in (0, 3, 6)]
+        # DTI exactly on its inclusive bounds: (outstanding / tenure + EMI) / net salary
+        + [{"net_salary": PLAN["installment"] * 10}, {"net_salary": PLAN["installment"] * 5},
+           {"net_salary": PLAN["installment"] * 2}, {"net_salary": PLAN["installment"] * 2, "outstanding": 24}]
+        # Bank balance: exactly the multiples, one short, the guarantor alone, and nothing at all
+        + [{"applicant_bank_balance": 3 * PLAN["installment"] - 1},
+           {"applicant_bank_balance": 0, "guarantor_bank_balance": 6 * PLAN["installment"]},
+           {"applicant_bank_balance": 0, "guarantor_bank_balance": 6 * PLAN["installment"] - 1},
+           {"applicant_bank_balance": 0, "guarantor_bank_balance": None},
+           {"guarantor_bank_balance": 10**6}]
+        + [{"applicant_type": "Businessman", "tax_return": "No"}, {"applicant_type": "Employee", "tax_return": "No"}]
+        + [{"employer_type": "Unknown", "residence": "Unknown"}]
+    )
+    no_tax_return_given = {k: v for k, v in base.items() if k != "tax_return"}
+    return [dict(base, **o) for o in overrides] + [dict(no_tax_return_given, applicant_type="Businessman")]
+
+
+def assert_matches_scalar(records: list):
+    scored = score_frame(pd.DataFrame(records))
+    for record, row in zip(records, scored[SCORE_COLUMNS].to_dict("records")):
+        expected = score_applicant(record)
+        for column in SCORE_COLUMNS:
+            assert row[column] == pytest.approx(expected[column], abs=1e-9), (column, record)
+
+
+def test_synthetic_applicants_match_scalar():
+    assert_matches_scalar([dict(zip(APPLICANT_COLUMNS, row)) for row in synthetic_applicants(2000)])
+
+
+def test_rule_boundaries_match_scalar():
+    records = boundary_applicants()
+    assert_matches_scalar(records)
+    # The boundaries actually reach every decision
+    assert set(score_frame(pd.DataFrame(records))["decision"]) == {"Approved", "Review", "Reject", "Rejected"}
+
+
+def test_missing_columns_are_named():
+    with pytest.raises(KeyError, match="guarantor_bank_balance"):
+        score_frame(pd.DataFrame([{"net_salary": 1}]))
@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import scoring_service
+
+
+@pytest.fixture
+def client():
+    return TestClient(scoring_service.app)
+
+
+def applicant(**overrides) -> dict:
+    return dict({
+        "applicant_type": "Employee", "gender": "M",
+        "net_salary": 120000, "applicant_bank_balance": 90000,
+        "financing_plan": "2 Year Plan", "salary_consistency": 6,
+        "employer_type": "Private Limited", "job_years": 3, "age": 32,
+        "dependents": 2, "residence": "Owned",
+    }, **overrides)
+
+
+def test_batch_matches_single_scores(client):
+    batch = [
+        applicant(reference="A-1"),
+        applicant(net_salary=45000, applicant_bank_balance=0, guarantor_bank_balance=200000),
+        applicant(reference="A-3", applicant_type="Businessman", tax_return="No"),
+        applicant(age=17, financing_plan="1 Year Plan", outstanding=50000),
+    ]
+    response = client.post("/score:batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["reference"] for r in results] == ["A-1", None, "A-3", None]
+    for sent, result in zip(batch, results):
+        single = client.post("/score", json=sent).json()
+        assert result == pytest.approx(single)
+
+
+def test_batch_limit(client, monkeypatch):
+    monkeypatch.setattr(scoring_service, "MAX_BATCH", 2)
+    assert client.post("/score:batch", json=[applicant()] * 3).status_code == 413
+    assert client.post("/score:batch", json=[]).json() == []
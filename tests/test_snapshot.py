@@ -0,0 +1,39 @@
+import time
+
+import pandas as pd
+
+import db
+import snapshot
+from db import APPLICANT_SELECT_COLUMNS
+from scoring import RULES_VERSION
+
+
+def test_bulk_write_keeps_manifest_bounded(standin, applicant, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", "")
+    monkeypatch.setattr(snapshot, "SYNC_RECENT_LIMIT", 20)
+    directory = str(tmp_path / "snapshot")
+    manifest = snapshot.sync(directory=directory)
+    # Every seeded row was written inside the overlap window
+    assert len(manifest["recent"]["rows"]) == 20
+
+    # A bulk rescore of the whole table, then ordinary writes
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        db.get_storage().set_decision(cursor, "Review", RULES_VERSION, db.fetch_all_applicants(("id",))["id"].tolist())
+        conn.commit()
+        cursor.close()
+    db.bump_data_version()
+    time.sleep(0.01)
+    manifest = snapshot.sync(directory=directory)
+    assert len(manifest["recent"]["rows"]) == 20
+
+    db.delete_applicants(list(range(1, 41)))
+    db.save_to_db(applicant(1))
+    time.sleep(0.01)
+    manifest = snapshot.sync(directory=directory)
+    assert len(manifest["recent"]["rows"]) <= 20 and len(manifest["recent"]["deleted"]) == 20
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", directory)
+    synced = snapshot.read_frame(APPLICANT_SELECT_COLUMNS)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", "")
+    pd.testing.assert_frame_equal(synced, db.fetch_all_applicants(), check_categorical=False)
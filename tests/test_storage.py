@@ -0,0 +1,197 @@
+"""
+What the portal relies on from a storage backend (storage.py), checked
+against each one through db.py's own read and write paths: a backend that
+fails here is not a drop-in replacement for the others.
+"""
+import time
+
+import pandas as pd
+import pytest
+
+import db
+import portfolio
+import snapshot
+from conftest import SEEDED_ROWS
+from db import APPLICANT_COLUMNS, APPLICANT_SELECT_COLUMNS, DUPLICATE_CNIC_MESSAGE, applicant_values
+from scoring import RULES_VERSION
+
+PAGE_SIZE = 37
+
+
+def all_ids(filters: dict = None) -> list:
+    """ Ids matching `filters`, filtered in pandas from the full (unfiltered) read """
+    df = db.fetch_all_applicants()
+    mask = pd.Series(True, index=df.index)
+    for column, value in (filters or {}).items():
+        if column == "search":
+            mask &= df["cnic"].astype(str).str.startswith(value.replace("-", "")) | df["phone_number"].astype(str).str.startswith(value)
+        else:
+            mask &= df[column].astype(str) == value
+    return df.loc[mask, "id"].astype(int).tolist()
+
+
+def stored(cnic: str) -> pd.DataFrame:
+    page, _ = db.fetch_applicants_page({"search": cnic}, columns=("id", "name"))
+    return page
+
+
+def stored_id(cnic: str) -> int:
+    page = stored(cnic)
+    assert len(page) == 1, f"expected one row for CNIC {cnic}"
+    return int(page["id"].iloc[0])
+
+
+def run(write):
+    """ `write(store, cursor)` in one committed transaction, then invalidate shared reads """
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        write(db.get_storage(), cursor)
+        conn.commit()
+        cursor.close()
+    db.bump_data_version()
+
+
+# -----------------------------
+# Saves
+# -----------------------------
+def test_save_and_lookup(backend, applicant):
+    db.save_to_db(applicant(1))
+    assert db.count_applicants({}) == SEEDED_ROWS + 1
+    assert db.cnic_exists("61101-0000001-1")
+    assert db.cnic_exists("6110100000011")
+    assert not db.cnic_exists("6110199999991")
+    assert stored("6110100000011")["name"].tolist() == ["Test 1"]
+
+
+def test_duplicate_cnic(backend, applicant):
+    db.save_to_db(applicant(1))
+    # Same CNIC typed without dashes: the unique index on the normalized value catches it
+    with pytest.raises(ValueError, match=DUPLICATE_CNIC_MESSAGE):
+        db.save_to_db(applicant(1, cnic="6110100000011", first_name="Duplicate"))
+    assert db.count_applicants({}) == SEEDED_ROWS + 1
+
+
+def test_batch_insert_skips_stored_cnics(backend, applicant):
+    db.save_to_db(applicant(1))
+    with db.db_connection() as conn:
+        skipped = db.insert_applicants(conn, [applicant(2), applicant(1), applicant(3)])
+    assert [r["cnic"] for r in skipped] == [applicant(1)["cnic"]]
+    assert db.cnic_exists("6110100000021") and db.cnic_exists("6110100000031")
+
+
+def test_rollback(backend, applicant):
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        db.get_storage().insert(cursor, APPLICANT_COLUMNS, [applicant_values(applicant(4))])
+        conn.rollback()
+        cursor.close()
+    assert not db.cnic_exists("6110100000041")
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def test_frame_schema(backend):
+    df = db.fetch_all_applicants()
+    expected = db.applicants_frame([], APPLICANT_SELECT_COLUMNS).dtypes
+    assert list(df.columns) == APPLICANT_SELECT_COLUMNS
+    assert [c for c in df.columns if str(df[c].dtype) != str(expected[c])] == []
+    assert df["id"].is_monotonic_increasing and df["id"].is_unique
+    assert list(db.fetch_all_applicants(("id", "cnic", "emi")).columns) == ["id", "cnic", "emi"]
+
+
+@pytest.mark.parametrize("filters", [
+    {}, {"decision": "Approved"}, {"city": "Lahore", "bike_type": "EV-1"}, {"search": "3520"},
+])
+def test_keyset_pages(backend, filters):
+    ids, after, has_next = [], None, True
+    while has_next:
+        page, has_next = db.fetch_applicants_page(filters, after, PAGE_SIZE)
+        assert len(page) <= PAGE_SIZE
+        ids += page["id"].astype(int).tolist()
+        after = ids[-1] if ids else None
+    assert ids == all_ids(filters)
+    assert db.count_applicants(filters) == len(ids)
+
+
+def test_search_treats_like_wildcards_literally(backend, applicant):
+    db.save_to_db(applicant(5, phone_number="0300_55%555"))
+    for search in ["0300_", "0300_55%"]:
+        page, _ = db.fetch_applicants_page({"search": search}, page_size=10_000)
+        assert len(page) == 1
+    page, _ = db.fetch_applicants_page({"search": "03001"}, page_size=10_000)
+    assert stored_id("6110100000051") not in page["id"].tolist()
+
+
+def test_stream(backend):
+    streamed = [row[0] for rows in db.stream_applicants(None, 50) for row in rows]
+    assert streamed == all_ids()
+    filtered = [row for rows in db.stream_applicants({"decision": "Approved"}, 50, ["id", "decision"]) for row in rows]
+    assert [r[0] for r in filtered] == all_ids({"decision": "Approved"})
+    assert all(len(r) == 2 for r in filtered)
+    # An abandoned stream must leave its connection usable
+    next(db.stream_applicants(None, 10))
+    assert db.count_applicants({}) == len(streamed)
+
+
+# -----------------------------
+# Deletes
+# -----------------------------
+def test_deleted_ids_are_not_reused(backend, applicant):
+    last = max(all_ids())
+    assert db.delete_applicants([last]) == 1
+    assert db.delete_applicants([last]) == 0
+    assert db.count_applicants_by_id((last,)) == 0
+    db.save_to_db(applicant(6))
+    assert stored_id("6110100000061") > last
+
+
+def test_bulk_delete(backend, applicant):
+    for n in range(10, 16):
+        db.save_to_db(applicant(n, city="Zhob"))
+    ids = [stored_id(f"61101{n:07d}1") for n in range(10, 16)]
+    missing = max(all_ids()) + 1000
+    assert db.count_applicants_by_id((ids[0], missing), ((ids[2], ids[3]),)) == 3
+    assert db.delete_applicants([ids[0], missing], [(ids[2], ids[3])]) == 3
+    assert db.count_applicants_by_id(tuple(ids)) == 3
+
+    zhob = {"city": "Zhob", "search": "61101"}
+    assert db.delete_matching_applicants(zhob) == 3
+    assert all_ids(zhob) == []
+
+
+def test_delete_matching_needs_a_filter(backend):
+    with pytest.raises(ValueError):
+        db.delete_matching_applicants({})
+    assert db.count_applicants({}) == SEEDED_ROWS
+
+
+# -----------------------------
+# Triggers and change tracking
+# -----------------------------
+def test_portfolio_summary_follows_writes(backend, applicant):
+    db.save_to_db(applicant(1))
+    run(lambda store, cursor: store.set_decision(cursor, "Reject", RULES_VERSION, [stored_id("6110100000011")]))
+    db.delete_applicants([1, 2])
+    assert portfolio.check_portfolio_summary().empty
+
+
+def test_snapshot_delta_sync(backend, applicant, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", "")
+    directory = str(tmp_path / "snapshot")
+    snapshot.sync(directory=directory)
+
+    db.save_to_db(applicant(6))
+    run(lambda store, cursor: store.set_decision(cursor, "Reject", RULES_VERSION, [1]))
+    db.delete_applicants([stored_id("6110100000061"), 2])
+    db.save_to_db(applicant(7))
+    # Timestamps must move past the first sync's watermark
+    time.sleep(0.01)
+    manifest = snapshot.sync(directory=directory)
+    assert manifest["last_sync"]["changed"] >= 2
+    assert manifest["last_sync"]["deleted"] == 2
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", directory)
+    synced = snapshot.read_frame(APPLICANT_SELECT_COLUMNS)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", "")
+    pd.testing.assert_frame_equal(synced, db.fetch_all_applicants(), check_categorical=False)
@@ -0,0 +1,61 @@
+"""
+The what-if grid and the minimum qualifying values re-derive decisions
+without calling score_applicant(); both must agree with it.
+"""
+import numpy as np
+import pytest
+
+from scoring import FINANCING_PLANS, score_applicant
+from whatif import DECISION_RANKS, qualifying_values, what_if_grid
+
+APPLICANTS = [
+    dict(applicant_type="Employee", gender="M", net_salary=85000, applicant_bank_balance=40000,
+         guarantor_bank_balance=None, salary_consistency=5, employer_type="SME", job_years=4, age=29,
+         dependents=3, residence="Rented", outstanding=60000),
+    dict(applicant_type="Businessman", gender="F", net_salary=130000, applicant_bank_balance=0,
+         guarantor_bank_balance=150000, salary_consistency=6, employer_type="Self-employed", job_years=12,
+         age=45, dependents=0, residence="Owned", outstanding=0, tax_return="Yes"),
+    # Close enough to the Approved cutoff that outstanding debt decides it
+    dict(applicant_type="Employee", gender="M", net_salary=100000, applicant_bank_balance=80000,
+         guarantor_bank_balance=None, salary_consistency=6, employer_type="Private Limited", job_years=3, age=35,
+         dependents=1, residence="Family", outstanding=200000),
+]
+
+
+def decision(applicant: dict, plan: str, **inputs) -> str:
+    plan = FINANCING_PLANS[plan]
+    return score_applicant(dict(applicant, emi=plan["installment"], tenure=plan["tenure"], **inputs))["decision"]
+
+
+@pytest.mark.parametrize("applicant", APPLICANTS)
+def test_grid_matches_scalar(applicant):
+    grid = what_if_grid(applicant, [45000, 70000, 99999, 150000], [0, 44700, 80000], [0, 100000, 900000])
+    assert len(grid) == len(FINANCING_PLANS) * 4 * 3 * 3
+    for row in grid.itertuples():
+        assert row.decision == decision(
+            applicant, row.plan, net_salary=row.net_salary,
+            applicant_bank_balance=row.applicant_bank_balance, outstanding=row.outstanding,
+        )
+
+
+@pytest.mark.parametrize("applicant", APPLICANTS)
+def test_qualifying_values_are_tight(applicant):
+    def rank(plan, **inputs):
+        return DECISION_RANKS.index(decision(applicant, plan, **inputs))
+
+    for row in qualifying_values(applicant).itertuples():
+        needed = DECISION_RANKS.index(row.band)
+        assert row.current_decision == decision(applicant, row.plan)
+        for value, column in (
+            (row.min_net_salary, "net_salary"),
+            (row.min_applicant_balance, "applicant_bank_balance"),
+            (row.min_guarantor_balance, "guarantor_bank_balance"),
+        ):
+            if np.isnan(value):
+                continue
+            assert rank(row.plan, **{column: value}) >= needed
+            if value > 0:
+                assert rank(row.plan, **{column: value - 1}) < needed
+        if np.isfinite(row.max_outstanding):
+            assert rank(row.plan, outstanding=row.max_outstanding) >= needed
+            assert rank(row.plan, outstanding=row.max_outstanding + 1) < needed
@@ -0,0 +1,225 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from scoring import (
+    RULES, ladder_scores, salary_consistency_score, employer_type_score, job_tenure_score,
+    age_score, dependents_score, residence_score,
+    FINANCING_PLANS, WEIGHTS, APPROVE_CUTOFF, REVIEW_CUTOFF,
+)
+
+
+# -----------------------------
+# What-if Settings
+# -----------------------------
+_F = RULES["factors"]
+# Decision bands in ascending order; a scenario's rank is its index here
+DECISION_RANKS = ["Reject", "Review", "Approved"]
+TARGET_BANDS = ["Approved", "Review"]
+QUALIFYING_COLUMNS = [
+    "plan", "band", "current_decision",
+    "min_net_salary", "min_applicant_balance", "min_guarantor_balance", "max_outstanding",
+]
+
+
+def _numeric(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+# -----------------------------
+# Vectorized evaluation
+# -----------------------------
+def _evaluate(applicant: dict, emi, tenure, net_salary, applicant_balance, guarantor_balance, outstanding):
+    """
+    Final score and decision rank of `applicant` with the six varying inputs
+    replaced by arrays (broadcast together). The other sub-scores do not depend
+    on them, so they are scored once; the sum and the reject rules follow
+    final_decision() / score_frame() exactly, in the same order.
+    """
+    emi, tenure, net_salary, applicant_balance, guarantor_balance, outstanding = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (emi, tenure, net_salary, applicant_balance, guarantor_balance, outstanding))
+    )
+
+    # --- income_score ---
+    rule = _F["income"]
+    inc = ladder_scores(rule, net_salary)
+    if applicant["gender"] in rule["gender_multiplier"]:
+        inc = inc * rule["gender_multiplier"][applicant["gender"]]
+    inc = np.minimum(inc, rule["max"])
+
+    # --- bank_balance_score_custom ---
+    rule = _F["bank_balance"]
+    balance_ok = (
+        (~np.isnan(applicant_balance) & (applicant_balance >= rule["applicant_emi_multiple"] * emi))
+        | (~np.isnan(guarantor_balance) & (guarantor_balance >= rule["guarantor_emi_multiple"] * emi))
+    )
+    bal = np.where(balance_ok, float(rule["score"]), 0.0)
+
+    # --- dti_score ---
+    valid = (net_salary > 0) & (tenure > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(valid, ((outstanding / tenure) + emi) / net_salary, 0.0)
+    dti = np.where(valid, ladder_scores(_F["dti"], ratio), 0.0)
+
+    ag = age_score(applicant["age"])
+    scores = {
+        "income": inc, "bank_balance": bal,
+        "salary_consistency": salary_consistency_score(applicant["salary_consistency"]),
+        "employer_type": employer_type_score(applicant["employer_type"]),
+        "job_tenure": job_tenure_score(applicant["job_years"]),
+        "age": ag,
+        "dependents": dependents_score(applicant["dependents"]),
+        "residence": residence_score(applicant["residence"]),
+        "dti": dti,
+    }
+    weighted = np.zeros(net_salary.shape)
+    for name, weight in WEIGHTS.items():
+        weighted = weighted + scores[name] * weight
+
+    no_tax_return = applicant["applicant_type"] == "Businessman" and applicant.get("tax_return", "Yes") == "No"
+    early_reject = no_tax_return | (ag == -1) | (bal == 0)
+    rank = np.where(early_reject, 0, np.where(weighted >= APPROVE_CUTOFF, 2, np.where(weighted >= REVIEW_CUTOFF, 1, 0)))
+    return np.where(early_reject, 0.0, weighted), rank
+
+
+def what_if_grid(applicant: dict, net_salaries, applicant_balances, outstandings, plans: dict = None) -> pd.DataFrame:
+    """
+    Score `applicant` on every plan × net salary × applicant balance × outstanding
+    combination in one vectorized pass; one row per scenario
+    """
+    plans = FINANCING_PLANS if plans is None else plans
+    names = list(plans)
+    emi = np.array([plans[p]["installment"] for p in names], dtype=float)[:, None, None, None]
+    tenure = np.array([plans[p]["tenure"] for p in names], dtype=float)[:, None, None, None]
+    salary = np.asarray(net_salaries, dtype=float)[None, :, None, None]
+    balance = np.asarray(applicant_balances, dtype=float)[None, None, :, None]
+    outstanding = np.asarray(outstandings, dtype=float)[None, None, None, :]
+
+    final_score, rank = _evaluate(
+        applicant, emi, tenure, salary, balance, _numeric(applicant.get("guarantor_bank_balance")), outstanding,
+    )
+    plan_index, salary_index, balance_index, outstanding_index = np.indices(final_score.shape)
+    return pd.DataFrame({
+        "plan": np.array(names)[plan_index.ravel()],
+        "net_salary": salary[0, :, 0, 0][salary_index.ravel()],
+        "applicant_bank_balance": balance[0, 0, :, 0][balance_index.ravel()],
+        "outstanding": outstanding[0, 0, 0, :][outstanding_index.ravel()],
+        "final_score": final_score.ravel(),
+        "decision": np.array(DECISION_RANKS)[rank.ravel()],
+    })
+
+
+# -----------------------------
+# Minimum qualifying values
+# -----------------------------
+def _step_starts(ladder: dict) -> list:
+    """ Smallest whole-rupee input in each bucket after the first ("below" x starts at x, "up_to" x just after) """
+    return [math.floor(b) + 1 if inclusive else math.ceil(b) for b, inclusive in zip(ladder["bounds"], ladder["inclusive"])]
+
+
+def _salary_candidates(applicant: dict, emi: float, tenure: float) -> list:
+    """
+    The score only rises with net salary, and only where salary enters an
+    income bucket or the DTI ratio drops into a better bucket
+    (ratio <= b  <=>  salary >= obligation / b), so the minimum salary for any
+    band is one of these points. The neighbour of each DTI point absorbs float rounding.
+    """
+    candidates = {1} | set(_step_starts(_F["income"]))
+    obligation = np.nan_to_num(_numeric(applicant["outstanding"])) / tenure + emi
+    for b, inclusive in zip(_F["dti"]["bounds"], _F["dti"]["inclusive"]):
+        if b > 0:
+            start = math.ceil(obligation / b) if inclusive else math.floor(obligation / b) + 1
+            candidates |= {start - 1, start}
+    return sorted(c for c in candidates if c > 0)
+
+
+def _outstanding_candidates(applicant: dict, emi: float, tenure: float) -> list:
+    """
+    The score only falls with outstanding debt, and only where the DTI ratio
+    crosses a bound (ratio <= b  <=>  outstanding <= (b * salary - emi) * tenure).
+    The last candidate lies beyond every bound: if it still qualifies, any amount does.
+    """
+    salary = _numeric(applicant["net_salary"])
+    candidates = {0}
+    for b, inclusive in zip(_F["dti"]["bounds"], _F["dti"]["inclusive"]):
+        limit = (b * salary - emi) * tenure
+        end = math.floor(limit) if inclusive else math.ceil(limit) - 1
+        candidates |= {c for c in (end, end + 1) if c >= 0}
+    beyond = (max(_F["dti"]["bounds"]) + 1) * max(salary, 1) * tenure
+    return sorted(candidates) + [beyond]
+
+
+def qualifying_values(applicant: dict, plans: dict = None) -> pd.DataFrame:
+    """
+    Per plan and decision band, the minimum net salary, applicant balance and
+    guarantor balance, and the maximum outstanding debt, that reach the band
+    with every other input as entered.
+
+    Each score is a step function of these inputs, so instead of searching,
+    the step points are solved for directly (inverting the ladders and the
+    balance multiples) and all of them, for all plans, are scored in one
+    vectorized pass. NaN means the band cannot be reached by changing that
+    input alone; inf means any outstanding amount still qualifies.
+    """
+    plans = FINANCING_PLANS if plans is None else plans
+    balance_rule = _F["bank_balance"]
+    current = {
+        "net_salary": _numeric(applicant["net_salary"]),
+        "applicant_balance": _numeric(applicant["applicant_bank_balance"]),
+        "guarantor_balance": _numeric(applicant.get("guarantor_bank_balance")),
+        "outstanding": _numeric(applicant["outstanding"]),
+    }
+
+    # (plan, input, candidate values) groups, all scored together below
+    groups = []
+    for name, plan in plans.items():
+        emi, tenure = float(plan["installment"]), float(plan["tenure"])
+        groups += [
+            (name, "current", [np.nan]),
+            (name, "net_salary", _salary_candidates(applicant, emi, tenure)),
+            (name, "applicant_balance", [0, math.ceil(balance_rule["applicant_emi_multiple"] * emi)]),
+            (name, "guarantor_balance", [0, math.ceil(balance_rule["guarantor_emi_multiple"] * emi)]),
+            (name, "outstanding", _outstanding_candidates(applicant, emi, tenure)),
+        ]
+
+    columns = {key: [] for key in ("emi", "tenure", *current)}
+    for name, varied, values in groups:
+        for key in columns:
+            if key == "emi":
+                columns[key] += [plans[name]["installment"]] * len(values)
+            elif key == "tenure":
+                columns[key] += [plans[name]["tenure"]] * len(values)
+            elif key == varied:
+                columns[key] += values
+            else:
+                columns[key] += [current[key]] * len(values)
+    _, rank = _evaluate(
+        applicant, columns["emi"], columns["tenure"], columns["net_salary"],
+        columns["applicant_balance"], columns["guarantor_balance"], columns["outstanding"],
+    )
+
+    found, offset = {}, 0
+    for name, varied, values in groups:
+        found[name, varied] = (np.asarray(values, dtype=float), rank[offset:offset + len(values)])
+        offset += len(values)
+
+    rows = []
+    for name in plans:
+        current_rank = found[name, "current"][1][0]
+        for band in TARGET_BANDS:
+            needed = DECISION_RANKS.index(band)
+            row = {"plan": name, "band": band, "current_decision": DECISION_RANKS[current_rank]}
+            for varied, column in (
+                ("net_salary", "min_net_salary"),
+                ("applicant_balance", "min_applicant_balance"),
+                ("guarantor_balance", "min_guarantor_balance"),
+            ):
+                values, ranks = found[name, varied]
+                ok = values[ranks >= needed]
+                row[column] = ok.min() if len(ok) else np.nan
+            values, ranks = found[name, "outstanding"]
+            ok = values[ranks >= needed]
+            row["max_outstanding"] = np.nan if not len(ok) else np.inf if ok.max() == values[-1] else ok.max()
+            rows.append(row)
+    return pd.DataFrame(rows, columns=QUALIFYING_COLUMNS)